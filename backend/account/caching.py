@@ -0,0 +1,58 @@
+"""
+Versioned response cache for per-municipality endpoints.
+
+Every municipality carries a ``stats_version`` that is bumped (with an F()
+update) whenever one of its complaints, their reviews or the municipality
+itself changes. Responses are cached under ``(endpoint, municipality,
+version, window)`` and sent with a strong ETag built from the same parts,
+so a client revalidating an unchanged dashboard gets a 304 before anything
+is computed or serialized.
+
+The version lives in the database, so every worker derives the same ETag
+even with a per-process local-memory cache; a shared backend (file, Redis)
+only saves the other workers from rebuilding the payload once. ``window``
+is the current DASHBOARD_CACHE_TTL time slot and makes age-dependent values
+such as complaint scores refresh at least that often.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def cache_ttl():
+    return getattr(settings, 'DASHBOARD_CACHE_TTL', 300)
+
+
+def get_cache():
+    return caches[getattr(settings, 'DASHBOARD_CACHE_ALIAS', 'default')]
+
+
+def _client_etags(request):
+    header = request.headers.get('If-None-Match', '')
+    return {tag.strip() for tag in header.split(',') if tag.strip()}
+
+
+def versioned_response(request, name, municipality, build):
+    """
+    The response for ``municipality`` at its current ``stats_version``:
+    304 when the client already has it, the cached payload when another
+    request built it, otherwise ``build()`` (which returns the payload).
+    """
+    ttl = cache_ttl()
+    parts = (name, municipality.pk, municipality.stats_version, int(time.time() // ttl))
+    etag = '"{}-{}-{}-{}"'.format(*parts)
+    headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+
+    if etag in _client_etags(request) or '*' in _client_etags(request):
+        return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    cache = get_cache()
+    key = 'versioned:{}:{}:{}:{}'.format(*parts)
+    data = cache.get(key)
+    if data is None:
+        data = build()
+        cache.set(key, data, ttl)
+    return Response(data, headers=headers)
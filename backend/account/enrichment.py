@@ -0,0 +1,172 @@
+"""
+Background AI enrichment of municipality details.
+
+Read endpoints never call the model. They ask ``request_enrichment`` for
+municipalities still missing a description; each one is queued at most
+once per ENRICHMENT_RETRY_AFTER seconds (a marker in the ENRICHMENT_CACHE_ALIAS
+cache, which every worker must share). ``municipality_enrichment`` then
+fetches the details of several municipalities in a single model call on a
+bounded thread pool and saves them, which bumps ``stats_version`` and so
+refreshes cached dashboards. While a request is in flight responses
+report ``enrichment_pending``; a failed attempt clears it, and the
+municipality is queued again once its marker expires.
+"""
+import json
+import os
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from openai import OpenAI
+
+from api.background import BatchingWorker
+from .models import Municipality, bump_stats_version
+
+ENRICHMENT_MODEL = "gpt-4o-mini"
+DETAIL_FIELDS = (
+    'establishment_year', 'mayor_name', 'commissioner_name',
+    'wards_count', 'area_sq_km', 'population', 'description',
+)
+
+client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+
+
+def needs_enrichment(municipality):
+    return not (municipality.description and municipality.description.strip())
+
+
+def get_cache():
+    return caches[getattr(settings, 'ENRICHMENT_CACHE_ALIAS', 'default')]
+
+
+def _marker(municipality_id):
+    return f"municipality-enrichment:{municipality_id}"
+
+
+def enrichment_pending(municipality):
+    """
+    Whether details for ``municipality`` are being fetched right now.
+    """
+    return needs_enrichment(municipality) and bool(get_cache().get(_marker(municipality.pk)))
+
+
+def _give_up(municipalities):
+    # No longer pending, but the marker still holds off retries until it expires
+    retry_after = getattr(settings, 'ENRICHMENT_RETRY_AFTER', 600)
+    get_cache().set_many({_marker(m.pk): False for m in municipalities}, timeout=retry_after)
+    # Cached dashboards still report the enrichment as pending
+    bump_stats_version(*(m.pk for m in municipalities))
+
+
+def _clean_detail(field, value, municipality):
+    """
+    ``value`` from the model converted for ``field``, or None when it does
+    not fit (e.g. "approx 50" for an integer field).
+    """
+    if value is None:
+        return None
+    try:
+        return Municipality._meta.get_field(field).clean(value, municipality)
+    except ValidationError:
+        return None
+
+
+def fetch_details(municipalities):
+    """
+    Administrative details of every municipality in a single model call,
+    as a dict keyed by municipality id.
+    """
+    listed = "\n".join(f"- id {m.id}: '{m.name}' in '{m.district}', '{m.state}' (India)" for m in municipalities)
+    prompt = f"""
+    Provide administrative details for each of these municipalities:
+    {listed}
+
+    Return ONLY a valid JSON object mapping each id (as a string) to an object with these keys
+    (use null if unknown, estimate if reasonable):
+    - "establishment_year" (integer)
+    - "mayor_name" (string)
+    - "commissioner_name" (string)
+    - "wards_count" (integer)
+    - "area_sq_km" (float)
+    - "population" (integer, latest census/estimate)
+    - "description" (string, 2 sentences intro)
+    """
+    completion = client.chat.completions.create(
+        model=ENRICHMENT_MODEL,
+        messages=[
+            {"role": "system", "content": "You are a city data assistant. Output JSON only."},
+            {"role": "user", "content": prompt},
+        ],
+        timeout=getattr(settings, 'ENRICHMENT_TIMEOUT', 60),
+    )
+    content = completion.choices[0].message.content.strip()
+    if content.startswith("```"):
+        content = content.replace("```json", "").replace("```", "").strip()
+    data = json.loads(content)
+    if not isinstance(data, dict):
+        raise ValueError(f"Expected a JSON object, got: {content[:100]}")
+    return {int(key): value for key, value in data.items() if isinstance(value, dict)}
+
+
+def enrich_municipalities(municipality_ids):
+    """
+    Fetches and saves the details of the given municipalities that still
+    lack a description.
+    """
+    municipalities = [m for m in Municipality.objects.filter(pk__in=municipality_ids) if needs_enrichment(m)]
+    if not municipalities:
+        return
+    if not client.api_key:
+        print(f"❌ No OPENAI_API_KEY found, cannot enrich {len(municipalities)} municipalities")
+        _give_up(municipalities)
+        return
+
+    print(f"🤖 Fetching administrative details for {', '.join(m.name for m in municipalities)}...")
+    try:
+        details = fetch_details(municipalities)
+    except Exception as e:
+        print(f"❌ Error fetching municipality details: {e}")
+        _give_up(municipalities)
+        return
+
+    for municipality in municipalities:
+        data = details.get(municipality.id)
+        if data is None:
+            print(f"⚠️ No details returned for {municipality.name}")
+            _give_up([municipality])
+            continue
+        for field in DETAIL_FIELDS[:-1]:
+            setattr(municipality, field, _clean_detail(field, data.get(field), municipality))
+        description = data.get('description')
+        if description and str(description).strip():
+            municipality.description = description
+        else:
+            municipality.description = f"{municipality.name} is a municipality in {municipality.district}, {municipality.state}."
+        municipality.save(update_fields=list(DETAIL_FIELDS))
+        print(f"✅ Updated details for {municipality.name}")
+
+
+municipality_enrichment = BatchingWorker(
+    "municipality-enrichment",
+    enrich_municipalities,
+    batch_size=getattr(settings, 'ENRICHMENT_BATCH_SIZE', 5),
+    max_wait=getattr(settings, 'ENRICHMENT_MAX_WAIT', 0.5),
+    max_workers=getattr(settings, 'ENRICHMENT_WORKERS', 2),
+)
+
+
+def request_enrichment(municipalities):
+    """
+    Queues the municipalities that still need details and returns the ids
+    of those whose enrichment is pending.
+    """
+    pending = set()
+    for municipality in municipalities:
+        if not needs_enrichment(municipality):
+            continue
+        if get_cache().add(_marker(municipality.pk), True, timeout=getattr(settings, 'ENRICHMENT_RETRY_AFTER', 600)):
+            municipality_enrichment.submit(municipality.pk)
+            pending.add(municipality.pk)
+        elif enrichment_pending(municipality):
+            pending.add(municipality.pk)
+    return pending
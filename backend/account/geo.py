@@ -0,0 +1,135 @@
+"""
+Geometry helpers shared by municipality and complaint lookups.
+"""
+import math
+
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def bounding_box(lat, lon, radius_km):
+    """
+    Returns ``(min_lat, max_lat, min_lon, max_lon)`` enclosing every point
+    within ``radius_km`` of ``(lat, lon)``. Longitude bounds are ``None``
+    near the poles or when the box would wrap around the antimeridian.
+    """
+    lat_delta = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = lat - lat_delta, lat + lat_delta
+
+    cos_lat = math.cos(math.radians(lat))
+    if cos_lat < 1e-6 or max_lat >= 90 or min_lat <= -90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), None, None
+
+    # Exact half-width of the circle; radius / cos(lat) underestimates it
+    # at high latitudes
+    sin_ratio = math.sin(radius_km / EARTH_RADIUS_KM) / cos_lat
+    if sin_ratio >= 1:
+        return min_lat, max_lat, None, None
+    lon_delta = math.degrees(math.asin(sin_ratio))
+    min_lon, max_lon = lon - lon_delta, lon + lon_delta
+    if min_lon < -180 or max_lon > 180:
+        return min_lat, max_lat, None, None
+    return min_lat, max_lat, min_lon, max_lon
+
+
+def haversine_km(lat, lon, lats, lons):
+    """
+    Vectorized great-circle distance in km from ``(lat, lon)`` to every
+    point of the ``lats``/``lons`` arrays.
+    """
+    lat1 = math.radians(lat)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    d_lat = lat2 - lat1
+    d_lon = np.radians(np.asarray(lons, dtype=np.float64) - lon)
+
+    a = np.sin(d_lat / 2) ** 2 + math.cos(lat1) * np.cos(lat2) * np.sin(d_lon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+# --- Geohash ---------------------------------------------------------------
+
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9  # ~4.8m x 4.8m cells
+# Sorts after every geohash character, so [prefix, prefix + "~") is a prefix range
+GEOHASH_RANGE_END = "~"
+
+def geohash_encode(lat, lon, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits, bit_count, even = 0, 0, True
+
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+
+def geohash_decode(geohash):
+    """
+    Returns ``(lat, lon, lat_err, lon_err)`` for the center of the cell.
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        bits = GEOHASH_ALPHABET.index(char)
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if (bits >> shift) & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return (
+        (lat_range[0] + lat_range[1]) / 2,
+        (lon_range[0] + lon_range[1]) / 2,
+        (lat_range[1] - lat_range[0]) / 2,
+        (lon_range[1] - lon_range[0]) / 2,
+    )
+
+
+def geohash_cell_size(precision):
+    """
+    ``(height, width)`` in degrees of a cell at ``precision``.
+    """
+    bits = 5 * precision
+    lon_bits = (bits + 1) // 2
+    lat_bits = bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def geohash_cover(lat, lon, radius_km, max_cells=16):
+    """
+    Geohash prefixes whose union covers every point within ``radius_km`` of
+    ``(lat, lon)``. Uses the finest precision at which the search box spans
+    at most ``max_cells`` cells, so a radius query becomes a handful of
+    prefix (index range) scans.
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(lat, lon, radius_km)
+    if min_lon is None:
+        min_lon, max_lon = -180.0, 180.0
+
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = geohash_cell_size(precision)
+        rows = range(int((min_lat + 90) // height), int(min(max_lat + 90, 179.999999) // height) + 1)
+        cols = range(int((min_lon + 180) // width), int(min(max_lon + 180, 359.999999) // width) + 1)
+        if len(rows) * len(cols) <= max_cells or precision == 1:
+            return sorted({
+                geohash_encode((row + 0.5) * height - 90, (col + 0.5) * width - 180, precision)
+                for row in rows
+                for col in cols
+            })
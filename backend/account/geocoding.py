@@ -0,0 +1,172 @@
+"""
+Shared reverse-geocoding client for Nominatim.
+
+Lookups are keyed on coordinates rounded to GEOCODING_CACHE_PRECISION
+decimals (3 decimals is roughly 110 m), so users in the same neighbourhood
+share one result. Results live in a per-process LRU and, behind it, in the
+``ReverseGeocode`` table, so they survive restarts and are shared between
+workers. Misses go out over one pooled HTTP session, paced to
+GEOCODING_MIN_INTERVAL seconds between calls to respect Nominatim's
+1 request/second policy. The pacing holds across worker processes: each
+request first reserves its own time slot with ``cache.add`` in the
+GEOCODING_RATE_CACHE_ALIAS cache, which must be shared between them.
+
+Profiles are assigned their municipality off the request path: saving new
+coordinates queues the profile on ``municipality_assignment`` once the
+transaction commits.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+
+import requests
+from django.conf import settings
+from django.core.cache import caches
+from django.utils import timezone
+
+from api.background import BatchingWorker
+from .models import Profile, ReverseGeocode
+
+DEFAULT_NOMINATIM_URL = "https://nominatim.openstreetmap.org/reverse"
+USER_AGENT = "geoapiSoumya"
+
+
+class GeocodingService:
+
+    def __init__(self):
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": USER_AGENT})
+        self.memory = OrderedDict()
+        self.stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0, 'errors': 0}
+        self._memory_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._rate_lock = threading.Lock()
+        self._last_slot = 0
+
+    @staticmethod
+    def cache_key(lat, lon):
+        precision = getattr(settings, 'GEOCODING_CACHE_PRECISION', 3)
+        return f"{round(float(lat), precision):.{precision}f},{round(float(lon), precision):.{precision}f}"
+
+    def count(self, stat):
+        with self._stats_lock:
+            self.stats[stat] += 1
+
+    def reverse(self, lat, lon):
+        """
+        Returns the Nominatim ``address`` dict for the coordinates, or an empty
+        dict when the provider knows nothing there. Raises on network errors.
+        """
+        key = self.cache_key(lat, lon)
+
+        with self._memory_lock:
+            address = self.memory.get(key)
+            if address is not None:
+                self.memory.move_to_end(key)
+        if address is not None:
+            self.count('memory_hits')
+            return address
+
+        cached = ReverseGeocode.objects.filter(key=key).values_list('address', flat=True).first()
+        if cached is not None:
+            self.count('db_hits')
+            self.remember(key, cached)
+            return cached
+
+        self.count('misses')
+        try:
+            address = self.fetch(key)
+        except Exception:
+            self.count('errors')
+            raise
+
+        ReverseGeocode.objects.update_or_create(
+            key=key,
+            defaults={'address': address, 'fetched_at': timezone.now()},
+        )
+        self.remember(key, address)
+        return address
+
+    def fetch(self, key):
+        lat, lon = key.split(",")
+        self.wait_for_slot()
+        print(f"📡 Reverse geocoding {key}...")
+        response = self.session.get(
+            getattr(settings, 'NOMINATIM_URL', DEFAULT_NOMINATIM_URL),
+            params={'lat': lat, 'lon': lon, 'format': 'jsonv2', 'accept-language': 'en'},
+            timeout=10,
+        )
+        response.raise_for_status()
+        return response.json().get("address", {})
+
+    def wait_for_slot(self):
+        """
+        Blocks until this request's slot starts. Time is cut into
+        GEOCODING_MIN_INTERVAL-wide slots and each request reserves the first
+        free one from now on in the shared cache, so requests from every
+        worker start at least one interval apart.
+        """
+        interval = getattr(settings, 'GEOCODING_MIN_INTERVAL', 1.0)
+        cache = caches[getattr(settings, 'GEOCODING_RATE_CACHE_ALIAS', 'default')]
+        with self._rate_lock:
+            # Threads of this process never probe slots it already reserved
+            slot = max(math.ceil(time.time() / interval), self._last_slot + 1)
+            while not cache.add(f"nominatim-slot:{slot}", True, timeout=math.ceil(slot * interval - time.time() + interval) + 1):
+                slot += 1
+            self._last_slot = slot
+        # Sleep without the lock, so other threads can reserve later slots meanwhile
+        delay = slot * interval - time.time()
+        if delay > 0:
+            time.sleep(delay)
+
+    def remember(self, key, address):
+        size = getattr(settings, 'GEOCODING_LRU_SIZE', 1024)
+        with self._memory_lock:
+            self.memory[key] = address
+            self.memory.move_to_end(key)
+            while len(self.memory) > size:
+                self.memory.popitem(last=False)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_geocoder():
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = GeocodingService()
+    return _service
+
+
+def reverse_address(lat, lon):
+    return get_geocoder().reverse(lat, lon)
+
+
+def assign_profile_municipalities(profile_ids):
+    """
+    Resolves and stores the municipality of each profile from its coordinates.
+    Profiles whose coordinates changed again meanwhile are left to the newer job.
+    """
+    for profile in Profile.objects.filter(pk__in=profile_ids).exclude(latitude=None).exclude(longitude=None):
+        municipality = profile.assign_nearest_municipality()
+        if municipality is None:
+            print(f"⚠️ No municipality found near profile {profile.pk}.")
+            continue
+        Profile.objects.filter(pk=profile.pk, latitude=profile.latitude, longitude=profile.longitude).update(
+            municipality=municipality, location_verified=True,
+        )
+        print("🏙️ Municipality assigned:", municipality.name)
+
+
+municipality_assignment = BatchingWorker(
+    "municipality-assignment",
+    assign_profile_municipalities,
+    batch_size=getattr(settings, 'MUNICIPALITY_ASSIGNMENT_BATCH_SIZE', 10),
+    max_wait=getattr(settings, 'MUNICIPALITY_ASSIGNMENT_MAX_WAIT', 0.5),
+    # Lookups are paced to one per GEOCODING_MIN_INTERVAL anyway
+    max_workers=1,
+)
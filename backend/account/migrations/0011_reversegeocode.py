@@ -0,0 +1,22 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0010_overpasstile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReverseGeocode',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=50, unique=True)),
+                ('address', models.JSONField(blank=True, default=dict)),
+                ('fetched_at', models.DateTimeField()),
+            ],
+        ),
+    ]
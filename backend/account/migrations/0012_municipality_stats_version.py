@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0011_reversegeocode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='municipality',
+            name='stats_version',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:21
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count, Min
+from django.db.models.functions import Lower
+
+
+ROLLUP_FIELDS = ('complaint_count', 'resolution_seconds', 'review_count', 'rating_sum')
+
+
+def _merge_daily_stats(ComplaintDailyStat, duplicate, keep):
+    # Rollup rows are unique per municipality/date/department/status, so add them up
+    for row in ComplaintDailyStat.objects.filter(municipality=duplicate):
+        target = ComplaintDailyStat.objects.filter(
+            municipality=keep, date=row.date, department=row.department, status=row.status,
+        ).first()
+        if target is None:
+            row.municipality = keep
+            row.save(update_fields=['municipality'])
+            continue
+        for field in ROLLUP_FIELDS:
+            setattr(target, field, getattr(target, field) + getattr(row, field))
+        target.save(update_fields=list(ROLLUP_FIELDS))
+        row.delete()
+
+
+def merge_duplicates(apps, schema_editor):
+    """
+    Merges duplicate municipalities left by concurrent discoveries into the
+    oldest row of each group: everything referencing a duplicate is moved
+    over, then the duplicate is deleted.
+    """
+    Municipality = apps.get_model('account', 'Municipality')
+    ComplaintDailyStat = apps.get_model('complaints', 'ComplaintDailyStat')
+    groups = (
+        Municipality.objects.annotate(lower_name=Lower('name'))
+        .values('lower_name', 'district', 'state')
+        .annotate(rows=Count('id'), keep=Min('id'))
+        .filter(rows__gt=1)
+    )
+    relations = [rel for rel in Municipality._meta.related_objects if not rel.many_to_many]
+    for group in groups:
+        keep = Municipality.objects.get(pk=group['keep'])
+        duplicates = (
+            Municipality.objects.annotate(lower_name=Lower('name'))
+            .filter(lower_name=group['lower_name'], district=group['district'], state=group['state'])
+            .exclude(pk=keep.pk)
+        )
+        for municipality in duplicates:
+            _merge_daily_stats(ComplaintDailyStat, municipality, keep)
+            for rel in relations:
+                rel.related_model._base_manager.filter(**{rel.field.name: municipality}).update(**{rel.field.name: keep})
+            municipality.delete()
+        # Cached dashboards of the kept row are out of date
+        Municipality.objects.filter(pk=keep.pk).update(stats_version=models.F('stats_version') + 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0012_municipality_stats_version'),
+        # Loaded so the merge sees every model referencing municipalities
+        ('api', '0005_alter_municipalityofficial_designation_and_more'),
+        ('complaints', '0014_upvotelogentry'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='municipality',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('name'), models.F('district'), models.F('state'), name='municipality_unique_name'),
+        ),
+    ]
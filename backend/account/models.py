@@ -1,10 +1,97 @@
-from django.db import models
-import requests
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import Cast, Lower
 from django.contrib.auth.models import User
-from geopy.distance import distance  
-from geopy.geocoders import Nominatim
+from .geo import GEOHASH_RANGE_END, geohash_cover, geohash_encode, haversine_km
 
-class Municipality(models.Model):
+
+class GeoQuerySet(models.QuerySet):
+    def near(self, lat, lon, radius_km):
+        """
+        Rows whose geohash lies in one of the cells covering ``radius_km``
+        around ``(lat, lon)``. Each cell is a prefix range on the indexed
+        geohash column; the result is a superset of the exact circle.
+        """
+        cells = geohash_cover(lat, lon, radius_km)
+        condition = Q()
+        for cell in cells:
+            condition |= Q(geohash__gte=cell, geohash__lt=cell + GEOHASH_RANGE_END)
+        # The enclosing range lets planners use a single index range scan
+        # before checking the individual cells.
+        return self.filter(
+            condition,
+            geohash__gte=cells[0],
+            geohash__lt=cells[-1] + GEOHASH_RANGE_END,
+        )
+
+    def nearby(self, lat, lon, radius_km):
+        """
+        Rows within ``radius_km`` of ``(lat, lon)``, nearest first, each with a
+        ``distance_km`` attribute. Exact distances are computed in one
+        vectorized pass over the ``near()`` candidates.
+        """
+        candidates = list(
+            self.near(lat, lon, radius_km)
+            .annotate(lat=Cast('latitude', FloatField()), lon=Cast('longitude', FloatField()))
+            .values_list('pk', 'lat', 'lon')
+        )
+        if not candidates:
+            return []
+
+        pks, lats, lons = zip(*candidates)
+        distances = haversine_km(lat, lon, lats, lons)
+        within = {
+            pk: float(dist)
+            for pk, dist in zip(pks, distances)
+            if dist <= radius_km
+        }
+
+        # The matches already satisfy this queryset's filters; look them up by pk only
+        nearby = list(self.model._default_manager.filter(pk__in=within))
+        for obj in nearby:
+            obj.distance_km = within[obj.pk]
+        nearby.sort(key=lambda obj: obj.distance_km)
+        return nearby
+
+
+class MunicipalityQuerySet(GeoQuerySet):
+    def bump_stats_version(self):
+        """
+        Invalidates the cached dashboards of these municipalities.
+        """
+        return self.update(stats_version=F('stats_version') + 1)
+
+
+def bump_stats_version(*municipality_ids):
+    ids = {pk for pk in municipality_ids if pk is not None}
+    if ids:
+        Municipality.objects.filter(pk__in=ids).bump_stats_version()
+
+
+class GeohashedModel(models.Model):
+    """
+    Keeps a precomputed geohash of ``latitude``/``longitude`` for indexed
+    proximity lookups (see ``GeoQuerySet.near``).
+    """
+    geohash = models.CharField(max_length=12, null=True, blank=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        if not {'latitude', 'longitude'} & self.get_deferred_fields():
+            if self.latitude is not None and self.longitude is not None:
+                self.geohash = geohash_encode(float(self.latitude), float(self.longitude))
+            else:
+                self.geohash = None
+
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+                kwargs['update_fields'] = set(update_fields) | {'geohash'}
+        super().save(*args, **kwargs)
+
+
+class Municipality(GeohashedModel):
  
     name = models.CharField(max_length=150)
     district = models.CharField(max_length=100)
@@ -22,93 +109,70 @@ class Municipality(models.Model):
     population = models.IntegerField(null=True, blank=True) # Latest Census/Estimate
     description = models.TextField(null=True, blank=True) # Introduction/Bio
 
+    # Bumped whenever anything shown on the dashboard changes (account/caching.py)
+    stats_version = models.PositiveBigIntegerField(default=0, editable=False)
+
+    objects = MunicipalityQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['geohash'], name='municipality_geohash_idx'),
+        ]
+        constraints = [
+            # Concurrent Overpass discoveries of the same tile insert with
+            # ignore_conflicts instead of creating duplicates (account/overpass.py)
+            models.UniqueConstraint(Lower('name'), 'district', 'state', name='municipality_unique_name'),
+        ]
+
     def __str__(self):
         return f"{self.name}, {self.district}"
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # The version is only changed with F() updates; never write back a stale copy
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.attname not in deferred and f.name != 'stats_version'
+            ]
+        super().save(*args, **kwargs)
+
     def populate_details_from_ai(self):
         """
-        Fetches administrative details from OpenAI if description is missing.
+        Fetches administrative details from OpenAI right away if description
+        is missing. Read endpoints queue this instead (account/enrichment.py).
         """
-        import json
-        import os
-        from openai import OpenAI
-        
-        # Check if description has actual content (not just empty string or None)
-        if self.description and len(self.description.strip()) > 0:
-            print(f"ℹ️ {self.name} already has description, skipping AI fetch.")
-            return  # Already populated
+        from .enrichment import DETAIL_FIELDS, enrich_municipalities
 
-        client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
-        
-        if not client.api_key:
-            print(f"❌ No OPENAI_API_KEY found for {self.name}")
-            return
+        enrich_municipalities([self.pk])
+        self.refresh_from_db(fields=list(DETAIL_FIELDS) + ['stats_version'])
 
-        try:
-            print(f"🤖 Fetching administrative details for {self.name}...")
-            prompt = f"""
-            Provide administrative details for the municipality of '{self.name}' in '{self.district}', '{self.state}' (India).
-            Return ONLY a valid JSON object with these keys (use null if unknown, estimate if reasonable):
-            - "establishment_year" (integer)
-            - "mayor_name" (string)
-            - "commissioner_name" (string)
-            - "wards_count" (integer)
-            - "area_sq_km" (float)
-            - "population" (integer, latest census/estimate)
-            - "description" (string, 2 sentences intro)
-            """
-            
-            completion = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": "You are a city data assistant. Output JSON only."},
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            
-            content = completion.choices[0].message.content.strip()
-            print(f"📦 Raw response for {self.name}: {content[:100]}...")
-            
-            if content.startswith("```"):
-                content = content.replace("```json", "").replace("```", "").strip()
-            
-            data_json = json.loads(content)
-            
-            # DEBUG: Print the FULL parsed data
-            print(f"📊 PARSED DATA for {self.name}:")
-            print(f"   establishment_year: {data_json.get('establishment_year')}")
-            print(f"   mayor_name: {data_json.get('mayor_name')}")
-            print(f"   commissioner_name: {data_json.get('commissioner_name')}")
-            print(f"   wards_count: {data_json.get('wards_count')}")
-            print(f"   area_sq_km: {data_json.get('area_sq_km')}")
-            print(f"   population: {data_json.get('population')}")
-            print(f"   description: {data_json.get('description')}")
-            
-            self.establishment_year = data_json.get('establishment_year')
-            self.mayor_name = data_json.get('mayor_name')
-            self.commissioner_name = data_json.get('commissioner_name')
-            self.wards_count = data_json.get('wards_count')
-            self.area_sq_km = data_json.get('area_sq_km')
-            self.population = data_json.get('population')
-            
-            # Ensure description is not None/empty
-            desc = data_json.get('description')
-            if desc and len(str(desc).strip()) > 0:
-                self.description = desc
-            else:
-                self.description = f"{self.name} is a municipality in {self.district}, {self.state}."
-            
-            self.save()
-            print(f"✅ Updated details for {self.name}")
-            
-        except json.JSONDecodeError as e:
-            print(f"❌ JSON parse error for {self.name}: {e}")
-            print(f"   Raw content was: {content[:200] if 'content' in dir() else 'N/A'}")
-        except Exception as e:
-            print(f"❌ Error fetching municipality details for {self.name}: {e}")
+
+class OverpassTile(models.Model):
+    """
+    Cached Overpass API elements for one coarse lat/lon tile (see account/overpass.py).
+    """
+    key = models.CharField(max_length=50, unique=True)
+    elements = models.JSONField(default=list)
+    fetched_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Overpass tile {self.key} ({len(self.elements)} elements)"
 
 
-class Profile(models.Model):
+class ReverseGeocode(models.Model):
+    """
+    Cached Nominatim address for coordinates rounded to a few decimals (see account/geocoding.py).
+    """
+    key = models.CharField(max_length=50, unique=True)
+    address = models.JSONField(default=dict, blank=True)
+    fetched_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Reverse geocode {self.key}"
+
+
+class Profile(GeohashedModel):
    
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name="profile")
     bio = models.TextField(blank=True, null=True)
@@ -127,6 +191,41 @@ class Profile(models.Model):
         Municipality, on_delete=models.SET_NULL, null=True, blank=True, related_name="residents"
     )
 
+    objects = GeoQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['geohash'], name='profile_geohash_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_coordinates = instance.coordinates()
+        return instance
+
+    def coordinates(self):
+        deferred = self.get_deferred_fields()
+        if {'latitude', 'longitude'} & deferred:
+            return None
+        return tuple(None if value is None else float(value) for value in (self.latitude, self.longitude))
+
+    def coordinates_changed(self):
+        """
+        Whether latitude/longitude differ from the values last loaded or saved.
+        """
+        current = self.coordinates()
+        return current is not None and current != getattr(self, '_saved_coordinates', (None, None))
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        self._coordinates_changed = self.coordinates_changed() and (
+            update_fields is None or bool({'latitude', 'longitude'} & set(update_fields))
+        )
+        super().save(*args, **kwargs)
+        if self._coordinates_changed:
+            self._saved_coordinates = self.coordinates()
+
     def __str__(self):
         return self.user.username
 
@@ -138,30 +237,32 @@ class Profile(models.Model):
             print("No coordinates, skipping municipality assignment")
             return None
 
-        user_coords = (float(self.latitude), float(self.longitude))
-        geolocator = Nominatim(user_agent="geoapiSoumya")
+        from .geocoding import reverse_address
 
         try:
-            location = geolocator.reverse(user_coords, exactly_one=True, language="en")
-            if not location:
+            address = reverse_address(self.latitude, self.longitude)
+            if not address:
                 print("Could not reverse geocode coordinates")
                 return None
 
-            address = location.raw.get("address", {})
             name = address.get("city") or address.get("town") or address.get("village") or address.get("municipality") or "Unknown"
             district = address.get("county") or address.get("state_district") or "Unknown"
             state = address.get("state") or "Unknown"
 
-            municipality, created = Municipality.objects.get_or_create(
-                name=name,
-                district=district,
-                state=state,
-                defaults={
-                    "latitude": self.latitude,
-                    "longitude": self.longitude,
-                    "verified": True
-                }
-            )
+            # Names are unique regardless of case (municipality_unique_name)
+            lookup = {"name__iexact": name, "district": district, "state": state}
+            municipality, created = Municipality.objects.filter(**lookup).first(), False
+            if municipality is None:
+                try:
+                    with transaction.atomic():
+                        municipality = Municipality.objects.create(
+                            name=name, district=district, state=state,
+                            latitude=self.latitude, longitude=self.longitude, verified=True,
+                        )
+                    created = True
+                except IntegrityError:
+                    # Created concurrently
+                    municipality = Municipality.objects.get(**lookup)
 
             print("Municipality found/created:", municipality, "Created new?" , created)
             self.municipality = municipality
@@ -174,117 +275,32 @@ class Profile(models.Model):
             return None
         
     def get_nearby_municipalities(self, count=5, radius_km=100):
+        """
+        Returns up to ``count`` municipalities within ``radius_km``, nearest
+        first, each with a ``distance_km`` attribute.
+        """
+        from .overpass import discover_municipalities
+        from .spatial_index import get_municipality_index
+
         if not self.location_verified or not self.latitude or not self.longitude:
-            return Municipality.objects.none()
+            return []
 
         user_coords = (float(self.latitude), float(self.longitude))
-        nearby = []
-
-        db_municipalities = Municipality.objects.exclude(latitude__isnull=True, longitude__isnull=True)
-        for m in db_municipalities:
-            try:
-                lat = float(m.latitude)
-                lon = float(m.longitude)
-                dist = distance(user_coords, (lat, lon)).km
-                if dist <= radius_km:
-                    nearby.append((m, dist))
-            except (TypeError, ValueError):
-                print(f"⚠️ Skipping municipality with invalid coordinates: {m.name}")
+        matches = get_municipality_index().query(*user_coords, k=count, radius_km=radius_km)
+        municipalities = Municipality.objects.in_bulk([m_id for m_id, _ in matches])
+        nearby = [(municipalities[m_id], dist) for m_id, dist in matches if m_id in municipalities]
 
         if len(nearby) < count:
             print("📡 Fetching additional municipalities from Overpass API (OSM)...")
-            
-            # Initialize geolocator for reverse geocoding
-            geolocator = Nominatim(user_agent="geoapiSoumya")
-            
-            overpass_url = "https://overpass-api.de/api/interpreter"
-            radius_meters = 50000  # 50km
-            
-            # Query for nodes tagged as city/town/suburb or boundary=administrative with admin_level 8 (municipality)
-            # This is much more reliable than text search
-            overpass_query = f"""
-            [out:json][timeout:25];
-            (
-              node["place"~"city|town"](around:{radius_meters},{self.latitude},{self.longitude});
-              relation["boundary"="administrative"]["admin_level"~"4|5|6|7|8"](around:{radius_meters},{self.latitude},{self.longitude});
-            );
-            out center;
-            """
-            
             try:
-                response = requests.get(overpass_url, params={'data': overpass_query}, headers={"User-Agent": "EcoCity-App/1.0"})
-                response.raise_for_status()
-                data = response.json()
-                elements = data.get("elements", [])
-                
-                print(f"🌍 Overpass returned {len(elements)} raw elements")
-
-                for res in elements:
-                    try:
-                        tags = res.get("tags", {})
-                        name = tags.get("name", "")
-                        
-                        if not name:
-                            continue
-                            
-                        # English name preference
-                        if "name:en" in tags:
-                            name = tags["name:en"]
-
-                        # Filtering common noise
-                        if not name or "District" in name or "State" in name:
-                             # Cuttack District vs Cuttack City. We want the city.
-                             if "District" in name:
-                                 continue
-
-                        # Extract coordinates
-                        lat, lon = None, None
-                        if res["type"] == "node":
-                            lat, lon = res["lat"], res["lon"]
-                        elif res["type"] == "relation" and "center" in res:
-                             lat, lon = res["center"]["lat"], res["center"]["lon"]
-                        
-                        if lat is None or lon is None:
-                            continue
-                            
-                        # Avoid duplicates
-                        if not Municipality.objects.filter(name__iexact=name).exists():
-                            # Use reverse geocoding to get accurate district/state
-                            district = "Unknown District"
-                            state = "Unknown State"
-                            
-                            try:
-                                location = geolocator.reverse((lat, lon), exactly_one=True, language="en")
-                                if location:
-                                    address = location.raw.get("address", {})
-                                    district = address.get("county") or address.get("state_district") or "Unknown District"
-                                    state = address.get("state") or "Unknown State"
-                            except Exception as e:
-                                print(f"⚠️ Reverse geocoding failed for {name}: {e}")
-                            
-                            muni = Municipality.objects.create(
-                                name=name,
-                                district=district,
-                                state=state,
-                                latitude=lat,
-                                longitude=lon,
-                                verified=False
-                            )
-                            dist = distance(user_coords, (lat, lon)).km
-                            if dist <= radius_km:
-                                nearby.append((muni, dist))
-                                
-                        if len(nearby) >= count:
-                            break
-                            
-                    except Exception as e:
-                        print(f"⚠️ Error processing Overpass element {res.get('id')}: {e}")
-                        
+                nearby += discover_municipalities(*user_coords, radius_km=radius_km, limit=count - len(nearby))
             except Exception as e:
                 print("⚠️ Overpass API fetch failed:", e)
 
-
         sorted_nearby = sorted(nearby, key=lambda x: x[1])
-        top_nearby = [m for m, _ in sorted_nearby[:count]]
+        top_nearby = []
+        for m, dist in sorted_nearby[:count]:
+            m.distance_km = dist
+            top_nearby.append(m)
 
-        return Municipality.objects.filter(id__in=[m.id for m in top_nearby ])
+        return top_nearby
@@ -0,0 +1,189 @@
+"""
+Municipality discovery from OpenStreetMap's Overpass API.
+
+Overpass responses are cached persistently per coarse lat/lon tile
+(``OverpassTile``, OVERPASS_TILE_DEGREES wide), so every user in the same
+tile reuses one fetch until OVERPASS_TILE_TTL expires. Newly discovered
+municipalities are deduplicated against the database in a single query and
+bulk-created in one transaction.
+"""
+import math
+from datetime import timedelta
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .geo import EARTH_RADIUS_KM, geohash_encode, haversine_km
+from .geocoding import reverse_address
+from .models import Municipality, OverpassTile
+from .spatial_index import invalidate_municipality_index
+
+DEFAULT_OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+OVERPASS_RADIUS_KM = 50
+
+
+def tile_size():
+    return getattr(settings, 'OVERPASS_TILE_DEGREES', 0.5)
+
+
+def tile_for(lat, lon, size=None):
+    """
+    Returns ``(key, center_lat, center_lon)`` of the tile containing the point.
+    """
+    size = size or tile_size()
+    row, col = math.floor(lat / size), math.floor(lon / size)
+    return f"{size}:{row}:{col}", (row + 0.5) * size, (col + 0.5) * size
+
+
+def tile_query_radius_km(center_lat, size=None):
+    """
+    Search radius around a tile center that covers OVERPASS_RADIUS_KM around
+    any point inside the tile.
+    """
+    size = size or tile_size()
+    half_height = math.radians(size / 2) * EARTH_RADIUS_KM
+    half_width = half_height * math.cos(math.radians(center_lat))
+    return OVERPASS_RADIUS_KM + math.hypot(half_height, half_width)
+
+
+def build_query(lat, lon, radius_km):
+    radius_meters = int(radius_km * 1000)
+    # Query for nodes tagged as city/town/suburb or boundary=administrative with admin_level 8 (municipality)
+    # This is much more reliable than text search
+    return f"""
+    [out:json][timeout:25];
+    (
+      node["place"~"city|town"](around:{radius_meters},{lat},{lon});
+      relation["boundary"="administrative"]["admin_level"~"4|5|6|7|8"](around:{radius_meters},{lat},{lon});
+    );
+    out center;
+    """
+
+
+def fetch_tile_elements(lat, lon):
+    """
+    Overpass elements for the tile containing ``(lat, lon)``, from the tile
+    cache when fresh, otherwise fetched once and stored.
+    """
+    key, center_lat, center_lon = tile_for(lat, lon)
+    tile = OverpassTile.objects.filter(key=key).first()
+    ttl = getattr(settings, 'OVERPASS_TILE_TTL', timedelta(days=7))
+    if tile and timezone.now() - tile.fetched_at < ttl:
+        return tile.elements
+
+    print(f"📡 Fetching Overpass tile {key}...")
+    response = requests.get(
+        getattr(settings, 'OVERPASS_URL', DEFAULT_OVERPASS_URL),
+        params={'data': build_query(center_lat, center_lon, tile_query_radius_km(center_lat))},
+        headers={"User-Agent": "EcoCity-App/1.0"},
+        timeout=30,
+    )
+    response.raise_for_status()
+    elements = response.json().get("elements", [])
+    print(f"🌍 Overpass returned {len(elements)} raw elements")
+
+    OverpassTile.objects.update_or_create(
+        key=key,
+        defaults={'elements': elements, 'fetched_at': timezone.now()},
+    )
+    return elements
+
+
+def parse_element(element):
+    """
+    Returns ``(name, lat, lon)`` for a usable municipality element, else None.
+    """
+    tags = element.get("tags", {})
+    name = tags.get("name:en") or tags.get("name", "")
+    # Filtering common noise: Cuttack District vs Cuttack City. We want the city.
+    if not name or "District" in name:
+        return None
+
+    if element.get("type") == "node":
+        lat, lon = element.get("lat"), element.get("lon")
+    elif element.get("type") == "relation" and "center" in element:
+        lat, lon = element["center"]["lat"], element["center"]["lon"]
+    else:
+        return None
+    if lat is None or lon is None:
+        return None
+    return name, lat, lon
+
+
+def reverse_geocode(lat, lon):
+    """
+    Returns ``(district, state)`` for the coordinates.
+    """
+    address = reverse_address(lat, lon)
+    district = address.get("county") or address.get("state_district") or "Unknown District"
+    state = address.get("state") or "Unknown State"
+    return district, state
+
+
+def discover_municipalities(lat, lon, radius_km, limit):
+    """
+    Creates up to ``limit`` municipalities within ``radius_km`` of the point
+    that Overpass knows about but the database does not. Returns them as
+    ``(municipality, distance_km)`` pairs, nearest first.
+    """
+    candidates = {}
+    for element in fetch_tile_elements(lat, lon):
+        parsed = parse_element(element)
+        if parsed:
+            candidates.setdefault(parsed[0].lower(), parsed)
+    if not candidates or limit <= 0:
+        return []
+
+    # Avoid duplicates: one query for every candidate name
+    known = set(
+        Municipality.objects.annotate(lower_name=Lower('name'))
+        .filter(lower_name__in=list(candidates))
+        .values_list('lower_name', flat=True)
+    )
+    new = [candidate for key, candidate in candidates.items() if key not in known]
+    if not new:
+        return []
+
+    distances = haversine_km(lat, lon, [c[1] for c in new], [c[2] for c in new])
+    in_range = sorted(
+        ((candidate, float(dist)) for candidate, dist in zip(new, distances) if dist <= radius_km),
+        key=lambda item: item[1],
+    )[:limit]
+
+    municipalities = []
+    for (name, m_lat, m_lon), dist in in_range:
+        try:
+            # Use reverse geocoding to get accurate district/state
+            district, state = reverse_geocode(m_lat, m_lon)
+        except Exception as e:
+            print(f"⚠️ Reverse geocoding failed for {name}: {e}")
+            district, state = "Unknown District", "Unknown State"
+        municipalities.append(Municipality(
+            name=name,
+            district=district,
+            state=state,
+            latitude=m_lat,
+            longitude=m_lon,
+            # bulk_create skips save(), which normally fills the geohash
+            geohash=geohash_encode(m_lat, m_lon),
+            verified=False,
+        ))
+
+    # A concurrent discovery of the same tile may insert the same rows first;
+    # the unique (name, district, state) constraint turns those into no-ops
+    with transaction.atomic():
+        Municipality.objects.bulk_create(municipalities, ignore_conflicts=True)
+    # bulk_create sends no post_save signals
+    invalidate_municipality_index()
+
+    # ignore_conflicts leaves primary keys unset: read back whichever rows won
+    keys = {(m.name.lower(), m.district, m.state): dist for m, (_, dist) in zip(municipalities, in_range)}
+    saved = (
+        Municipality.objects.annotate(lower_name=Lower('name'))
+        .filter(lower_name__in=[key[0] for key in keys])
+    )
+    found = [(m, keys[m.lower_name, m.district, m.state]) for m in saved if (m.lower_name, m.district, m.state) in keys]
+    return sorted(found, key=lambda item: item[1])
@@ -2,6 +2,7 @@ from rest_framework import serializers
 from geopy.distance import distance
 from django.contrib.auth.models import User
 from .models import Profile,Municipality
+from .enrichment import enrichment_pending
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -36,16 +37,24 @@ class ProfileSerializer(serializers.ModelSerializer):
 
 class MunicipalitySerializer(serializers.ModelSerializer):
     distance_km = serializers.SerializerMethodField()
+    enrichment_pending = serializers.SerializerMethodField()
 
     class Meta:
         model = Municipality
         fields = [
             "id", "name", "district", "state", "latitude", "longitude", "distance_km",
             "establishment_year", "mayor_name", "commissioner_name", 
-            "wards_count", "area_sq_km", "population", "description"
+            "wards_count", "area_sq_km", "population", "description", "enrichment_pending"
         ]
 
+    def get_enrichment_pending(self, obj):
+        # Details are being fetched in the background (account/enrichment.py)
+        return enrichment_pending(obj)
+
     def get_distance_km(self, obj):
+        # Set by Profile.get_nearby_municipalities from the spatial index
+        if getattr(obj, "distance_km", None) is not None:
+            return round(obj.distance_km, 2)
         user_coords = self.context.get("user_coords")
         if user_coords:
             muni_coords = (float(obj.latitude), float(obj.longitude))
@@ -1,18 +1,31 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import Profile
+from .geocoding import municipality_assignment
+from .models import Municipality, Profile, bump_stats_version
+from .spatial_index import invalidate_municipality_index
 
 @receiver(post_save, sender=User)
-def create_or_update_profile(sender, instance, created, **kwargs):
+def create_profile(sender, instance, created, **kwargs):
     if created:
-        
         Profile.objects.create(user=instance)
-    else:
-        instance.profile.save()
 
 
 @receiver(post_save, sender=Profile)
 def assign_municipality_on_save(sender, instance, created, **kwargs):
-    if instance.latitude and instance.longitude:
-        instance.assign_nearest_municipality()
\ No newline at end of file
+    # Only new coordinates need a (slow) reverse geocode; it runs after commit
+    if getattr(instance, '_coordinates_changed', False) and instance.latitude and instance.longitude:
+        municipality_assignment.submit_on_commit(instance.pk)
+
+
+@receiver(post_save, sender=Municipality)
+@receiver(post_delete, sender=Municipality)
+def invalidate_municipality_index_on_change(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or {'latitude', 'longitude'} & set(update_fields):
+        invalidate_municipality_index()
+
+
+@receiver(post_save, sender=Municipality)
+def bump_stats_version_on_change(sender, instance, **kwargs):
+    bump_stats_version(instance.pk)
+    instance.refresh_from_db(fields=['stats_version'])
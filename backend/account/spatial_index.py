@@ -0,0 +1,97 @@
+"""
+In-process nearest-neighbour index over municipality coordinates.
+
+Municipalities are stored as unit vectors on the sphere in one contiguous
+array; a query is a single matrix-vector product followed by a partial sort,
+which answers k-nearest-within-radius lookups in microseconds for the few
+thousand municipalities we hold (faster than a Python-level tree walk at
+this size). The index is built lazily per process, dropped by the
+Municipality save/delete signals and rebuilt after MUNICIPALITY_INDEX_TTL
+seconds as a safety net for writes made by other processes.
+"""
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+
+from .geo import EARTH_RADIUS_KM
+
+_lock = threading.Lock()
+_index = None
+
+
+def _unit_vectors(lats, lons):
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lon = np.radians(np.asarray(lons, dtype=np.float64))
+    cos_lat = np.cos(lat)
+    return np.column_stack((cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)))
+
+
+class MunicipalityIndex:
+
+    def __init__(self, ids, lats, lons):
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.vectors = _unit_vectors(lats, lons) if len(self.ids) else np.empty((0, 3))
+        self.built_at = time.monotonic()
+
+    @classmethod
+    def build(cls):
+        from .models import Municipality
+
+        rows = list(
+            Municipality.objects.filter(latitude__isnull=False, longitude__isnull=False)
+            .annotate(lat=Cast('latitude', FloatField()), lon=Cast('longitude', FloatField()))
+            .values_list('id', 'lat', 'lon')
+        )
+        if not rows:
+            return cls([], [], [])
+        ids, lats, lons = zip(*rows)
+        return cls(ids, lats, lons)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def query(self, lat, lon, k=5, radius_km=None):
+        """
+        Returns up to ``k`` ``(municipality_id, distance_km)`` pairs, nearest
+        first, optionally limited to ``radius_km``.
+        """
+        if not len(self.ids) or k <= 0:
+            return []
+
+        target = _unit_vectors([lat], [lon])[0]
+        cosines = np.clip(self.vectors @ target, -1.0, 1.0)
+
+        if k < len(cosines):
+            candidates = np.argpartition(-cosines, k - 1)[:k]
+        else:
+            candidates = np.arange(len(cosines))
+        distances = EARTH_RADIUS_KM * np.arccos(cosines[candidates])
+
+        order = np.argsort(distances)
+        candidates, distances = candidates[order], distances[order]
+        if radius_km is not None:
+            keep = distances <= radius_km
+            candidates, distances = candidates[keep], distances[keep]
+
+        return [(int(self.ids[i]), float(d)) for i, d in zip(candidates, distances)]
+
+
+def get_municipality_index():
+    global _index
+    ttl = getattr(settings, 'MUNICIPALITY_INDEX_TTL', 300)
+    index = _index
+    if index is None or time.monotonic() - index.built_at > ttl:
+        with _lock:
+            index = _index
+            if index is None or time.monotonic() - index.built_at > ttl:
+                index = _index = MunicipalityIndex.build()
+    return index
+
+
+def invalidate_municipality_index():
+    global _index
+    _index = None
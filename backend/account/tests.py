@@ -1,3 +1,510 @@
-from django.test import TestCase
+import json
+import math
+import random
+import threading
+import time
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from types import SimpleNamespace
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from . import enrichment
+from .enrichment import enrich_municipalities, municipality_enrichment, request_enrichment
+from .geo import EARTH_RADIUS_KM, geohash_cell_size, geohash_cover, geohash_encode, haversine_km
+from .geocoding import GeocodingService
+from .models import Municipality, OverpassTile, Profile, ReverseGeocode
+from .overpass import discover_municipalities
+from .serializers import MunicipalitySerializer
+from .spatial_index import get_municipality_index, invalidate_municipality_index
+
+OVERPASS_ELEMENTS = [
+    {"type": "node", "id": 1, "lat": 20.4625, "lon": 85.8830, "tags": {"name": "Cuttack"}},
+    {"type": "node", "id": 2, "lat": 20.5530, "lon": 85.9240, "tags": {"name": "Choudwar"}},
+    {"type": "relation", "id": 3, "center": {"lat": 20.1800, "lon": 85.6200}, "tags": {"name": "Khurda District"}},
+    {"type": "relation", "id": 4, "center": {"lat": 20.0660, "lon": 85.5000}, "tags": {"name": "Ranpur", "name:en": "Ranpur"}},
+    {"type": "node", "id": 5, "lat": 21.4940, "lon": 86.9330, "tags": {"name": "Balasore"}},
+]
+
+
+class StandInOverpassHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        self.requests_seen.append(self.path)
+        body = json.dumps({"elements": OVERPASS_ELEMENTS}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class OverpassDiscoveryTests(TestCase):
+    """
+    Municipality discovery against a local stand-in Overpass server.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = HTTPServer(("127.0.0.1", 0), StandInOverpassHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.overpass_url = f"http://127.0.0.1:{cls.server.server_port}/api/interpreter"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        StandInOverpassHandler.requests_seen = []
+        patcher = mock.patch("account.overpass.reverse_geocode", return_value=("Cuttack", "Odisha"))
+        self.reverse_geocode = patcher.start()
+        self.addCleanup(patcher.stop)
+        settings_override = override_settings(OVERPASS_URL=self.overpass_url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        # Already known under a different case: must not be duplicated
+        Municipality.objects.create(name="CUTTACK", district="Cuttack", state="Odisha", latitude=20.4625, longitude=85.8830)
+
+    def make_profile(self, username, lat, lon):
+        user = User.objects.create(username=username)
+        profile = user.profile
+        Profile = type(profile)
+        Profile.objects.filter(pk=profile.pk).update(latitude=lat, longitude=lon, location_verified=True)
+        profile.refresh_from_db()
+        return profile
+
+    def test_neighbouring_users_share_one_tile_fetch(self):
+        first = self.make_profile("first", 20.30, 85.82)
+        second = self.make_profile("second", 20.35, 85.90)
+
+        nearby = first.get_nearby_municipalities(count=5, radius_km=50)
+        self.assertEqual({m.name for m in nearby}, {"CUTTACK", "Choudwar", "Ranpur"})
+        self.assertEqual(len(StandInOverpassHandler.requests_seen), 1)
+
+        second.get_nearby_municipalities(count=5, radius_km=50)
+        self.assertEqual(len(StandInOverpassHandler.requests_seen), 1)
+        self.assertEqual(OverpassTile.objects.count(), 1)
+
+        names = sorted(Municipality.objects.values_list("name", flat=True))
+        self.assertEqual(names, ["CUTTACK", "Choudwar", "Ranpur"])
+        self.assertTrue(all(m.geohash for m in Municipality.objects.all()))
+
+    def test_nearby_results_are_sorted_with_distances(self):
+        profile = self.make_profile("citizen", 20.30, 85.82)
+        nearby = profile.get_nearby_municipalities(count=5, radius_km=50)
+        distances = [m.distance_km for m in nearby]
+        self.assertEqual(distances, sorted(distances))
+        self.assertTrue(all(d <= 50 for d in distances))
+
+    def test_expired_tile_is_refetched(self):
+        profile = self.make_profile("citizen", 20.30, 85.82)
+        profile.get_nearby_municipalities(count=5, radius_km=50)
+        OverpassTile.objects.update(fetched_at=timezone.now() - timedelta(days=30))
+        Municipality.objects.exclude(name="CUTTACK").delete()
+
+        profile.get_nearby_municipalities(count=5, radius_km=50)
+        self.assertEqual(len(StandInOverpassHandler.requests_seen), 2)
+
+    def test_concurrent_discovery_does_not_duplicate(self):
+        def other_worker_inserts_first(lat, lon):
+            # Another discovery of the tile commits Choudwar after our known-names check
+            if not Municipality.objects.filter(name="Choudwar").exists():
+                Municipality.objects.create(name="Choudwar", district="Cuttack", state="Odisha",
+                                            latitude=20.5530, longitude=85.9240)
+            return "Cuttack", "Odisha"
+
+        self.reverse_geocode.side_effect = other_worker_inserts_first
+        discovered = discover_municipalities(20.30, 85.82, radius_km=50, limit=5)
+
+        self.assertEqual(sorted(m.name for m, _ in discovered), ["Choudwar", "Ranpur"])
+        self.assertTrue(all(m.pk for m, _ in discovered))
+        self.assertEqual(Municipality.objects.filter(name="Choudwar").count(), 1)
+
+
+class StandInNominatimHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def do_GET(self):
+        self.requests_seen.append(self.path)
+        body = json.dumps({"address": {"city": "Bhubaneswar", "county": "Khordha", "state": "Odisha"}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(GEOCODING_MIN_INTERVAL=0.05)
+class GeocodingServiceTests(TestCase):
+    """
+    Reverse geocoding cache tiers against a local stand-in Nominatim server.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = HTTPServer(("127.0.0.1", 0), StandInNominatimHandler)
+        cls.thread = threading.Thread(target=cls.server.serve_forever, daemon=True)
+        cls.thread.start()
+        cls.nominatim_url = f"http://127.0.0.1:{cls.server.server_port}/reverse"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        StandInNominatimHandler.requests_seen = []
+        settings_override = override_settings(NOMINATIM_URL=self.nominatim_url)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_neighbouring_coordinates_share_one_lookup(self):
+        service = GeocodingService()
+        first = service.reverse(20.29612, 85.82461)
+        second = service.reverse(20.29608, 85.82458)
+
+        self.assertEqual(first["city"], "Bhubaneswar")
+        self.assertEqual(second, first)
+        self.assertEqual(len(StandInNominatimHandler.requests_seen), 1)
+        self.assertEqual(service.stats, {'memory_hits': 1, 'db_hits': 0, 'misses': 1, 'errors': 0})
+
+    def test_persistent_cache_survives_a_new_process(self):
+        GeocodingService().reverse(20.2961, 85.8245)
+        self.assertEqual(ReverseGeocode.objects.get().key, "20.296,85.825")
+
+        service = GeocodingService()
+        service.reverse(20.2961, 85.8245)
+        self.assertEqual(len(StandInNominatimHandler.requests_seen), 1)
+        self.assertEqual(service.stats['db_hits'], 1)
+
+    def test_misses_are_paced(self):
+        service = GeocodingService()
+        start = time.monotonic()
+        for i in range(3):
+            service.reverse(20.0 + i, 85.0)
+        self.assertGreaterEqual(time.monotonic() - start, 0.1)
+        self.assertEqual(len(StandInNominatimHandler.requests_seen), 3)
+
+    @override_settings(GEOCODING_RATE_CACHE_ALIAS='default', GEOCODING_MIN_INTERVAL=0.2)
+    def test_pacing_is_shared_between_processes(self):
+        # Separate services stand in for worker processes: only the rate cache links
+        # them (a process-wide cache here, as the test database is not thread-safe)
+        cache.clear()
+        services = [GeocodingService(), GeocodingService()]
+        started = []
+
+        def fetch(service, i):
+            service.wait_for_slot()
+            started.append(time.time())
+
+        threads = [threading.Thread(target=fetch, args=(services[i % 2], i)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        started.sort()
+        gaps = [later - earlier for earlier, later in zip(started, started[1:])]
+        self.assertEqual(len(gaps), 3)
+        # Wake-up times jitter; the reserved slots themselves are 0.2s apart
+        self.assertTrue(all(gap >= 0.15 for gap in gaps), gaps)
+
+    def test_profile_assignment_uses_the_shared_client(self):
+        user = User.objects.create(username="citizen")
+        profile = user.profile
+        profile.latitude, profile.longitude = 20.2705, 85.8400
+
+        municipality = profile.assign_nearest_municipality()
+        self.assertEqual(municipality.name, "Bhubaneswar")
+        self.assertEqual(municipality.district, "Khordha")
+        self.assertTrue(profile.location_verified)
+
+
+def fake_completion(content):
+    message = SimpleNamespace(content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class MunicipalityEnrichmentTests(TestCase):
+    """
+    Municipality details are fetched in batches in the background, never on a GET.
+    """
+
+    def setUp(self):
+        enrichment.get_cache().clear()
+        self.municipalities = [
+            Municipality.objects.create(name=name, district=name, state="Odisha")
+            for name in ("Puri", "Konark", "Pipili")
+        ]
+        patcher = mock.patch("account.enrichment.client")
+        self.client_mock = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client_mock.api_key = "sk-test"
+
+    def details(self, municipalities):
+        return json.dumps({
+            str(m.id): {"mayor_name": f"Mayor of {m.name}", "population": 1000, "description": f"{m.name} is by the sea."}
+            for m in municipalities
+        })
+
+    def test_one_model_call_enriches_a_batch(self):
+        self.client_mock.chat.completions.create.return_value = fake_completion(self.details(self.municipalities))
+        enrich_municipalities([m.id for m in self.municipalities])
+
+        self.assertEqual(self.client_mock.chat.completions.create.call_count, 1)
+        for municipality in self.municipalities:
+            municipality.refresh_from_db()
+            self.assertEqual(municipality.mayor_name, f"Mayor of {municipality.name}")
+            self.assertEqual(municipality.population, 1000)
+            self.assertGreater(municipality.stats_version, 1)
+
+    def test_requests_are_deduplicated(self):
+        with mock.patch.object(municipality_enrichment, "submit") as submit:
+            self.assertEqual(request_enrichment(self.municipalities[:2]), {m.id for m in self.municipalities[:2]})
+            request_enrichment(self.municipalities)
+        self.assertEqual(sorted(c.args[0] for c in submit.call_args_list), sorted(m.id for m in self.municipalities))
+
+    def test_dashboard_does_not_wait_for_the_model(self):
+        user = User.objects.create(username="citizen")
+        api = APIClient()
+        api.force_authenticate(user)
+        puri = self.municipalities[0]
+
+        with mock.patch.object(municipality_enrichment, "submit") as submit:
+            response = api.get(f"/api/municipalities/{puri.id}/dashboard/")
+        submit.assert_called_once_with(puri.id)
+        self.client_mock.chat.completions.create.assert_not_called()
+        self.assertTrue(response.data['municipality_info']['enrichment_pending'])
+
+        self.client_mock.chat.completions.create.return_value = fake_completion(self.details([puri]))
+        enrich_municipalities([puri.id])
+        response = api.get(f"/api/municipalities/{puri.id}/dashboard/")
+        self.assertFalse(response.data['municipality_info']['enrichment_pending'])
+        self.assertEqual(response.data['municipality_info']['description'], "Puri is by the sea.")
+
+    def test_failed_enrichment_is_not_reported_pending(self):
+        user = User.objects.create(username="citizen")
+        api = APIClient()
+        api.force_authenticate(user)
+        puri = self.municipalities[0]
+
+        with mock.patch.object(municipality_enrichment, "submit") as submit:
+            response = api.get(f"/api/municipalities/{puri.id}/")
+        submit.assert_called_once_with(puri.id)
+        self.assertTrue(response.data['enrichment_pending'])
+
+        self.client_mock.chat.completions.create.side_effect = TimeoutError("model timed out")
+        enrich_municipalities([puri.id])
+        with mock.patch.object(municipality_enrichment, "submit") as submit:
+            self.assertEqual(request_enrichment([puri]), set())
+        submit.assert_not_called()
+        self.assertFalse(MunicipalitySerializer(puri).data['enrichment_pending'])
+
+    def test_markers_are_shared_and_failures_refresh_dashboards(self):
+        puri = self.municipalities[0]
+        with mock.patch.object(municipality_enrichment, "submit"):
+            request_enrichment([puri])
+        self.assertIs(caches['shared'].get(enrichment._marker(puri.id)), True)
+
+        version = Municipality.objects.get(pk=puri.id).stats_version
+        self.client_mock.chat.completions.create.side_effect = TimeoutError("model timed out")
+        enrich_municipalities([puri.id])
+        self.assertIs(caches['shared'].get(enrichment._marker(puri.id)), False)
+        self.assertGreater(Municipality.objects.get(pk=puri.id).stats_version, version)
+
+    def test_malformed_numbers_are_stored_as_null(self):
+        puri = self.municipalities[0]
+        self.client_mock.chat.completions.create.return_value = fake_completion(json.dumps({str(puri.id): {
+            "establishment_year": "approx 1950", "wards_count": "67", "area_sq_km": "about 16.8",
+            "population": "201026", "mayor_name": "S. Das", "description": "Puri is by the sea.",
+        }}))
+        enrich_municipalities([puri.id])
+
+        puri.refresh_from_db()
+        self.assertEqual(
+            (puri.establishment_year, puri.wards_count, puri.area_sq_km, puri.population, puri.mayor_name),
+            (None, 67, None, 201026, "S. Das"),
+        )
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class ProfileMunicipalityAssignmentTests(TestCase):
+    """
+    Municipality assignment runs after commit, and only when coordinates change.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(username="citizen")
+        self.api = APIClient()
+        self.api.force_authenticate(self.user)
+        patcher = mock.patch("account.geocoding.reverse_address", return_value={
+            "city": "Bhubaneswar", "county": "Khordha", "state": "Odisha",
+        })
+        self.reverse_address = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_new_coordinates_are_assigned_once_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            response = self.api.patch("/api/profile/", {"latitude": "20.2705", "longitude": "85.8400"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.reverse_address.call_count, 1)
+
+        profile = Profile.objects.get(user=self.user)
+        self.assertEqual(profile.municipality.name, "Bhubaneswar")
+        self.assertTrue(profile.location_verified)
+
+    def test_other_edits_skip_assignment(self):
+        Profile.objects.filter(user=self.user).update(latitude=20.2705, longitude=85.8400)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.api.patch("/api/profile/", {"bio": "Resident", "latitude": "20.2705"}, format="json")
+            self.user.last_name = "Das"
+            self.user.save()
+        self.assertEqual(callbacks, [])
+        self.reverse_address.assert_not_called()
+
+    def test_assignment_reuses_a_municipality_differing_only_in_case(self):
+        existing = Municipality.objects.create(name="BHUBANESWAR", district="Khordha", state="Odisha")
+        profile = self.user.profile
+        profile.latitude, profile.longitude = 20.2705, 85.8400
+
+        self.assertEqual(profile.assign_nearest_municipality(), existing)
+        self.assertEqual(Municipality.objects.count(), 1)
+
+    def test_user_save_does_not_resave_the_profile(self):
+        with self.assertNumQueries(1):
+            self.user.save(update_fields=["last_login"])
+
+
+def destination(lat, lon, distance_km, bearing):
+    """
+    The point ``distance_km`` from ``(lat, lon)`` along the initial ``bearing`` (degrees).
+    """
+    angle = distance_km / EARTH_RADIUS_KM
+    bearing, lat1, lon1 = math.radians(bearing), math.radians(lat), math.radians(lon)
+    lat2 = math.asin(math.sin(lat1) * math.cos(angle) + math.cos(lat1) * math.sin(angle) * math.cos(bearing))
+    lon2 = lon1 + math.atan2(
+        math.sin(bearing) * math.sin(angle) * math.cos(lat1),
+        math.cos(angle) - math.sin(lat1) * math.sin(lat2),
+    )
+    return math.degrees(lat2), (math.degrees(lon2) + 540) % 360 - 180
+
+
+class GeohashCoverTests(SimpleTestCase):
+    """
+    The geohash cells of a radius query must contain every point of the circle.
+    """
+
+    def assertCovers(self, lat, lon, radius_km):
+        cells = geohash_cover(lat, lon, radius_km)
+        for fraction in (0.3, 0.7, 0.999):
+            for bearing in range(0, 360, 5):
+                point = destination(lat, lon, radius_km * fraction, bearing)
+                geohash = geohash_encode(*point)
+                self.assertTrue(
+                    any(geohash.startswith(cell) for cell in cells),
+                    f"{point} ({fraction} x {radius_km} km from {(lat, lon)}) is outside {cells}",
+                )
+
+    def test_cover_contains_the_whole_circle(self):
+        height, width = geohash_cell_size(6)
+        centers = [
+            (20.4625, 85.8830),
+            # On a cell corner at several precisions
+            (100 * height - 90, 300 * width - 180),
+            (-33.8688, 151.2093),
+        ]
+        for lat, lon in centers:
+            for radius_km in (0.05, 1.0, 25.0):
+                with self.subTest(lat=lat, lon=lon, radius_km=radius_km):
+                    self.assertCovers(lat, lon, radius_km)
+
+    def test_cover_near_the_poles_and_antimeridian(self):
+        for lat, lon in [(78.2232, 15.6267), (89.99, 0.0), (-89.99, 10.0), (0.0, 179.999), (64.0, -179.99)]:
+            for radius_km in (0.5, 1.0, 50.0):
+                with self.subTest(lat=lat, lon=lon, radius_km=radius_km):
+                    self.assertCovers(lat, lon, radius_km)
+
+
+class MunicipalityIndexTests(TestCase):
+    """
+    The in-process index answers like a brute-force scan and follows municipality writes.
+    """
+
+    def setUp(self):
+        invalidate_municipality_index()
+        self.addCleanup(invalidate_municipality_index)
+        rng = random.Random(11)
+        self.municipalities = [
+            Municipality.objects.create(
+                name=f"Town {i}", district="Khordha", state="Odisha",
+                latitude=round(rng.uniform(19.0, 22.0), 6), longitude=round(rng.uniform(84.0, 87.0), 6),
+            )
+            for i in range(60)
+        ]
+
+    def brute_force(self, lat, lon, k, radius_km):
+        lats = [float(m.latitude) for m in self.municipalities]
+        lons = [float(m.longitude) for m in self.municipalities]
+        distances = sorted(zip(haversine_km(lat, lon, lats, lons), (m.id for m in self.municipalities)))
+        return [(pk, float(distance)) for distance, pk in distances[:k] if distance <= radius_km]
+
+    def test_nearest_match_brute_force(self):
+        index = get_municipality_index()
+        for lat, lon, k, radius_km in [(20.27, 85.84, 5, 100), (19.5, 86.5, 3, 40), (21.0, 84.2, 10, 1000), (25.0, 80.0, 5, 50)]:
+            with self.subTest(lat=lat, lon=lon, k=k, radius_km=radius_km):
+                matches = index.query(lat, lon, k=k, radius_km=radius_km)
+                expected = self.brute_force(lat, lon, k, radius_km)
+                self.assertEqual([pk for pk, _ in matches], [pk for pk, _ in expected])
+                for (_, distance), (_, exact) in zip(matches, expected):
+                    self.assertAlmostEqual(distance, exact, places=3)
+
+    def test_saves_and_deletes_rebuild_the_index(self):
+        lat, lon = 20.2705, 85.8400
+        get_municipality_index()
+        town = Municipality.objects.create(name="Bhubaneswar", district="Khordha", state="Odisha", latitude=lat, longitude=lon)
+        self.assertEqual(get_municipality_index().query(lat, lon, k=1)[0][0], town.id)
+
+        town.latitude, town.longitude = 25.0, 80.0
+        town.save()
+        self.assertNotEqual(get_municipality_index().query(lat, lon, k=1)[0][0], town.id)
+
+        index = get_municipality_index()
+        town.mayor_name = "S. Das"
+        town.save(update_fields=["mayor_name"])
+        self.assertIs(get_municipality_index(), index)
+
+        self.assertEqual(get_municipality_index().query(25.0, 80.0, k=1)[0][0], town.id)
+        town.delete()
+        self.assertNotIn(town.id, [pk for pk, _ in get_municipality_index().query(25.0, 80.0, k=60)])
+
+    def test_index_expires_after_ttl(self):
+        index = get_municipality_index()
+        # Written without signals, as another process would be
+        moved = self.municipalities[0]
+        Municipality.objects.filter(pk=moved.pk).update(latitude=25.0, longitude=80.0)
+        with override_settings(MUNICIPALITY_INDEX_TTL=60):
+            self.assertIs(get_municipality_index(), index)
+            with mock.patch("account.spatial_index.time.monotonic", return_value=index.built_at + 61):
+                self.assertEqual(get_municipality_index().query(25.0, 80.0, k=1)[0][0], moved.pk)
 
-# Create your tests here.
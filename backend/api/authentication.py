@@ -1,14 +1,133 @@
+"""
+Token authentication without a database query per request.
+
+``CachedTokenAuthentication`` keeps token -> user snapshots in a small
+per-process TTL cache (AUTH_TOKEN_LOCAL_TTL seconds) in front of a shared
+Django cache (AUTH_TOKEN_CACHE_ALIAS, AUTH_TOKEN_CACHE_TTL seconds). Only
+misses load the token and its user, in one joined query. Snapshots are plain
+dicts of SNAPSHOT_USER_FIELDS, never pickled models, so credentials such as
+the password hash stay out of the cache; other user fields load on access.
+
+Deleting a token (logout) and saving a user (deactivation, staff changes)
+drop their entries from the shared cache and this process's local cache,
+once right away and again after the transaction commits (api/signals.py).
+Other processes may keep serving a local snapshot for up to
+AUTH_TOKEN_LOCAL_TTL seconds, so keep that short. That bound only holds if
+the alias is really shared between processes: a LocMemCache alias is
+per-process, so its entries are kept no longer than the local TTL.
+"""
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.authtoken.models import Token
 
-class CookieTokenAuthentication(TokenAuthentication):
+_local = OrderedDict()
+_local_lock = threading.Lock()
+
+SNAPSHOT_USER_FIELDS = (
+    'id', 'username', 'email', 'first_name', 'last_name', 'is_active', 'is_staff', 'is_superuser',
+)
+
+
+def _cache_key(key):
+    # Raw tokens never appear in cache keys
+    return f"auth-token-snapshot:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+def get_cache():
+    return caches[getattr(settings, 'AUTH_TOKEN_CACHE_ALIAS', 'default')]
+
+
+def shared_ttl(cache):
+    ttl = getattr(settings, 'AUTH_TOKEN_CACHE_TTL', 300)
+    if isinstance(cache, LocMemCache):
+        # Other processes never see this process's invalidations
+        return min(ttl, getattr(settings, 'AUTH_TOKEN_LOCAL_TTL', 10))
+    return ttl
+
+
+def invalidate_tokens(keys):
+    keys = list(keys)
+    with _local_lock:
+        for key in keys:
+            _local.pop(key, None)
+    get_cache().delete_many([_cache_key(key) for key in keys])
+
+
+def clear_local_cache():
+    with _local_lock:
+        _local.clear()
+
+
+def _snapshot(token):
+    return {
+        'key': token.key,
+        'created': token.created,
+        'user': {field: getattr(token.user, field) for field in SNAPSHOT_USER_FIELDS},
+    }
+
+
+def _from_snapshot(snapshot):
+    # Fields missing from the snapshot are deferred, so saving the user never
+    # overwrites them (e.g. the password) with blanks
+    fields = [f.attname for f in User._meta.concrete_fields if f.attname in snapshot['user']]
+    user = User.from_db(None, fields, [snapshot['user'][field] for field in fields])
+    token = Token.from_db(None, ['key', 'user_id', 'created'], [snapshot['key'], user.pk, snapshot['created']])
+    token.user = user
+    return token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    def authenticate_credentials(self, key):
+        snapshot = self.lookup(key)
+        if snapshot is None:
+            raise AuthenticationFailed('Invalid token.')
+        if not snapshot['user']['is_active']:
+            raise AuthenticationFailed('User inactive or deleted.')
+        # Fresh instances per request, so per-request state never leaks between requests
+        token = _from_snapshot(snapshot)
+        return (token.user, token)
+
+    def lookup(self, key):
+        now = time.monotonic()
+        with _local_lock:
+            entry = _local.get(key)
+            if entry is not None and entry[0] > now:
+                _local.move_to_end(key)
+                return entry[1]
+
+        shared = get_cache()
+        snapshot = shared.get(_cache_key(key))
+        if snapshot is None:
+            token = Token.objects.select_related('user').filter(key=key).first()
+            if token is None:
+                return None
+            snapshot = _snapshot(token)
+            shared.set(_cache_key(key), snapshot, shared_ttl(shared))
+
+        with _local_lock:
+            _local[key] = (now + getattr(settings, 'AUTH_TOKEN_LOCAL_TTL', 10), snapshot)
+            _local.move_to_end(key)
+            while len(_local) > getattr(settings, 'AUTH_TOKEN_LOCAL_MAX_ENTRIES', 10000):
+                _local.popitem(last=False)
+        return snapshot
+
+
+class CookieTokenAuthentication(CachedTokenAuthentication):
     def authenticate(self, request):
         token = request.COOKIES.get('auth_token')
         if not token:
             return None
         try:
-            token_obj = Token.objects.get(key=token)
-        except Token.DoesNotExist:
+            return self.authenticate_credentials(token)
+        except AuthenticationFailed:
             raise AuthenticationFailed('Invalid token in cookie')
-        return (token_obj.user, token_obj)
@@ -0,0 +1,86 @@
+"""
+In-process background work queue.
+
+``BatchingWorker`` collects submitted keys (usually primary keys), drops
+duplicates that are still waiting, and hands them to its handler in batches
+of up to ``batch_size`` on a bounded thread pool. A batch is dispatched as
+soon as it is full or ``max_wait`` seconds after its first key arrived.
+
+With ``BACKGROUND_TASKS_EAGER = True`` the handler runs synchronously in the
+caller instead, which keeps tests deterministic.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+
+class BatchingWorker:
+
+    def __init__(self, name, handler, batch_size=10, max_wait=0.5, max_workers=2):
+        self.name = name
+        self.handler = handler
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.max_workers = max_workers
+        self.pending = {}  # insertion-ordered set of keys
+        self._condition = threading.Condition()
+        self._slots = threading.BoundedSemaphore(max_workers)
+        self._executor = None
+        self._dispatcher = None
+
+    def submit(self, key):
+        if getattr(settings, 'BACKGROUND_TASKS_EAGER', False):
+            self.handler([key])
+            return
+
+        with self._condition:
+            if key in self.pending:
+                return
+            self.pending[key] = None
+            if self._dispatcher is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=self.name)
+                self._dispatcher = threading.Thread(target=self._dispatch, name=f"{self.name}-dispatcher", daemon=True)
+                self._dispatcher.start()
+            self._condition.notify()
+
+    def submit_on_commit(self, key):
+        """
+        Submits ``key`` once the current transaction commits, so the worker
+        never sees rows that are not yet visible (or were rolled back).
+        """
+        transaction.on_commit(lambda: self.submit(key))
+
+    def _next_batch(self):
+        with self._condition:
+            while not self.pending:
+                self._condition.wait()
+            deadline = time.monotonic() + self.max_wait
+            while len(self.pending) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            batch = list(self.pending)[:self.batch_size]
+            for key in batch:
+                del self.pending[key]
+            return batch
+
+    def _dispatch(self):
+        while True:
+            batch = self._next_batch()
+            # Blocks while every worker is busy, so keys keep coalescing into the next batch
+            self._slots.acquire()
+            self._executor.submit(self._run, batch)
+
+    def _run(self, batch):
+        close_old_connections()
+        try:
+            self.handler(batch)
+        except Exception as e:
+            print(f"❌ {self.name} failed for {batch}: {e}")
+        finally:
+            close_old_connections()
+            self._slots.release()
@@ -0,0 +1,76 @@
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory
+from rest_framework.views import APIView
+
+from api.authentication import CachedTokenAuthentication, clear_local_cache, get_cache
+
+
+class PingView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response({'user': request.user.pk})
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks per-request authentication overhead on a lightweight endpoint: "
+        "DRF TokenAuthentication against CachedTokenAuthentication. The benchmark "
+        "user and token are created inside a transaction that is rolled back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            user = User.objects.create(username=f"bench_{time.time_ns()}")
+            token = Token.objects.create(user=user)
+            self.run(token, options)
+            transaction.set_rollback(True)
+
+    def run(self, token, options):
+        factory = APIRequestFactory()
+        count = options['requests']
+
+        results = {}
+        for name, auth_class in (("token", TokenAuthentication), ("cached token", CachedTokenAuthentication)):
+            view = PingView.as_view(authentication_classes=[auth_class])
+            clear_local_cache()
+            get_cache().clear()
+
+            def call():
+                response = view(factory.get('/ping/', HTTP_AUTHORIZATION=f"Token {token.key}"))
+                assert response.status_code == 200, response.status_code
+
+            call()  # warm up (fills the caches)
+            with CaptureQueriesContext(connection) as queries:
+                call()
+
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                for _ in range(count):
+                    call()
+                timings.append((time.perf_counter() - start) * 1e6 / count)
+            results[name] = statistics.median(timings)
+            self.stdout.write(
+                f"{name:>12}: median {results[name]:.1f} µs/request, "
+                f"{len(queries)} queries/request over {options['repeat']} x {count} requests"
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Authentication overhead drops by {results['token'] - results['cached token']:.1f} µs/request "
+            f"(x{results['token'] / results['cached token']:.1f} faster)"
+        ))
@@ -0,0 +1,30 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_tokens
+
+
+def _invalidate(keys):
+    keys = list(keys)
+    if not keys:
+        return
+    invalidate_tokens(keys)
+    # A concurrent request may re-cache the pre-commit rows until this commits
+    transaction.on_commit(lambda: invalidate_tokens(keys))
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    _invalidate([instance.key])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_tokens(sender, instance, **kwargs):
+    # Cached snapshots carry is_active, is_staff etc.; refresh them on any change
+    if kwargs.get('update_fields') == frozenset({'last_login'}):
+        return
+    _invalidate(Token.objects.filter(user_id=instance.pk).values_list('key', flat=True))
@@ -1,3 +1,84 @@
-from django.test import TestCase
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from .authentication import CachedTokenAuthentication, _cache_key, _snapshot, clear_local_cache, get_cache, shared_ttl
+
+
+class CachedTokenAuthenticationTests(TestCase):
+    """
+    Token lookups are served from cache and invalidated on logout and deactivation.
+    """
+
+    def setUp(self):
+        clear_local_cache()
+        get_cache().clear()
+        self.user = User.objects.create_user(username="citizen", password="secret")
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_repeated_requests_skip_the_token_query(self):
+        self.assertEqual(self.client.get("/api/protected/").status_code, 200)
+        # Only the view's own profile lookup remains
+        with self.assertNumQueries(1):
+            response = self.client.get("/api/protected/")
+        self.assertEqual(response.data['user_details']['username'], "citizen")
+
+    def test_shared_cache_serves_other_processes(self):
+        self.client.get("/api/protected/")
+        clear_local_cache()  # as seen from a fresh worker
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get("/api/protected/").status_code, 200)
+        self.assertFalse([q for q in queries if 'authtoken_token' in q['sql']])
+
+    @override_settings(AUTH_TOKEN_CACHE_ALIAS='default', AUTH_TOKEN_CACHE_TTL=300, AUTH_TOKEN_LOCAL_TTL=10)
+    def test_process_local_alias_is_capped_to_local_ttl(self):
+        self.assertEqual(shared_ttl(get_cache()), 10)
+        with override_settings(AUTH_TOKEN_CACHE_ALIAS='shared'):
+            self.assertEqual(shared_ttl(get_cache()), 300)
+
+    def test_revocation_is_repeated_after_commit(self):
+        self.client.get("/api/protected/")
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            self.user.is_active = False
+            self.user.save()
+        # A concurrent request cached the pre-commit snapshot meanwhile
+        stale = Token.objects.select_related('user').get(key=self.token.key)
+        stale.user.is_active = True
+        get_cache().set(_cache_key(self.token.key), _snapshot(stale))
+
+        for callback in callbacks:
+            callback()
+        clear_local_cache()
+        self.assertEqual(self.client.get("/api/protected/").status_code, 401)
+
+    def test_cache_holds_no_credentials(self):
+        self.client.get("/api/protected/")
+        snapshot = get_cache().get(_cache_key(self.token.key))
+        self.assertEqual(snapshot['user']['username'], "citizen")
+        self.assertNotIn('password', snapshot['user'])
+        self.assertNotIn(self.user.password, repr(snapshot))
+
+    def test_saving_the_request_user_keeps_uncached_fields(self):
+        self.client.get("/api/protected/")
+        user, _ = CachedTokenAuthentication().authenticate_credentials(self.token.key)
+        user.first_name = "Asha"
+        user.save()
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.first_name, "Asha")
+        self.assertTrue(self.user.check_password("secret"))
+
+    def test_logout_revokes_the_cached_token(self):
+        self.client.get("/api/protected/")
+        self.assertEqual(self.client.post("/api/logout/").status_code, 200)
+        self.assertEqual(self.client.get("/api/protected/").status_code, 401)
+
+    def test_deactivation_revokes_the_cached_token(self):
+        self.client.get("/api/protected/")
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get("/api/protected/").status_code, 401)
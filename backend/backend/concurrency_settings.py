@@ -0,0 +1,13 @@
+"""
+Test settings for tests that race several database connections
+(ConcurrentWriteTests), which in-memory SQLite cannot do:
+
+    python manage.py test --settings=backend.concurrency_settings
+"""
+from .settings import *  # noqa: F401,F403
+
+if DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    DATABASES['default']['TEST'] = {'NAME': BASE_DIR / 'test_db.sqlite3'}
+    # Writers take the lock up front and wait for it, instead of failing with
+    # "database is locked" when two transactions try to upgrade at once
+    DATABASES['default']['OPTIONS'] = {'transaction_mode': 'IMMEDIATE', 'timeout': 20}
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
+from datetime import timedelta
 import os
 
 from dotenv import load_dotenv
@@ -154,13 +155,119 @@ CORS_ALLOWED_ORIGINS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication'
+        'api.authentication.CachedTokenAuthentication'
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
 }
 
+# Keyset pagination for complaint feeds (complaints/pagination.py)
+COMPLAINT_FEED_PAGE_SIZE = 20
+COMPLAINT_FEED_MAX_PAGE_SIZE = 100
+# Write-behind upvotes: toggles are logged and flushed in batches (complaints/upvote_log.py)
+UPVOTE_WRITE_BEHIND = env.bool('UPVOTE_WRITE_BEHIND', default=False)
+UPVOTE_FLUSH_INTERVAL_MS = 200
+UPVOTE_FLUSH_BATCH_SIZE = 50
+# Recent complaints embedded in the municipality dashboard; older ones are paged
+# through /api/municipalities/<pk>/dashboard/recent/
+DASHBOARD_RECENT_COMPLAINTS = 10
+# Largest batch accepted by /api/complaints/bulk-status/ (complaints/status_updates.py)
+BULK_STATUS_UPDATE_MAX_ITEMS = 500
+
+# Seconds before the in-process municipality spatial index is rebuilt (account/spatial_index.py)
+MUNICIPALITY_INDEX_TTL = 300
+
+# Overpass municipality discovery, cached per tile (account/overpass.py)
+OVERPASS_URL = env('OVERPASS_URL', default="https://overpass-api.de/api/interpreter")
+OVERPASS_TILE_DEGREES = 0.5
+OVERPASS_TILE_TTL = timedelta(days=7)
+
+# Shared Nominatim reverse-geocoding client (account/geocoding.py)
+NOMINATIM_URL = env('NOMINATIM_URL', default="https://nominatim.openstreetmap.org/reverse")
+GEOCODING_CACHE_PRECISION = 3  # decimals, ~110 m
+GEOCODING_LRU_SIZE = 1024
+GEOCODING_MIN_INTERVAL = 1.0  # seconds between requests, per Nominatim usage policy
+# Request slots are reserved here so all workers together respect that interval
+GEOCODING_RATE_CACHE_ALIAS = 'shared'
+
+# In-process background workers (api/background.py); eager runs tasks inline
+BACKGROUND_TASKS_EAGER = env.bool('BACKGROUND_TASKS_EAGER', default=False)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Parsed LLM responses keyed by content hash (complaints/llm_cache.py).
+    # Point this at a shared backend (e.g. Redis) to share entries between workers.
+    'llm': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'llm-responses',
+        'TIMEOUT': 60 * 60 * 24 * 7,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    # Dashboard payloads keyed by municipality stats_version (account/caching.py)
+    'dashboards': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'dashboards',
+        'OPTIONS': {'MAX_ENTRIES': 2000},
+    },
+    # State every worker process must agree on: Nominatim request slots,
+    # token revocations and queued enrichments. The table is created by api/migrations/0006; point
+    # this at Redis or Memcached in production for lower latency.
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'shared_cache',
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    },
+}
+
+# Token -> user snapshots used by CachedTokenAuthentication (api/authentication.py).
+# The local TTL bounds how long other workers may accept a revoked token, as long
+# as the alias is shared between them (a LocMemCache alias is capped to that TTL).
+AUTH_TOKEN_CACHE_ALIAS = 'shared'
+AUTH_TOKEN_CACHE_TTL = 300
+AUTH_TOKEN_LOCAL_TTL = 10
+
+DASHBOARD_CACHE_ALIAS = 'dashboards'
+# Upper bound on the age of a cached dashboard (scores decay with time)
+DASHBOARD_CACHE_TTL = 300
+
+# Background municipality assignment for profiles with new coordinates (account/geocoding.py)
+MUNICIPALITY_ASSIGNMENT_BATCH_SIZE = 10
+MUNICIPALITY_ASSIGNMENT_MAX_WAIT = 0.5
+
+# Background AI enrichment of municipality details (account/enrichment.py)
+ENRICHMENT_BATCH_SIZE = 5  # municipalities per model call
+ENRICHMENT_MAX_WAIT = 0.5
+ENRICHMENT_WORKERS = 2
+ENRICHMENT_TIMEOUT = 60
+ENRICHMENT_RETRY_AFTER = 600  # seconds before a municipality is queued again
+# Holds the per-municipality "queued" markers, so must be shared between workers
+ENRICHMENT_CACHE_ALIAS = 'shared'
+
+# Background AI priority scoring of new complaints (complaints/ai.py)
+PRIORITY_SCORING_BATCH_SIZE = 8
+PRIORITY_SCORING_MAX_WAIT = 1.0  # seconds a batch waits to fill up
+PRIORITY_SCORING_WORKERS = 2
+PRIORITY_SCORING_TIMEOUT = 30  # seconds per model call
+# "remote", "local" or "local_first" (local classifier, escalating borderline scores)
+PRIORITY_SCORING_MODE = env('PRIORITY_SCORING_MODE', default='local_first')
+PRIORITY_BORDERLINE_BAND = (0.1, 0.35)
+# Trained by manage.py train_priority_classifier (complaints/classifier.py)
+PRIORITY_CLASSIFIER_PATH = BASE_DIR / 'complaints' / 'ml' / 'priority_classifier.npz'
+
+# Estimated Jaccard similarity (character 4-shingles) at which check_similar
+# reports a nearby complaint as a duplicate (complaints/minhash.py)
+DUPLICATE_JACCARD_THRESHOLD = 0.3
+
+# Memory-mapped per-municipality complaint embeddings (complaints/embeddings.py)
+COMPLAINT_EMBEDDINGS_DIR = BASE_DIR / 'complaints' / 'ml' / 'embeddings'
+# Most similar nearby complaints sent to the model for confirmation
+COMPLAINT_SIMILARITY_CANDIDATES = 5
+# Cosine similarity at which a candidate counts as similar without the model
+COMPLAINT_EMBEDDING_MATCH_THRESHOLD = 0.6
+
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR/'staticfiles'
 STATICFILES_DIRS = [
@@ -0,0 +1,189 @@
+"""
+AI priority scoring for new complaints.
+
+Complaints are saved with a provisional priority and ``scoring_status``
+"Pending"; ``priority_scoring`` then scores them in the background, several
+descriptions per model call, and applies the result (including spam
+rejection) with ``Complaint.apply_priority_score``.
+
+PRIORITY_SCORING_MODE picks the scorer: "remote" (the chat model, with the
+local classifier as fallback), "local" (complaints/classifier.py only) or
+"local_first" (local, escalating scores inside PRIORITY_BORDERLINE_BAND to
+the remote model).
+
+Parsed model answers are cached by content (complaints/llm_cache.py); bump
+the prompt versions below whenever a prompt changes meaningfully.
+"""
+import json
+import os
+
+from django.conf import settings
+from openai import OpenAI
+
+from api.background import BatchingWorker
+from . import llm_cache
+from .classifier import get_priority_classifier
+from .models import Complaint
+
+PRIORITY_MODEL = "gpt-4o-mini"
+PRIORITY_PROMPT_VERSION = 1
+SIMILARITY_MODEL = "gpt-4o-mini"
+SIMILARITY_PROMPT_VERSION = 1
+
+client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+
+def score_descriptions(descriptions):
+    """
+    Scores every description in a single model call. Returns one float in
+    [0, 1] per description, in order.
+    """
+    numbered = "\n".join(f'{i}. "{description}"' for i, description in enumerate(descriptions, start=1))
+    prompt = f"""
+    You are a municipal issue prioritization assistant.
+    For each numbered citizen complaint below, rate the urgency or severity
+    as a float between 0 and 1 (0 = trivial/spam, 1 = extremely urgent).
+
+    Complaints:
+    {numbered}
+
+    Output ONLY a JSON array with exactly {len(descriptions)} numbers, in the same order. No explanation.
+    """
+    response = client.chat.completions.create(
+        model=PRIORITY_MODEL,
+        messages=[
+            {"role": "system", "content": "You output only a JSON array of floats between 0 and 1."},
+            {"role": "user", "content": prompt},
+        ],
+        temperature=0.2,
+        timeout=getattr(settings, 'PRIORITY_SCORING_TIMEOUT', 30),
+    )
+    text = response.choices[0].message.content.strip()
+    scores = json.loads(text)
+    if not isinstance(scores, list) or len(scores) != len(descriptions):
+        raise ValueError(f"Expected {len(descriptions)} scores, got: {text[:100]}")
+    return [max(0.0, min(float(score), 1.0)) for score in scores]
+
+
+def cached_priority_scores(descriptions):
+    """
+    Like ``score_descriptions``, but answers repeated descriptions from the
+    LLM cache and only sends the rest to the model.
+    """
+    keys = [llm_cache.cache_key("priority", PRIORITY_MODEL, PRIORITY_PROMPT_VERSION, d) for d in descriptions]
+    scores = [llm_cache.lookup("priority", key) for key in keys]
+    missing = [i for i, score in enumerate(scores) if score is None]
+    if missing:
+        fresh = score_descriptions([descriptions[i] for i in missing])
+        for i, score in zip(missing, fresh):
+            scores[i] = score
+            llm_cache.store(keys[i], score)
+    return scores
+
+
+def find_similar_ids(description, candidates):
+    """
+    Asks the model which of the ``candidates`` (complaints) describe the same
+    issue as ``description``. Returns their ids (none without an API key).
+    """
+    if not client.api_key:
+        return []
+
+    lines = [f"ID {c.id}: {c.topic}: {c.description}" for c in candidates]
+    key = llm_cache.cache_key("similarity", SIMILARITY_MODEL, SIMILARITY_PROMPT_VERSION, description, *lines)
+    cached = llm_cache.lookup("similarity", key)
+    if cached is not None:
+        return cached
+
+    # Prepare context for AI
+    candidate_text = "\n".join(lines)
+    prompt = f"""
+    I have a new complaint: "{description}"
+
+    Here are existing nearby complaints:
+    {candidate_text}
+
+    Identify which of the existing complaints are semantically similar to the new one.
+    Return ONLY a JSON array of IDs of the similar complaints. If none, return [].
+    Example output: [12, 15] or []
+    """
+
+    response = client.chat.completions.create(
+        model=SIMILARITY_MODEL,
+        messages=[
+            {"role": "system", "content": "You are a duplicate detection system. Output only JSON."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.0
+    )
+
+    content = response.choices[0].message.content.strip()
+    # Clean up potential markdown formatting like ```json ... ```
+    if content.startswith("```"):
+        content = content.replace("```json", "").replace("```", "")
+
+    similar_ids = [int(i) for i in json.loads(content)]
+    llm_cache.store(key, similar_ids)
+    return similar_ids
+
+
+def score_complaints(complaints):
+    """
+    Priority scores for ``complaints`` following PRIORITY_SCORING_MODE, as
+    ``(score, scored_by)`` pairs: the float (or ``None`` when no scorer
+    produced one) and "remote" or "local".
+    """
+    mode = getattr(settings, 'PRIORITY_SCORING_MODE', 'remote')
+    low, high = getattr(settings, 'PRIORITY_BORDERLINE_BAND', (0.1, 0.35))
+    classifier = get_priority_classifier()
+
+    scores = [None] * len(complaints)
+    sources = [None] * len(complaints)
+    if classifier and mode in ('local', 'local_first'):
+        scores = [classifier.predict(c.description, c.department) for c in complaints]
+        sources = ['local'] * len(complaints)
+
+    if mode == 'local' or not client.api_key:
+        escalate = []
+    elif mode == 'local_first':
+        escalate = [i for i, score in enumerate(scores) if score is None or low <= score <= high]
+    else:
+        escalate = list(range(len(complaints)))
+
+    if escalate:
+        try:
+            remote = cached_priority_scores([complaints[i].description for i in escalate])
+            for i, score in zip(escalate, remote):
+                scores[i], sources[i] = score, 'remote'
+        except Exception as e:
+            print(f"❌ Remote priority scoring failed for {len(escalate)} complaints: {e}")
+
+    # Fall back to the local model for anything still unscored
+    if classifier:
+        for i, complaint in enumerate(complaints):
+            if scores[i] is None:
+                scores[i], sources[i] = classifier.predict(complaint.description, complaint.department), 'local'
+    return list(zip(scores, sources))
+
+
+def score_pending_complaints(complaint_ids):
+    complaints = list(
+        Complaint.objects.filter(pk__in=complaint_ids, scoring_status=Complaint.SCORING_PENDING)
+        .only('id', 'user_id', 'description', 'department', 'priority', 'status')
+    )
+    to_score = [c for c in complaints if c.description]
+    for complaint in complaints:
+        if not complaint.description:
+            complaint.apply_priority_score(Complaint.PROVISIONAL_PRIORITY, scored_by='default')
+
+    for complaint, (score, scored_by) in zip(to_score, score_complaints(to_score)):
+        complaint.apply_priority_score(score, scored_by=scored_by)
+
+
+priority_scoring = BatchingWorker(
+    "priority-scoring",
+    score_pending_complaints,
+    batch_size=getattr(settings, 'PRIORITY_SCORING_BATCH_SIZE', 8),
+    max_wait=getattr(settings, 'PRIORITY_SCORING_MAX_WAIT', 1.0),
+    max_workers=getattr(settings, 'PRIORITY_SCORING_WORKERS', 2),
+)
@@ -0,0 +1,267 @@
+"""
+Streaming bulk import of historical complaints.
+
+Records come from a CSV file or NDJSON (one JSON object per line) and are
+read lazily, validated ``chunk_size`` at a time with
+``ComplaintImportSerializer``. Each valid chunk is written in a single
+transaction with batched inserts: the authors (users and profiles created
+on the fly by username), the complaints, their status history and their
+reviews. ``bulk_create`` replaces the original ``created_at``/``updated_at``
+values with ``auto_now``/``auto_now_add`` ones, so they are written back
+with ``bulk_update`` in the same transaction. Both steps need the primary
+keys returned by the insert, which some backends (MySQL) cannot do.
+
+Batched inserts skip ``Complaint.save()`` and the model signals, so each
+chunk also does their work in bulk:
+- geohash, MinHash and ``rank_score`` (from the original ``created_at``)
+  are computed up front;
+- LSH buckets are indexed and embeddings stored after commit;
+- the dashboard rollups are updated and ``stats_version`` is bumped.
+
+Rows without a ``priority`` are saved with the provisional priority and
+``scoring_status`` "Pending". AI scoring is a separate batch stage, run by
+``score_pending_complaints`` or queued on ``priority_scoring``.
+
+Recognized fields: username, department, topic, description, location,
+latitude, longitude, status, priority, created_at, updated_at,
+review_rating, review_feedback, review_created_at and, in NDJSON only,
+``activities`` (a list of previous_status/new_status/remarks/updated_at).
+Without ``activities``, a complaint whose status is not Pending gets a
+single Pending -> status activity at its ``updated_at``.
+"""
+import csv
+import json
+import time
+from decimal import Decimal
+from itertools import islice
+
+from django.contrib.auth.models import User
+from django.db import NotSupportedError, connection, transaction
+from rest_framework import serializers
+
+from account.geo import geohash_encode
+from account.models import Profile, bump_stats_version
+from review.models import Review
+from . import rollups
+from .embeddings import store_embeddings
+from .minhash import index_complaints, minhash_signature
+from .models import Complaint, ComplaintActivity
+
+FORMATS = ('csv', 'ndjson')
+MAX_REPORTED_ERRORS = 100
+
+
+class ActivityImportSerializer(serializers.Serializer):
+    previous_status = serializers.ChoiceField(choices=Complaint.STATUS_CHOICES)
+    new_status = serializers.ChoiceField(choices=Complaint.STATUS_CHOICES)
+    remarks = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    updated_at = serializers.DateTimeField()
+
+
+class ComplaintImportSerializer(serializers.Serializer):
+    username = serializers.CharField(max_length=150)
+    department = serializers.ChoiceField(choices=Complaint.DEPARTMENTS)
+    topic = serializers.CharField(max_length=200)
+    description = serializers.CharField()
+    location = serializers.CharField(max_length=255)
+    latitude = serializers.FloatField(min_value=-90, max_value=90)
+    longitude = serializers.FloatField(min_value=-180, max_value=180)
+    status = serializers.ChoiceField(choices=Complaint.STATUS_CHOICES, default='Pending')
+    priority = serializers.FloatField(min_value=0, max_value=9.99, required=False, allow_null=True)
+    created_at = serializers.DateTimeField()
+    updated_at = serializers.DateTimeField(required=False, allow_null=True)
+    review_rating = serializers.IntegerField(min_value=1, max_value=5, required=False, allow_null=True)
+    review_feedback = serializers.CharField(required=False, allow_blank=True, allow_null=True)
+    review_created_at = serializers.DateTimeField(required=False, allow_null=True)
+    activities = ActivityImportSerializer(many=True, required=False)
+
+    def validate(self, data):
+        data['updated_at'] = data.get('updated_at') or data['created_at']
+        if data['updated_at'] < data['created_at']:
+            raise serializers.ValidationError("updated_at is before created_at")
+        return data
+
+
+def detect_format(filename, default='csv'):
+    name = (filename or '').lower()
+    if name.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    if name.endswith('.csv'):
+        return 'csv'
+    return default
+
+
+def read_records(stream, fmt):
+    """
+    Yields ``(row_number, record, error)`` for each row of a text stream,
+    with ``record`` ``None`` when the row could not be parsed.
+    """
+    if fmt == 'csv':
+        for number, row in enumerate(csv.DictReader(stream), start=1):
+            # Empty cells are missing values
+            yield number, {key.strip(): value.strip() for key, value in row.items() if key and value and value.strip()}, None
+        return
+
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield number, None, f"invalid JSON: {e}"
+            continue
+        if isinstance(record, dict):
+            yield number, record, None
+        else:
+            yield number, None, "expected a JSON object"
+
+
+def _bulk_create_keeping_timestamps(model, objs, batch_size):
+    """
+    ``bulk_create`` that keeps the values set on the auto_now/auto_now_add
+    fields of ``objs``, writing them back once the primary keys are known.
+    """
+    timestamp_fields = [
+        field.attname for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False)
+    ]
+    timestamps = [[getattr(obj, name) for name in timestamp_fields] for obj in objs]
+    model._base_manager.bulk_create(objs, batch_size=batch_size)
+    if not objs or not timestamp_fields:
+        return
+    for obj, values in zip(objs, timestamps):
+        for name, value in zip(timestamp_fields, values):
+            setattr(obj, name, value)
+    model._base_manager.bulk_update(objs, timestamp_fields, batch_size=batch_size)
+
+
+def _authors(usernames):
+    """
+    ``{username: user_id}`` and ``{user_id: profile_id}``, creating missing users and profiles.
+    """
+    users = dict(User.objects.filter(username__in=usernames).values_list('username', 'id'))
+    missing = [User(username=name) for name in sorted(set(usernames) - set(users))]
+    for user in missing:
+        user.set_unusable_password()
+    # bulk_create skips the post_save signal that normally creates the profile
+    User.objects.bulk_create(missing)
+    users.update((user.username, user.id) for user in missing)
+
+    profiles = dict(Profile.objects.filter(user_id__in=users.values()).values_list('user_id', 'id'))
+    new_profiles = [Profile(user_id=user_id) for user_id in set(users.values()) - set(profiles)]
+    Profile.objects.bulk_create(new_profiles)
+    profiles.update((profile.user_id, profile.id) for profile in new_profiles)
+    return users, profiles
+
+
+def _write_chunk(records, municipality, batch_size):
+    """
+    Writes one chunk of validated records; returns ``(complaints, activities, reviews)``.
+    """
+    users, profiles = _authors({r['username'] for r in records})
+
+    complaints = []
+    for r in records:
+        priority = Complaint.PROVISIONAL_PRIORITY if r.get('priority') is None else round(r['priority'], 2)
+        complaints.append(Complaint(
+            user_id=users[r['username']],
+            municipality=municipality,
+            department=r['department'],
+            topic=r['topic'],
+            description=r['description'],
+            location=r['location'],
+            latitude=Decimal(str(round(r['latitude'], 15))),
+            longitude=Decimal(str(round(r['longitude'], 15))),
+            geohash=geohash_encode(r['latitude'], r['longitude']),
+            minhash=minhash_signature(r['description']),
+            status=r['status'],
+            priority=Decimal(str(priority)),
+            scoring_status=Complaint.SCORING_PENDING if r.get('priority') is None else 'Scored',
+            scored_by=None if r.get('priority') is None else 'imported',
+            rank_score=Complaint.rank_key(priority, 0, r['created_at']),
+            created_at=r['created_at'],
+            updated_at=r['updated_at'],
+        ))
+    _bulk_create_keeping_timestamps(Complaint, complaints, batch_size)
+
+    activities, reviews = [], []
+    for r, complaint in zip(records, complaints):
+        history = r.get('activities')
+        if history is None and r['status'] != 'Pending':
+            history = [{'previous_status': 'Pending', 'new_status': r['status'],
+                        'remarks': "Imported", 'updated_at': r['updated_at']}]
+        activities += [ComplaintActivity(complaint_id=complaint.pk, **entry) for entry in history or ()]
+        if r.get('review_rating') is not None:
+            reviews.append(Review(
+                complaint_id=complaint.pk,
+                user_id=profiles[complaint.user_id],
+                rating=r['review_rating'],
+                feedback=r.get('review_feedback') or "",
+                created_at=r.get('review_created_at') or r['updated_at'],
+            ))
+    _bulk_create_keeping_timestamps(ComplaintActivity, activities, batch_size)
+    _bulk_create_keeping_timestamps(Review, reviews, batch_size)
+
+    index_complaints(complaints)
+    rollups.apply(added=rollups.capture([c.pk for c in complaints]).values())
+    transaction.on_commit(lambda: store_embeddings(complaints))
+    return complaints, activities, reviews
+
+
+def import_complaints(stream, fmt, municipality, chunk_size=1000, progress=None, on_chunk=None):
+    """
+    Imports every record of ``stream`` into ``municipality`` and returns
+    the run's statistics. ``progress(stats)`` is called after each chunk
+    and ``on_chunk(complaints)`` with each chunk's saved complaints, from
+    inside its transaction.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format {fmt!r}, expected one of {', '.join(FORMATS)}")
+    if not connection.features.can_return_rows_from_bulk_insert:
+        # Users, complaints and their timestamps are all written by primary key
+        raise NotSupportedError(f"Bulk import needs the primary keys of bulk inserts, which {connection.vendor} does not return")
+
+    stats = {'rows': 0, 'imported': 0, 'skipped': 0, 'activities': 0, 'reviews': 0,
+             'pending_scoring': 0, 'errors': [], 'seconds': 0.0, 'rows_per_second': 0.0}
+    started = time.monotonic()
+
+    def skip(number, error):
+        stats['skipped'] += 1
+        if len(stats['errors']) < MAX_REPORTED_ERRORS:
+            stats['errors'].append({'row': number, 'error': error})
+
+    # One serializer validates every row, so its fields are only built once
+    validator = ComplaintImportSerializer()
+    rows = read_records(stream, fmt)
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+        stats['rows'] += len(chunk)
+
+        valid = []
+        for number, record, error in chunk:
+            if record is None:
+                skip(number, error)
+                continue
+            try:
+                valid.append(validator.run_validation(record))
+            except serializers.ValidationError as e:
+                skip(number, e.detail)
+
+        if valid:
+            with transaction.atomic():
+                complaints, activities, reviews = _write_chunk(valid, municipality, chunk_size)
+                bump_stats_version(municipality.pk)
+                if on_chunk:
+                    on_chunk(complaints)
+            stats['imported'] += len(complaints)
+            stats['activities'] += len(activities)
+            stats['reviews'] += len(reviews)
+            stats['pending_scoring'] += sum(c.scoring_status == Complaint.SCORING_PENDING for c in complaints)
+
+        stats['seconds'] = round(time.monotonic() - started, 3)
+        stats['rows_per_second'] = round(stats['rows'] / stats['seconds'], 1) if stats['seconds'] else 0.0
+        if progress:
+            progress(stats)
+    return stats
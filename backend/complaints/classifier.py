@@ -0,0 +1,111 @@
+"""
+Local priority classifier.
+
+A linear model over hashed word n-gram features (plus the department),
+trained offline by ``manage.py train_priority_classifier`` from complaints
+whose priority came from the remote model. Scoring one complaint is a few
+dozen hash lookups and a dot product, well under a millisecond, so it can
+run inline as a fast path or as a fallback when the remote call fails. The
+model is stored as an ``.npz`` file at PRIORITY_CLASSIFIER_PATH and loaded
+once per process.
+"""
+import re
+import threading
+import zlib
+
+import numpy as np
+from django.conf import settings
+
+N_FEATURES = 2 ** 18
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+_lock = threading.Lock()
+_classifier = None
+_loaded = False
+
+
+def features(description, department=""):
+    """
+    Sorted unique hashed feature indices: word unigrams and bigrams of the
+    description, plus the department.
+    """
+    words = TOKEN_RE.findall((description or "").lower())
+    grams = words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+    grams.append(f"department={department or ''}")
+    return np.unique(np.fromiter(
+        (zlib.crc32(gram.encode()) % N_FEATURES for gram in grams),
+        dtype=np.int64, count=len(grams),
+    ))
+
+
+def _sigmoid(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+class PriorityClassifier:
+
+    def __init__(self, weights, bias=0.0):
+        self.weights = np.asarray(weights, dtype=np.float64)
+        self.bias = float(bias)
+
+    @classmethod
+    def train(cls, samples, targets, epochs=10, learning_rate=0.5, l2=1e-5, seed=0):
+        """
+        Fits a logistic-output linear model to priorities in [0, 1] with
+        stochastic gradient descent. ``samples`` are ``(description,
+        department)`` pairs.
+        """
+        rows = [features(description, department) for description, department in samples]
+        targets = np.asarray(targets, dtype=np.float64)
+        weights = np.zeros(N_FEATURES)
+        bias = float(np.log(targets.mean() / (1 - targets.mean()))) if 0 < targets.mean() < 1 else 0.0
+
+        rng = np.random.default_rng(seed)
+        for epoch in range(epochs):
+            rate = learning_rate / (1 + epoch)
+            for i in rng.permutation(len(rows)):
+                idx = rows[i]
+                error = _sigmoid(weights[idx].sum() + bias) - targets[i]
+                weights[idx] -= rate * (error + l2 * weights[idx])
+                bias -= rate * error
+        return cls(weights, bias)
+
+    def predict(self, description, department=""):
+        return float(_sigmoid(self.weights[features(description, department)].sum() + self.bias))
+
+    def save(self, path):
+        np.savez_compressed(path, weights=self.weights, bias=np.array([self.bias]))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            return cls(data['weights'], data['bias'][0])
+
+
+def get_priority_classifier():
+    """
+    The process-wide classifier, or ``None`` if no trained model exists.
+    """
+    global _classifier, _loaded
+    if not _loaded:
+        with _lock:
+            if not _loaded:
+                path = getattr(settings, 'PRIORITY_CLASSIFIER_PATH', None)
+                try:
+                    _classifier = PriorityClassifier.load(path) if path else None
+                except FileNotFoundError:
+                    _classifier = None
+                except Exception as e:
+                    print(f"⚠️ Could not load priority classifier from {path}: {e}")
+                    _classifier = None
+                _loaded = True
+    return _classifier
+
+
+def reset_priority_classifier():
+    """
+    Forgets the loaded model so the next call reloads it from disk.
+    """
+    global _classifier, _loaded
+    with _lock:
+        _classifier, _loaded = None, False
@@ -0,0 +1,143 @@
+"""
+Local text embeddings for complaint similarity search.
+
+Descriptions are embedded with a signed hashing vectorizer over word
+unigrams and bigrams (sublinear term frequency, L2-normalized), so no
+vocabulary or network call is needed. Each municipality keeps its vectors
+in an append-only float32 matrix file with a parallel int64 file of
+complaint ids under COMPLAINT_EMBEDDINGS_DIR; both are read through
+``np.memmap`` so a search is one matrix-vector product over pages the OS
+already caches.
+
+Vectors are written after the complaint's transaction commits. Complaints
+missing from the files (not yet written, or created by ``bulk_create``)
+are embedded on the fly during a search, and ``rebuild_complaint_embeddings``
+rewrites the files from the database.
+"""
+import os
+import re
+import threading
+import zlib
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+DIM = 256
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+_write_lock = threading.RLock()
+
+
+def embed(text):
+    """
+    Unit-length float32 vector of ``DIM`` dimensions for the text (all
+    zeros for text without words).
+    """
+    words = TOKEN_RE.findall((text or "").lower())
+    vector = np.zeros(DIM, dtype=np.float32)
+    for gram in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+        h = zlib.crc32(gram.encode())
+        vector[h % DIM] += 1.0 if (h >> 31) & 1 else -1.0
+    vector = np.sign(vector) * np.log1p(np.abs(vector))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class EmbeddingStore:
+    """
+    The embedding files of one municipality.
+    """
+
+    def __init__(self, municipality_id, directory=None):
+        directory = Path(directory or settings.COMPLAINT_EMBEDDINGS_DIR)
+        name = f"municipality_{municipality_id or 'none'}"
+        self.vectors_path = directory / f"{name}.f32"
+        self.ids_path = directory / f"{name}.ids"
+
+    def load(self):
+        """
+        Returns ``(ids, vectors)`` as read-only memory maps (empty arrays if
+        nothing was written yet).
+        """
+        try:
+            rows = min(os.path.getsize(self.ids_path) // 8, os.path.getsize(self.vectors_path) // (DIM * 4))
+        except FileNotFoundError:
+            rows = 0
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty((0, DIM), dtype=np.float32)
+        ids = np.memmap(self.ids_path, dtype=np.int64, mode='r', shape=(rows,))
+        vectors = np.memmap(self.vectors_path, dtype=np.float32, mode='r', shape=(rows, DIM))
+        return ids, vectors
+
+    def write(self, complaint_ids, vectors):
+        """
+        Overwrites the rows of already stored complaints and appends the rest.
+        """
+        self.vectors_path.parent.mkdir(parents=True, exist_ok=True)
+        with _write_lock, open(self.ids_path, 'ab+') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            ids, _ = self.load()
+            rows = {int(complaint_id): row for row, complaint_id in enumerate(ids)}
+            existing = [(rows[c], v) for c, v in zip(complaint_ids, vectors) if c in rows]
+            new = [(c, v) for c, v in zip(complaint_ids, vectors) if c not in rows]
+
+            if existing:
+                stored = np.memmap(self.vectors_path, dtype=np.float32, mode='r+', shape=(len(ids), DIM))
+                for row, vector in existing:
+                    stored[row] = vector
+                stored.flush()
+            if new:
+                # Vectors first: readers size the matrix by the shorter of the two files
+                with open(self.vectors_path, 'ab') as f:
+                    f.write(np.asarray([v for _, v in new], dtype=np.float32).tobytes())
+                lock_file.write(np.asarray([c for c, _ in new], dtype=np.int64).tobytes())
+
+    def rewrite(self, complaint_ids, vectors):
+        self.vectors_path.parent.mkdir(parents=True, exist_ok=True)
+        with _write_lock:
+            for path in (self.ids_path, self.vectors_path):
+                if path.exists():
+                    path.unlink()
+            self.write(complaint_ids, vectors)
+
+
+def store_embeddings(complaints):
+    """
+    Embeds and stores ``complaints`` (which need ``description`` and
+    ``municipality_id`` loaded), grouped by municipality.
+    """
+    by_municipality = {}
+    for complaint in complaints:
+        by_municipality.setdefault(complaint.municipality_id, []).append(complaint)
+    for municipality_id, group in by_municipality.items():
+        EmbeddingStore(municipality_id).write([c.pk for c in group], [embed(c.description) for c in group])
+
+
+def rank_by_similarity(description, complaints, k=5):
+    """
+    The ``k`` complaints most similar to ``description`` among ``complaints``
+    (all from one municipality), as ``(complaint, cosine)`` pairs, best first.
+    """
+    complaints = list(complaints)
+    if not complaints:
+        return []
+    query = embed(description)
+
+    by_id = {c.pk: c for c in complaints}
+    ids, vectors = EmbeddingStore(complaints[0].municipality_id).load()
+    mask = np.isin(ids, list(by_id))
+    found_ids = ids[mask]
+    scores = dict(zip(found_ids.tolist(), (vectors[mask] @ query).tolist()))
+    for complaint_id, complaint in by_id.items():
+        if complaint_id not in scores:
+            scores[complaint_id] = float(embed(complaint.description) @ query)
+
+    best = sorted(scores.items(), key=lambda item: -item[1])[:k]
+    return [(by_id[complaint_id], score) for complaint_id, score in best]
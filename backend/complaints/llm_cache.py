@@ -0,0 +1,68 @@
+"""
+Content-addressed cache for parsed LLM responses.
+
+Keys are a SHA-256 of the call kind, model name, prompt version and the
+normalized input texts, so re-submissions, retries and whitespace/case
+variants of the same complaint reuse an earlier answer. Entries live in the
+``llm`` cache alias (see CACHES in settings), which bounds their age with
+TIMEOUT and their number with MAX_ENTRIES. Hit and miss counters are kept
+per call kind in the same cache.
+"""
+import hashlib
+import json
+import re
+
+from django.core.cache import caches
+
+CACHE_ALIAS = "llm"
+_MISSING = object()
+
+
+def get_cache():
+    return caches[CACHE_ALIAS]
+
+
+def normalize_text(text):
+    return re.sub(r"\s+", " ", (text or "").strip().lower())
+
+
+def cache_key(kind, model, prompt_version, *texts):
+    payload = json.dumps([kind, model, prompt_version, [normalize_text(t) for t in texts]])
+    return f"llm:{kind}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+
+def _count(kind, outcome):
+    counter = f"llm:stats:{kind}:{outcome}"
+    cache = get_cache()
+    # add() is a no-op when the counter exists, incr() is atomic on shared backends
+    cache.add(counter, 0, timeout=None)
+    try:
+        cache.incr(counter)
+    except ValueError:
+        # Evicted between add() and incr()
+        cache.set(counter, 1, timeout=None)
+
+
+def lookup(kind, key):
+    """
+    Returns the cached value for ``key``, or ``None`` on a miss. Records the
+    hit or miss for ``kind``.
+    """
+    value = get_cache().get(key, _MISSING)
+    _count(kind, "misses" if value is _MISSING else "hits")
+    return None if value is _MISSING else value
+
+
+def store(key, value):
+    get_cache().set(key, value)
+
+
+def hit_rates(kinds=("priority", "similarity")):
+    cache = get_cache()
+    stats = {}
+    for kind in kinds:
+        hits = cache.get(f"llm:stats:{kind}:hits", 0)
+        misses = cache.get(f"llm:stats:{kind}:misses", 0)
+        total = hits + misses
+        stats[kind] = {'hits': hits, 'misses': misses, 'hit_rate': hits / total if total else 0.0}
+    return stats
@@ -0,0 +1,97 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from account.geo import geohash_encode
+from account.models import Municipality
+from complaints.models import Complaint
+from complaints.views import calculate_distance
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the check_similar nearby search: the per-row Python Haversine "
+        "loop against the geohash-indexed + vectorized lookup. Synthetic complaints "
+        "are created inside a transaction that is rolled back afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=20000, help="Active complaints in the synthetic city")
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--radius', type=float, default=1.0, help="Search radius in km")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            municipality, queryset = self.seed(options['count'])
+            self.run(municipality, queryset, options)
+            transaction.set_rollback(True)
+
+    def seed(self, count):
+        municipality = Municipality.objects.create(name="Benchmark City", district="Bench", state="Bench")
+        user = User.objects.create(username=f"bench_{time.time_ns()}")
+        center_lat, center_lon = 20.2961, 85.8245
+        rng = random.Random(42)
+
+        batch = []
+        for i in range(count):
+            lat = round(center_lat + rng.uniform(-0.09, 0.09), 6)
+            lon = round(center_lon + rng.uniform(-0.09, 0.09), 6)
+            batch.append(Complaint(
+                user=user,
+                municipality=municipality,
+                department="Roads",
+                topic=f"Pothole {i}",
+                description="Large pothole on the main road causing accidents.",
+                location="Synthetic",
+                # Roughly a 20 km x 20 km city
+                latitude=lat,
+                longitude=lon,
+                # bulk_create skips save(), which normally fills the geohash
+                geohash=geohash_encode(lat, lon),
+            ))
+            if len(batch) == 5000:
+                Complaint.objects.bulk_create(batch)
+                batch = []
+        Complaint.objects.bulk_create(batch)
+
+        self.stdout.write(f"Seeded {count} complaints")
+        queryset = Complaint.objects.filter(municipality=municipality).exclude(status__in=['Resolved', 'Rejected'])
+        return municipality, queryset
+
+    def run(self, municipality, queryset, options):
+        lat, lon, radius = 20.2961, 85.8245, options['radius']
+
+        def legacy():
+            return [
+                c for c in queryset
+                if calculate_distance(lat, lon, float(c.latitude), float(c.longitude)) <= radius
+            ]
+
+        def indexed():
+            return queryset.nearby(lat, lon, radius_km=radius)
+
+        legacy_ids = {c.id for c in legacy()}
+        indexed_ids = {c.id for c in indexed()}
+        if legacy_ids != indexed_ids:
+            self.stderr.write(self.style.ERROR(
+                f"Result mismatch: legacy {len(legacy_ids)}, indexed {len(indexed_ids)}"
+            ))
+
+        results = {}
+        for name, fn in (("python loop", legacy), ("geohash + numpy", indexed)):
+            timings = []
+            for _ in range(options['repeat']):
+                start = time.perf_counter()
+                fn()
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = statistics.median(timings)
+            self.stdout.write(f"{name:>15}: median {results[name]:.2f} ms over {options['repeat']} runs")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(indexed_ids)} complaints within {radius} km, "
+            f"speedup x{results['python loop'] / results['geohash + numpy']:.1f}"
+        ))
@@ -0,0 +1,57 @@
+import statistics
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from complaints.classifier import get_priority_classifier
+from complaints.models import Complaint
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the local priority classifier: per-complaint scoring latency "
+        "and agreement with the priorities assigned by the remote model."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=2000, help="Most recent scored complaints to compare against")
+
+    def handle(self, *args, **options):
+        classifier = get_priority_classifier()
+        if classifier is None:
+            raise CommandError("No trained model found, run train_priority_classifier first")
+
+        rows = list(
+            # Local scores are the model's own predictions, not labels
+            Complaint.objects.filter(scoring_status__in=['Scored', 'Spam'], scored_by='remote')
+            .exclude(description='')
+            .order_by('-id')
+            .values_list('description', 'department', 'priority')[:options['limit']]
+        )
+        if not rows:
+            raise CommandError("No remotely scored complaints to compare against")
+
+        classifier.predict(*rows[0][:2])  # warm-up
+        timings, predicted = [], []
+        for description, department, _ in rows:
+            start = time.perf_counter()
+            predicted.append(classifier.predict(description, department))
+            timings.append((time.perf_counter() - start) * 1e6)
+
+        predicted = np.array(predicted)
+        actual = np.array([float(p) for _, _, p in rows])
+        threshold = Complaint.SPAM_PRIORITY_THRESHOLD
+        timings.sort()
+
+        self.stdout.write(
+            f"Latency: median {statistics.median(timings):.1f} µs, "
+            f"p99 {timings[min(len(timings) - 1, int(len(timings) * 0.99))]:.1f} µs "
+            f"over {len(rows)} complaints"
+        )
+        self.stdout.write(f"Mean absolute error vs remote: {np.abs(predicted - actual).mean():.3f}")
+        if len(rows) > 1 and actual.std() > 0 and predicted.std() > 0:
+            self.stdout.write(f"Correlation with remote: {np.corrcoef(predicted, actual)[0, 1]:.3f}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Spam decision agreement: {((predicted < threshold) == (actual < threshold)).mean():.1%}"
+        ))
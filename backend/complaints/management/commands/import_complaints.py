@@ -0,0 +1,50 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from account.models import Municipality
+from complaints.bulk_import import FORMATS, detect_format, import_complaints
+
+
+class Command(BaseCommand):
+    help = (
+        "Streams historical complaints from a CSV or NDJSON file into a municipality "
+        "(see complaints/bulk_import.py for the fields). AI priority scoring of rows "
+        "without a priority is left to score_pending_complaints unless --score is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--municipality', type=int, required=True, help="Municipality id")
+        parser.add_argument('--format', choices=FORMATS, help="Defaults to the file extension")
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--score', action='store_true', help="Score the imported complaints afterwards")
+
+    def handle(self, *args, **options):
+        try:
+            municipality = Municipality.objects.get(pk=options['municipality'])
+        except Municipality.DoesNotExist:
+            raise CommandError(f"Municipality {options['municipality']} does not exist")
+        fmt = options['format'] or detect_format(options['path'])
+
+        def progress(stats):
+            self.stdout.write(
+                f"📥 {stats['rows']} rows read, {stats['imported']} imported, {stats['skipped']} skipped "
+                f"({stats['rows_per_second']:.0f} rows/s)"
+            )
+
+        with open(options['path'], newline='', encoding='utf-8-sig') as stream:
+            stats = import_complaints(stream, fmt, municipality, chunk_size=options['chunk_size'], progress=progress)
+
+        for error in stats['errors']:
+            self.stderr.write(f"Row {error['row']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {stats['imported']} complaints, {stats['activities']} activities and "
+            f"{stats['reviews']} reviews into {municipality.name} in {stats['seconds']:.1f}s "
+            f"({stats['rows_per_second']:.0f} rows/s); {stats['skipped']} rows skipped"
+        ))
+
+        if stats['pending_scoring']:
+            if options['score']:
+                call_command('score_pending_complaints', stdout=self.stdout, stderr=self.stderr)
+            else:
+                self.stdout.write(f"{stats['pending_scoring']} complaints await AI scoring: run score_pending_complaints")
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from complaints.llm_cache import hit_rates
+
+
+class Command(BaseCommand):
+    help = (
+        "Prints hit rates of the LLM response cache per call kind. Counters are "
+        "shared between processes only when the 'llm' cache uses a shared backend."
+    )
+
+    def handle(self, *args, **options):
+        for kind, stats in hit_rates().items():
+            self.stdout.write(
+                f"{kind:>10}: {stats['hits']} hits, {stats['misses']} misses "
+                f"({stats['hit_rate']:.1%} hit rate)"
+            )
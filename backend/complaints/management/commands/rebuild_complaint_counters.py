@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F
+
+from complaints.models import Complaint
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds Complaint.upvote_count from the upvotes M2M table, "
+        "reports any drift and refreshes rank_score."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--municipality', type=int, help="Only rebuild complaints of this municipality")
+        parser.add_argument('--dry-run', action='store_true', help="Report drift without fixing it")
+
+    def handle(self, *args, **options):
+        queryset = Complaint.objects.all()
+        if options['municipality']:
+            queryset = queryset.filter(municipality_id=options['municipality'])
+
+        drifted = (
+            queryset.annotate(actual=Count('upvotes'))
+            .exclude(upvote_count=F('actual'))
+            .values_list('id', 'upvote_count', 'actual')
+        )
+
+        fixes = []
+        for complaint_id, stored, actual in drifted:
+            self.stdout.write(f"Complaint {complaint_id}: stored {stored}, actual {actual} ({actual - stored:+d})")
+            fixes.append(Complaint(id=complaint_id, upvote_count=actual))
+
+        if not fixes:
+            self.stdout.write(self.style.SUCCESS("No drift found"))
+        if options['dry_run']:
+            if fixes:
+                self.stdout.write(self.style.WARNING(f"{len(fixes)} complaints drifted (dry run, nothing changed)"))
+            return
+
+        with transaction.atomic():
+            if fixes:
+                Complaint.objects.bulk_update(fixes, ['upvote_count'], batch_size=500)
+            queryset.refresh_rank_scores()
+
+        if fixes:
+            self.stdout.write(self.style.SUCCESS(f"Fixed {len(fixes)} drifted complaints"))
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from complaints.embeddings import EmbeddingStore, embed
+from complaints.models import Complaint
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrites the memory-mapped complaint embedding files from the database, "
+        "e.g. after bulk imports or to drop deleted complaints."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--municipality', type=int, help="Only rebuild this municipality's embeddings")
+
+    def handle(self, *args, **options):
+        municipality_ids = (
+            [options['municipality']] if options['municipality']
+            else Complaint.objects.order_by().values_list('municipality_id', flat=True).distinct()
+        )
+        for municipality_id in municipality_ids:
+            rows = list(
+                Complaint.objects.filter(municipality_id=municipality_id)
+                .order_by('id').values_list('id', 'description')
+            )
+            EmbeddingStore(municipality_id).rewrite(
+                [complaint_id for complaint_id, _ in rows],
+                [embed(description) for _, description in rows],
+            )
+            self.stdout.write(f"Municipality {municipality_id}: {len(rows)} embeddings")
+        self.stdout.write(self.style.SUCCESS("Embeddings rebuilt"))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from complaints.rollups import rebuild
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the daily dashboard rollups (ComplaintDailyStat) from the "
+        "complaint and review tables, e.g. after bulk imports or manual SQL fixes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--municipality', type=int, help="Only rebuild this municipality's rollups")
+
+    def handle(self, *args, **options):
+        rows = rebuild(options['municipality'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {rows} rollup rows"))
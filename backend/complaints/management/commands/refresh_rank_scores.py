@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from complaints.models import Complaint
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the stored Complaint.rank_score values from priority, "
+        "upvote_count and created_at, e.g. after editing those columns directly. "
+        "Age decay needs no periodic refresh."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--municipality', type=int, help="Only refresh complaints of this municipality")
+
+    def handle(self, *args, **options):
+        queryset = Complaint.objects.all()
+        if options['municipality']:
+            queryset = queryset.filter(municipality_id=options['municipality'])
+
+        updated = queryset.refresh_rank_scores()
+        self.stdout.write(self.style.SUCCESS(f"Refreshed rank_score for {updated} complaints"))
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from complaints.models import UpvoteLogEntry
+from complaints.upvote_log import flush
+
+
+class Command(BaseCommand):
+    help = (
+        "Applies write-behind upvote toggles that were logged but never flushed, "
+        "e.g. by a process that crashed before its flush ran."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prune-days', type=int, default=None,
+                            help="Also delete flushed log entries older than this many days")
+
+    def handle(self, *args, **options):
+        count = flush()
+        self.stdout.write(self.style.SUCCESS(f"Flushed {count} pending upvote toggles"))
+
+        if options['prune_days'] is not None:
+            cutoff = timezone.now() - timedelta(days=options['prune_days'])
+            deleted, _ = UpvoteLogEntry.objects.filter(flushed=True, created_at__lt=cutoff).delete()
+            self.stdout.write(f"Pruned {deleted} flushed entries")
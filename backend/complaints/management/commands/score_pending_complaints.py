@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count
+
+from complaints.ai import score_pending_complaints
+from complaints.models import Complaint
+
+
+class Command(BaseCommand):
+    help = (
+        "Scores complaints still waiting for their AI priority, e.g. ones queued "
+        "in a process that restarted before its background scorer ran."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry-failed', action='store_true', help="Also retry complaints whose scoring failed")
+        parser.add_argument('--batch-size', type=int, default=8)
+
+    def handle(self, *args, **options):
+        if options['retry_failed']:
+            Complaint.objects.filter(scoring_status='Failed').update(scoring_status=Complaint.SCORING_PENDING)
+
+        ids = list(
+            Complaint.objects.filter(scoring_status=Complaint.SCORING_PENDING)
+            .order_by('id').values_list('id', flat=True)
+        )
+        batch_size = options['batch_size']
+        for start in range(0, len(ids), batch_size):
+            score_pending_complaints(ids[start:start + batch_size])
+
+        counts = dict(
+            Complaint.objects.filter(id__in=ids).values_list('scoring_status').annotate(n=Count('id'))
+        )
+        self.stdout.write(self.style.SUCCESS(f"Processed {len(ids)} pending complaints: {counts}"))
@@ -0,0 +1,56 @@
+import random
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from complaints.classifier import PriorityClassifier, reset_priority_classifier
+from complaints.models import Complaint
+
+
+class Command(BaseCommand):
+    help = (
+        "Trains the local priority classifier on complaints whose priority was "
+        "set by the remote model and writes it to PRIORITY_CLASSIFIER_PATH."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help="Where to write the model (defaults to PRIORITY_CLASSIFIER_PATH)")
+        parser.add_argument('--epochs', type=int, default=10)
+        parser.add_argument('--holdout', type=float, default=0.1, help="Fraction of samples kept aside for evaluation")
+
+    def handle(self, *args, **options):
+        rows = list(
+            # Local scores are the model's own predictions, not labels
+            Complaint.objects.filter(scoring_status__in=['Scored', 'Spam'], scored_by='remote')
+            .exclude(description='')
+            .values_list('description', 'department', 'priority')
+        )
+        if len(rows) < 10:
+            raise CommandError(f"Need at least 10 remotely scored complaints to train, found {len(rows)}")
+
+        random.Random(0).shuffle(rows)
+        split = max(1, int(len(rows) * options['holdout']))
+        holdout, train = rows[:split], rows[split:]
+
+        classifier = PriorityClassifier.train(
+            [(d, dept) for d, dept, _ in train],
+            [float(p) for _, _, p in train],
+            epochs=options['epochs'],
+        )
+
+        predicted = np.array([classifier.predict(d, dept) for d, dept, _ in holdout])
+        actual = np.array([float(p) for _, _, p in holdout])
+        threshold = Complaint.SPAM_PRIORITY_THRESHOLD
+        mae = np.abs(predicted - actual).mean()
+        spam_agreement = ((predicted < threshold) == (actual < threshold)).mean()
+
+        output = Path(options['output'] or settings.PRIORITY_CLASSIFIER_PATH)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        classifier.save(output)
+        reset_priority_classifier()
+
+        self.stdout.write(f"Trained on {len(train)} complaints, evaluated on {len(holdout)}")
+        self.stdout.write(f"Holdout MAE {mae:.3f}, spam decision agreement {spam_agreement:.1%}")
+        self.stdout.write(self.style.SUCCESS(f"Saved model to {output}"))
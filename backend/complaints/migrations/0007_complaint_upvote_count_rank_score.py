@@ -0,0 +1,46 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:25
+
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_counters(apps, schema_editor):
+    Complaint = apps.get_model('complaints', 'Complaint')
+    now = datetime.now(timezone.utc)
+    complaints = Complaint.objects.annotate(num_upvotes=Count('upvotes'))
+    for complaint in complaints.iterator():
+        delta = now - complaint.created_at
+        delay = delta.days + (delta.seconds / 86400)
+        complaint.upvote_count = complaint.num_upvotes
+        complaint.rank_score = (float(complaint.priority) * 0.5) + (complaint.num_upvotes * 0.3) - (delay * 0.02)
+        complaint.save(update_fields=['upvote_count', 'rank_score'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0008_profile_honesty_score'),
+        ('complaints', '0006_complaintactivity'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='rank_score',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='upvote_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['municipality', 'rank_score'], name='complaint_muni_rank_idx'),
+        ),
+        migrations.RunPython(backfill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0008_profile_honesty_score'),
+        ('complaints', '0007_complaint_upvote_count_rank_score'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='complaint',
+            name='complaint_muni_rank_idx',
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['municipality', 'rank_score', 'id'], name='complaint_muni_rank_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['municipality', 'created_at', 'id'], name='complaint_muni_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['created_at', 'id'], name='complaint_created_idx'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0008_profile_honesty_score'),
+        ('complaints', '0008_complaint_keyset_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['municipality', 'latitude', 'longitude'], name='complaint_muni_lat_lon_idx'),
+        ),
+    ]
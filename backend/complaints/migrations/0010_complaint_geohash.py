@@ -0,0 +1,72 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+# Frozen copy of account.geo.geohash_encode as of this migration, so later
+# changes to the app module cannot change what this backfill writes
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9
+
+
+def geohash_encode(lat, lon, precision=GEOHASH_PRECISION):
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits, bit_count, even = 0, 0, True
+
+    while len(chars) < precision:
+        rng, value = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            rng[0] = mid
+        else:
+            bits <<= 1
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits, bit_count = 0, 0
+    return "".join(chars)
+
+
+def backfill_geohash(apps, schema_editor):
+    for model_name in ('Complaint',):
+        model = apps.get_model('complaints', model_name)
+        rows = model.objects.filter(latitude__isnull=False, longitude__isnull=False).only('latitude', 'longitude')
+        batch = []
+        for row in rows.iterator():
+            row.geohash = geohash_encode(float(row.latitude), float(row.longitude))
+            batch.append(row)
+            if len(batch) == 1000:
+                model.objects.bulk_update(batch, ['geohash'])
+                batch = []
+        model.objects.bulk_update(batch, ['geohash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0009_geohash'),
+        ('complaints', '0009_complaint_muni_lat_lon_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='complaint',
+            name='complaint_muni_lat_lon_idx',
+        ),
+        migrations.AddField(
+            model_name='complaint',
+            name='geohash',
+            field=models.CharField(blank=True, editable=False, max_length=12, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='complaint',
+            index=models.Index(fields=['municipality', 'geohash'], name='complaint_muni_geohash_idx'),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0010_complaint_geohash'),
+    ]
+
+    operations = [
+        # Existing complaints were scored synchronously when they were created
+        migrations.AddField(
+            model_name='complaint',
+            name='scoring_status',
+            field=models.CharField(choices=[('Pending', 'Pending'), ('Scored', 'Scored'), ('Spam', 'Rejected as spam'), ('Failed', 'Failed')], default='Scored', max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='complaint',
+            name='scoring_status',
+            field=models.CharField(choices=[('Pending', 'Pending'), ('Scored', 'Scored'), ('Spam', 'Rejected as spam'), ('Failed', 'Failed')], default='Pending', max_length=20),
+        ),
+    ]
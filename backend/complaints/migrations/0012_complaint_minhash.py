@@ -0,0 +1,96 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:45
+
+import hashlib
+import re
+import zlib
+
+import django.db.models.deletion
+import numpy as np
+from django.db import migrations, models
+
+# Frozen copy of the complaints.minhash signature and banding code as of this
+# migration, so later changes to the app module cannot change this backfill
+NUM_PERM = 64
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 4
+_PRIME = (1 << 31) - 1
+
+_rng = np.random.RandomState(1)
+_A = _rng.randint(1, _PRIME, size=NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, _PRIME, size=NUM_PERM).astype(np.uint64)
+
+
+def shingles(text):
+    text = re.sub(r"\s+", " ", (text or "").lower()).strip()
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(text):
+    grams = shingles(text)
+    if not grams:
+        return None
+    hashes = np.fromiter((zlib.crc32(g.encode()) % _PRIME for g in grams), dtype=np.uint64, count=len(grams))
+    permuted = (np.outer(hashes, _A) + _B) % _PRIME
+    return permuted.min(axis=0).astype(np.uint32).tobytes()
+
+
+def band_buckets(signature):
+    values = bytes(signature)
+    width = ROWS * 4
+    return [
+        (band, int.from_bytes(hashlib.blake2b(values[band * width:(band + 1) * width], digest_size=8).digest(), 'big', signed=True))
+        for band in range(BANDS)
+    ]
+
+
+def backfill_minhash(apps, schema_editor):
+    Complaint = apps.get_model('complaints', 'Complaint')
+    ComplaintLSHBucket = apps.get_model('complaints', 'ComplaintLSHBucket')
+    batch, buckets = [], []
+    for row in Complaint.objects.only('description', 'municipality_id').iterator():
+        row.minhash = minhash_signature(row.description)
+        if row.minhash:
+            buckets += [
+                ComplaintLSHBucket(complaint_id=row.pk, municipality_id=row.municipality_id, band=band, bucket=bucket)
+                for band, bucket in band_buckets(row.minhash)
+            ]
+        batch.append(row)
+        if len(batch) == 1000:
+            Complaint.objects.bulk_update(batch, ['minhash'])
+            ComplaintLSHBucket.objects.bulk_create(buckets)
+            batch, buckets = [], []
+    Complaint.objects.bulk_update(batch, ['minhash'])
+    ComplaintLSHBucket.objects.bulk_create(buckets)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0011_reversegeocode'),
+        ('complaints', '0011_complaint_scoring_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='minhash',
+            field=models.BinaryField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='ComplaintLSHBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField()),
+                ('bucket', models.BigIntegerField()),
+                ('complaint', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lsh_buckets', to='complaints.complaint')),
+                ('municipality', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='account.municipality')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['municipality', 'band', 'bucket'], name='complaint_lsh_bucket_idx')],
+            },
+        ),
+        migrations.RunPython(backfill_minhash, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.7 on 2026-10-18 00:48
+
+import django.db.models.deletion
+from collections import defaultdict
+
+from django.db import migrations, models
+from django.utils import timezone
+
+# Frozen copy of the complaints.rollups contribution rules as of this
+# migration; importing that module would also load the live models
+FIELDS = ('complaint_count', 'resolution_seconds', 'review_count', 'rating_sum')
+CAPTURE_FIELDS = ('id', 'municipality_id', 'created_at', 'department', 'status', 'updated_at', 'review__rating')
+
+
+def contribution(municipality_id, created_at, department, status, updated_at, rating):
+    key = (municipality_id, timezone.localdate(created_at), department, status)
+    resolution = (updated_at - created_at).total_seconds() if status == 'Resolved' and updated_at else 0.0
+    return key, (1, resolution, 0 if rating is None else 1, rating or 0)
+
+
+def backfill_rollups(apps, schema_editor):
+    Complaint = apps.get_model('complaints', 'Complaint')
+    ComplaintDailyStat = apps.get_model('complaints', 'ComplaintDailyStat')
+    totals = defaultdict(lambda: [0, 0.0, 0, 0])
+    for row in Complaint.objects.values_list(*CAPTURE_FIELDS[1:]).iterator(chunk_size=2000):
+        key, values = contribution(*row)
+        for i, value in enumerate(values):
+            totals[key][i] += value
+    ComplaintDailyStat.objects.bulk_create([
+        ComplaintDailyStat(
+            municipality_id=municipality_id, date=date, department=department, status=status,
+            **dict(zip(FIELDS, values)),
+        )
+        for (municipality_id, date, department, status), values in totals.items()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('account', '0011_reversegeocode'),
+        ('complaints', '0012_complaint_minhash'),
+        ('review', '0002_alter_review_user'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComplaintDailyStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('department', models.CharField(max_length=100)),
+                ('status', models.CharField(max_length=50)),
+                ('complaint_count', models.IntegerField(default=0)),
+                ('resolution_seconds', models.FloatField(default=0)),
+                ('review_count', models.IntegerField(default=0)),
+                ('rating_sum', models.IntegerField(default=0)),
+                ('municipality', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='account.municipality')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('municipality', 'date', 'department', 'status'), name='complaint_daily_stat_key')],
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.7 on 2026-10-18 01:26
+
+from django.db import migrations, models
+
+
+def backfill_scored_by(apps, schema_editor):
+    # Until now every stored score came from the remote model, so keep them as labels
+    Complaint = apps.get_model('complaints', 'Complaint')
+    Complaint.objects.filter(scoring_status__in=['Scored', 'Spam'], scored_by__isnull=True).update(scored_by='remote')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0014_upvotelogentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='complaint',
+            name='scored_by',
+            field=models.CharField(blank=True, choices=[('remote', 'Remote model'), ('local', 'Local classifier'), ('imported', 'Imported'), ('default', 'Provisional default')], editable=False, max_length=10, null=True),
+        ),
+        migrations.RunPython(backfill_scored_by, migrations.RunPython.noop),
+    ]
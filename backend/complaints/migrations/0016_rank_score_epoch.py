@@ -0,0 +1,47 @@
+from datetime import datetime, timezone
+
+from django.db import migrations
+from django.utils import timezone as dj_timezone
+
+# Complaint.rank_key as of this migration
+PRIORITY_WEIGHT = 0.5
+UPVOTE_WEIGHT = 0.3
+AGE_DECAY_PER_DAY = 0.02
+RANK_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _rewrite_rank_scores(apps, reference):
+    Complaint = apps.get_model('complaints', 'Complaint')
+    batch = []
+    for complaint in Complaint.objects.only('priority', 'upvote_count', 'created_at').iterator(chunk_size=2000):
+        age_days = (reference - complaint.created_at).total_seconds() / 86400
+        complaint.rank_score = (
+            float(complaint.priority) * PRIORITY_WEIGHT
+            + complaint.upvote_count * UPVOTE_WEIGHT
+            - age_days * AGE_DECAY_PER_DAY
+        )
+        batch.append(complaint)
+        if len(batch) >= 500:
+            Complaint.objects.bulk_update(batch, ['rank_score'])
+            batch = []
+    Complaint.objects.bulk_update(batch, ['rank_score'])
+
+
+def anchor_rank_scores(apps, schema_editor):
+    # Stored scores decayed up to their last refresh; anchor them all at the epoch
+    _rewrite_rank_scores(apps, RANK_EPOCH)
+
+
+def unanchor_rank_scores(apps, schema_editor):
+    _rewrite_rank_scores(apps, dj_timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('complaints', '0015_complaint_scored_by'),
+    ]
+
+    operations = [
+        migrations.RunPython(anchor_rank_scores, unanchor_rank_scores),
+    ]
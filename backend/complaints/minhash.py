@@ -0,0 +1,136 @@
+"""
+MinHash signatures and LSH banding for near-duplicate complaint detection.
+
+Each complaint description is reduced to its set of character shingles and
+summarized by NUM_PERM MinHash values (stored as bytes on
+``Complaint.minhash``). The signature is split into BANDS bands of ROWS
+values; every band is hashed into a ``ComplaintLSHBucket`` row keyed by
+municipality, so candidates for a new description are the complaints
+sharing at least one (band, bucket) pair, found with indexed lookups
+instead of comparing against every complaint. Candidates are then checked
+against DUPLICATE_JACCARD_THRESHOLD using the estimated Jaccard similarity
+(the fraction of equal MinHash values).
+
+With 32 bands of 2 rows, pairs with Jaccard 0.3 become candidates ~95% of
+the time and pairs below 0.1 rarely do.
+"""
+import hashlib
+import re
+import zlib
+
+import numpy as np
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+
+NUM_PERM = 64
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 4
+_PRIME = (1 << 31) - 1
+
+_rng = np.random.RandomState(1)
+_A = _rng.randint(1, _PRIME, size=NUM_PERM).astype(np.uint64)
+_B = _rng.randint(0, _PRIME, size=NUM_PERM).astype(np.uint64)
+
+
+def shingles(text):
+    text = re.sub(r"\s+", " ", (text or "").lower()).strip()
+    if len(text) <= SHINGLE_SIZE:
+        return {text} if text else set()
+    return {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(text):
+    """
+    ``NUM_PERM`` MinHash values of the description as bytes, or ``None``
+    for empty text.
+    """
+    grams = shingles(text)
+    if not grams:
+        return None
+    hashes = np.fromiter((zlib.crc32(g.encode()) % _PRIME for g in grams), dtype=np.uint64, count=len(grams))
+    permuted = (np.outer(hashes, _A) + _B) % _PRIME
+    return permuted.min(axis=0).astype(np.uint32).tobytes()
+
+
+def signature_array(signature):
+    return np.frombuffer(bytes(signature), dtype=np.uint32)
+
+
+def estimated_jaccard(signature, other):
+    if not signature or not other:
+        return 0.0
+    return float((signature_array(signature) == signature_array(other)).mean())
+
+
+def band_buckets(signature):
+    """
+    ``(band, bucket)`` pairs of a signature, with each bucket a signed
+    64-bit hash of the band's rows.
+    """
+    values = bytes(signature)
+    width = ROWS * 4
+    return [
+        (band, int.from_bytes(hashlib.blake2b(values[band * width:(band + 1) * width], digest_size=8).digest(), 'big', signed=True))
+        for band in range(BANDS)
+    ]
+
+
+def jaccard_threshold():
+    return getattr(settings, 'DUPLICATE_JACCARD_THRESHOLD', 0.3)
+
+
+def index_complaints(complaints):
+    """
+    Rewrites the LSH buckets of ``complaints`` from their stored signatures.
+    For paths that skip ``Complaint.save()``, such as ``bulk_create``.
+    """
+    from .models import ComplaintLSHBucket
+
+    complaints = list(complaints)
+    ComplaintLSHBucket.objects.filter(complaint__in=[c.pk for c in complaints]).delete()
+    rows = [
+        (c.pk, c.municipality_id, band, bucket)
+        for c in complaints if c.minhash
+        for band, bucket in band_buckets(c.minhash)
+    ]
+    if not rows:
+        return
+    # BANDS rows per complaint: a plain executemany avoids building a model
+    # instance for each of them, which costs more than the insert itself
+    qn = connection.ops.quote_name
+    columns = ', '.join(qn(ComplaintLSHBucket._meta.get_field(f).column) for f in ('complaint', 'municipality', 'band', 'bucket'))
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {qn(ComplaintLSHBucket._meta.db_table)} ({columns}) VALUES (%s, %s, %s, %s)", rows
+        )
+
+
+def find_duplicates(description, complaints, threshold=None):
+    """
+    The complaints among ``complaints`` (all from one municipality, with
+    their ``minhash`` loaded) whose estimated Jaccard similarity to
+    ``description`` reaches the threshold, most similar first.
+    """
+    from .models import ComplaintLSHBucket
+
+    complaints = list(complaints)
+    signature = minhash_signature(description)
+    if not signature or not complaints:
+        return []
+    threshold = jaccard_threshold() if threshold is None else threshold
+
+    condition = Q()
+    for band, bucket in band_buckets(signature):
+        condition |= Q(band=band, bucket=bucket)
+    candidate_ids = set(
+        ComplaintLSHBucket.objects.filter(condition, municipality_id=complaints[0].municipality_id)
+        .values_list('complaint_id', flat=True)
+    )
+
+    scored = [
+        (c, estimated_jaccard(signature, c.minhash))
+        for c in complaints if c.pk in candidate_ids
+    ]
+    return [c for c, similarity in sorted(scored, key=lambda item: -item[1]) if similarity >= threshold]
@@ -1,19 +1,106 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import Case, CharField, ExpressionWrapper, F, FloatField, Func, Prefetch, Value, When
+from django.db.models.functions import Cast
 from django.contrib.auth.models import User
-from account.models import Municipality 
+from django.utils import timezone as dj_timezone
+from account.models import GeohashedModel, GeoQuerySet, Municipality, Profile, bump_stats_version
 from datetime import datetime, timezone
 from api.models import MunicipalityOfficial
+from .embeddings import store_embeddings
+from .minhash import index_complaints, minhash_signature
+
+
+class DaysSince(Func):
+    """
+    Fractional days elapsed between a datetime column and ``now``,
+    evaluated in SQL so it can take part in ordering.
+    """
+    output_field = FloatField()
+    template = "(EXTRACT(EPOCH FROM (%(expressions)s)) / 86400.0)"
+    arg_joiner = " - "
+
+    def __init__(self, expression, now, **extra):
+        super().__init__(Value(now), expression, **extra)
+
+    def as_sqlite(self, compiler, connection, **extra_context):
+        return self.as_sql(
+            compiler, connection,
+            template="(julianday(%(expressions)s))",
+            arg_joiner=") - julianday(",
+            **extra_context
+        )
+
+
+def score_expression(now=None):
+    """
+    SQL expression equivalent to ``Complaint.score``, built from the stored
+    ``priority`` and ``upvote_count`` columns and the complaint's age.
+    """
+    now = now or dj_timezone.now()
+    return ExpressionWrapper(
+        Cast('priority', FloatField()) * Complaint.PRIORITY_WEIGHT
+        + Cast(F('upvote_count'), FloatField()) * Complaint.UPVOTE_WEIGHT
+        - DaysSince('created_at', now) * Complaint.AGE_DECAY_PER_DAY,
+        output_field=FloatField()
+    )
+
+
+class ComplaintQuerySet(GeoQuerySet):
+    def with_score(self, now=None):
+        """
+        Annotates ``computed_score`` using the same formula as ``Complaint.score``.
+        """
+        return self.annotate(computed_score=score_expression(now))
+
+    def with_priority_bucket(self, now=None):
+        """
+        Annotates ``computed_score`` and the dashboard ``priority_bucket``
+        (High/Medium/Low) derived from it in SQL.
+        """
+        return self.with_score(now).annotate(priority_bucket=Case(
+            When(computed_score__gt=Complaint.HIGH_PRIORITY_SCORE, then=Value('High')),
+            When(computed_score__gt=Complaint.MEDIUM_PRIORITY_SCORE, then=Value('Medium')),
+            default=Value('Low'),
+            output_field=CharField(),
+        ))
+
+    def for_feed(self):
+        """
+        Loads everything ComplaintSerializer renders in a constant number of
+        queries: the author via JOIN and the comments (with their authors) in
+        one prefetch.
+        """
+        return self.select_related('user').prefetch_related(
+            Prefetch('comments', queryset=Comment.objects.select_related('user'))
+        )
 
-class ComplaintManager(models.Manager):
     def ranked(self, municipality_id=None):
-        queryset = self.all()
+        """
+        Orders by the stored ``rank_score`` (served by the municipality/rank_score
+        index) and annotates the exact, current score for display. Both order
+        the rows the same way at any time, see ``Complaint.rank_key``.
+        """
+        queryset = self
         if municipality_id:
             queryset = queryset.filter(municipality_id=municipality_id)
-        
-        complaints = list(queryset)
-        complaints.sort(key=lambda c: c.score, reverse=True)
-        return complaints
-class Complaint(models.Model):
+        return queryset.with_score().order_by('-rank_score', '-id')
+
+    def refresh_rank_scores(self):
+        """
+        Recomputes ``rank_score`` from the stored columns in one UPDATE, for
+        rows whose priority, upvotes or creation time were written directly.
+        Age decay needs no refresh.
+        """
+        return self.update(rank_score=score_expression(Complaint.RANK_EPOCH))
+
+
+class ComplaintManager(models.Manager.from_queryset(ComplaintQuerySet)):
+    pass
+
+
+class Complaint(GeohashedModel):
     
     DEPARTMENTS = [
         ("Water", "Water Department"),
@@ -35,6 +122,21 @@ class Complaint(models.Model):
         ('Rejected', 'Rejected'),
     ]
 
+    SCORING_PENDING = 'Pending'
+    SCORING_STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Scored', 'Scored'),
+        ('Spam', 'Rejected as spam'),
+        ('Failed', 'Failed'),
+    ]
+    # Where a stored priority came from; only remote scores are training labels
+    SCORED_BY_CHOICES = [
+        ('remote', 'Remote model'),
+        ('local', 'Local classifier'),
+        ('imported', 'Imported'),
+        ('default', 'Provisional default'),
+    ]
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='complaints')
     municipality = models.ForeignKey( 
         Municipality,
@@ -55,11 +157,180 @@ class Complaint(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     upvotes = models.ManyToManyField(User, related_name='upvoted_complaints', blank=True)
     priority = models.DecimalField(max_digits=3, decimal_places=2, default=0.5)
-    
+    # AI priority scoring runs in the background (complaints/ai.py)
+    scoring_status = models.CharField(max_length=20, choices=SCORING_STATUS_CHOICES, default=SCORING_PENDING)
+    scored_by = models.CharField(max_length=10, choices=SCORED_BY_CHOICES, null=True, blank=True, editable=False)
+    # MinHash of the description, indexed by ComplaintLSHBucket (complaints/minhash.py)
+    minhash = models.BinaryField(null=True, blank=True, editable=False)
+
+    # Denormalized counters, maintained by the upvote action and the AI scoring
+    upvote_count = models.PositiveIntegerField(default=0)
+    # See rank_key
+    rank_score = models.FloatField(default=0)
+
+    PRIORITY_WEIGHT = 0.5
+    UPVOTE_WEIGHT = 0.3
+    AGE_DECAY_PER_DAY = 0.02
+    # Reference time of rank_score; changing it needs refresh_rank_scores
+    RANK_EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    COUNTER_FIELDS = ('upvote_count', 'rank_score')
+
+    # Score thresholds of the dashboard priority buckets
+    HIGH_PRIORITY_SCORE = 2.0
+    MEDIUM_PRIORITY_SCORE = 0.5
+
+    PROVISIONAL_PRIORITY = 0.5
+    SPAM_PRIORITY_THRESHOLD = 0.2
+    SPAM_HONESTY_PENALTY = 10
+
     objects = ComplaintManager()
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['municipality', 'rank_score', 'id'], name='complaint_muni_rank_idx'),
+            models.Index(fields=['municipality', 'created_at', 'id'], name='complaint_muni_created_idx'),
+            models.Index(fields=['created_at', 'id'], name='complaint_created_idx'),
+            models.Index(fields=['municipality', 'geohash'], name='complaint_muni_geohash_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        deferred = self.get_deferred_fields()
+        reindex = False
+        if 'description' not in deferred and (update_fields is None or 'description' in update_fields):
+            signature = minhash_signature(self.description)
+            if 'minhash' in deferred or (bytes(self.minhash) if self.minhash else None) != signature:
+                self.minhash = signature
+                reindex = True
+                if update_fields is not None:
+                    kwargs['update_fields'] = update_fields = {*update_fields, 'minhash'}
+
+        if self._state.adding:
+            self.rank_score = self.rank_key(self.priority, self.upvote_count, self.created_at or dj_timezone.now())
+        elif update_fields is None:
+            # Never write back counters held in memory; they are only changed with F() updates
+            deferred = self.get_deferred_fields()
+            kwargs['update_fields'] = update_fields = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.attname not in deferred and f.name not in self.COUNTER_FIELDS
+            ]
+        # One transaction with the rollup update of the save signals (complaints/signals.py)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+            if reindex:
+                index_complaints([self])
+            elif update_fields is not None and 'municipality' in update_fields:
+                self.lsh_buckets.exclude(municipality_id=self.municipality_id).update(municipality_id=self.municipality_id)
+        if reindex or (update_fields is not None and 'municipality' in update_fields):
+            transaction.on_commit(lambda: store_embeddings([self]))
+
+    @classmethod
+    def rank_key(cls, priority, upvote_count, created_at):
+        """
+        The score the complaint had at RANK_EPOCH, stored as ``rank_score``.
+        Every complaint's score has since decayed by the same amount, so
+        ordering by it is ordering by the current score, and the stored value
+        never needs refreshing as complaints age.
+        """
+        age_at_epoch = (cls.RANK_EPOCH - created_at).total_seconds() / 86400
+        return (
+            float(priority) * cls.PRIORITY_WEIGHT
+            + upvote_count * cls.UPVOTE_WEIGHT
+            - age_at_epoch * cls.AGE_DECAY_PER_DAY
+        )
+
     def total_upvotes(self):
-        return self.upvotes.count()
+        # Plus toggles still waiting in the write-behind log, when loaded (complaints/upvote_log.py)
+        return self.upvote_count + getattr(self, '_pending_upvote_delta', 0)
+
+    def apply_upvote_delta(self, delta):
+        """
+        Atomically adjusts ``upvote_count`` and ``rank_score`` by ``delta`` votes
+        and returns the new count.
+        """
+        Complaint.objects.filter(pk=self.pk).update(
+            upvote_count=F('upvote_count') + delta,
+            rank_score=F('rank_score') + delta * self.UPVOTE_WEIGHT,
+        )
+        # After commit, so concurrent upvotes in a city don't queue on its municipality row
+        municipality_id = self.municipality_id
+        transaction.on_commit(lambda: bump_stats_version(municipality_id))
+        self.refresh_from_db(fields=list(self.COUNTER_FIELDS))
+        return self.upvote_count
+
+    def toggle_upvote(self, user_id):
+        """
+        Adds the user's upvote, or removes it if present, and returns
+        ``(upvoted, total_upvotes)``. The counter moves by the number of
+        rows actually inserted or deleted, so concurrent toggles never lose
+        or double-count a vote.
+        """
+        votes = Complaint.upvotes.through.objects
+        with transaction.atomic():
+            if votes.filter(complaint_id=self.pk, user_id=user_id).exists():
+                deleted, _ = votes.filter(complaint_id=self.pk, user_id=user_id).delete()
+                upvoted, delta = False, -deleted
+            else:
+                try:
+                    with transaction.atomic():
+                        votes.create(complaint_id=self.pk, user_id=user_id)
+                    delta = 1
+                except IntegrityError:
+                    # A concurrent toggle inserted the same vote first
+                    delta = 0
+                upvoted = True
+            if delta:
+                return upvoted, self.apply_upvote_delta(delta)
+            self.refresh_from_db(fields=list(self.COUNTER_FIELDS))
+            return upvoted, self.upvote_count
+
+    def apply_priority_score(self, priority, scored_by=None):
+        """
+        Replaces the provisional priority with the AI score (``None`` when
+        scoring failed), recording which scorer produced it in ``scored_by``.
+        Complaints scoring below SPAM_PRIORITY_THRESHOLD are rejected and
+        their author's honesty score is penalized. Only applies to complaints
+        still pending scoring; returns whether it did.
+        """
+        pending = Complaint.objects.filter(pk=self.pk, scoring_status=self.SCORING_PENDING)
+        if priority is None:
+            return bool(pending.update(scoring_status='Failed'))
+
+        priority = Decimal(str(round(priority, 2)))
+        is_spam = priority < Decimal(str(self.SPAM_PRIORITY_THRESHOLD))
+        changes = {
+            'priority': priority,
+            'scoring_status': 'Spam' if is_spam else 'Scored',
+            'scored_by': scored_by,
+            'rank_score': F('rank_score') + float(priority - Decimal(str(self.priority))) * self.PRIORITY_WEIGHT,
+        }
+        if is_spam:
+            changes.update(status='Rejected', updated_at=dj_timezone.now())
+
+        with transaction.atomic():
+            if is_spam:
+                from . import rollups
+                before = rollups.capture([self.pk])
+            if not pending.update(**changes):
+                return False
+            bump_stats_version(self.municipality_id)
+            if is_spam:
+                # QuerySet.update() bypasses the rollup signals
+                rollups.apply_changes(before, rollups.capture([self.pk]))
+                # 📉 Penalize the author for spam/trivial complaints
+                Profile.objects.filter(user_id=self.user_id).update(
+                    honesty_score=F('honesty_score') - self.SPAM_HONESTY_PENALTY
+                )
+                ComplaintActivity.objects.create(
+                    complaint_id=self.pk,
+                    previous_status=self.status,
+                    new_status='Rejected',
+                    remarks=f"Automatically rejected due to low urgency score ({priority}).",
+                )
+        print(f"🤖 Complaint {self.pk} scored {priority}{' (spam)' if is_spam else ''}")
+        self.refresh_from_db(fields=['priority', 'scoring_status', 'scored_by', 'status', 'rank_score'])
+        return True
 
     def delay_days(self):
         delta = datetime.now(timezone.utc) - self.created_at
@@ -67,14 +338,75 @@ class Complaint(models.Model):
 
     @property
     def score(self):
+        if hasattr(self, 'computed_score'):
+            return self.computed_score
         upvotes = self.total_upvotes()
         delay = self.delay_days()
-        return (float(self.priority) * 0.5) + (upvotes * 0.3) - (delay * 0.02)
+        return (
+            (float(self.priority) * self.PRIORITY_WEIGHT)
+            + (upvotes * self.UPVOTE_WEIGHT)
+            - (delay * self.AGE_DECAY_PER_DAY)
+        )
 
     def __str__(self):
         return f"{self.topic} ({self.department}) - {self.status}"
     
 
+class ComplaintLSHBucket(models.Model):
+    """
+    One LSH band of a complaint's MinHash signature (see complaints/minhash.py).
+    """
+    complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE, related_name='lsh_buckets')
+    municipality = models.ForeignKey(Municipality, on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    band = models.PositiveSmallIntegerField()
+    bucket = models.BigIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['municipality', 'band', 'bucket'], name='complaint_lsh_bucket_idx'),
+        ]
+
+
+class UpvoteLogEntry(models.Model):
+    """
+    One upvote toggle recorded in write-behind mode, applied to the upvote
+    table and counters by the next flush (see complaints/upvote_log.py).
+    """
+    complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE, related_name='+')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    flushed = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['complaint', 'flushed'], name='upvote_log_pending_idx'),
+        ]
+
+
+class ComplaintDailyStat(models.Model):
+    """
+    Dashboard rollup: complaints created on ``date`` per municipality,
+    department and current status (see complaints/rollups.py).
+    """
+    municipality = models.ForeignKey(Municipality, on_delete=models.CASCADE, null=True, blank=True, related_name='daily_stats')
+    date = models.DateField()
+    department = models.CharField(max_length=100)
+    status = models.CharField(max_length=50)
+    complaint_count = models.IntegerField(default=0)
+    # Sum of updated_at - created_at over resolved complaints
+    resolution_seconds = models.FloatField(default=0)
+    review_count = models.IntegerField(default=0)
+    rating_sum = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['municipality', 'date', 'department', 'status'], name='complaint_daily_stat_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.municipality_id} {self.date} {self.department}/{self.status}: {self.complaint_count}"
+
+
 class Comment(models.Model):
     complaint = models.ForeignKey(Complaint, on_delete=models.CASCADE, related_name='comments')
     user = models.ForeignKey(User, on_delete=models.CASCADE)
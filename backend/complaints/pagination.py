@@ -0,0 +1,160 @@
+import base64
+import json
+from urllib import parse
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import ParseError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination that seeks on the ordering columns instead of using
+    OFFSET, so every page costs the same as the first one.
+
+    ``ordering`` must list unique-together columns sharing one direction,
+    ending with a unique column (usually ``id``). Cursors are opaque,
+    base64-encoded positions of the first/last row of the current page;
+    malformed ones are answered with 400.
+    """
+    ordering = ('-created_at', '-id')
+    page_size = getattr(settings, 'COMPLAINT_FEED_PAGE_SIZE', 20)
+    max_page_size = getattr(settings, 'COMPLAINT_FEED_MAX_PAGE_SIZE', 100)
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.fields = [field.lstrip('-') for field in self.ordering]
+        descending = self.ordering[0].startswith('-')
+
+        position, reverse = self.decode_cursor(request, queryset.model)
+
+        ordering = self.ordering
+        if reverse:
+            ordering = [field[1:] if field.startswith('-') else f'-{field}' for field in ordering]
+        queryset = queryset.order_by(*ordering)
+
+        if position is not None:
+            lookup = 'lt' if descending != reverse else 'gt'
+            queryset = queryset.filter(self.seek_filter(position, lookup))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        if reverse:
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        self.next_position = self.get_position(results[-1]) if self.has_next and results else None
+        self.previous_position = self.get_position(results[0]) if self.has_previous and results else None
+        return results
+
+    def first_page(self, queryset, base_url):
+        """
+        The first page of ``queryset`` and the link to the next one, for
+        embedding a page in another response. Cursors point at ``base_url``.
+        """
+        self.base_url = base_url
+        self.fields = [field.lstrip('-') for field in self.ordering]
+        results = list(queryset.order_by(*self.ordering)[:self.page_size + 1])
+        if len(results) <= self.page_size:
+            return results, None
+        results = results[:self.page_size]
+        return results, self.encode_cursor(self.get_position(results[-1]), reverse=False)
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def seek_filter(self, position, lookup):
+        """
+        Rows strictly after ``position`` in ordering order, written as
+        ``a <= x AND (a < x OR (a = x AND b < y))`` so the leading column
+        bounds an index range scan.
+        """
+        fields = self.fields
+        condition = Q(**{f'{fields[-1]}__{lookup}': position[-1]})
+        for field, value in zip(reversed(fields[:-1]), reversed(position[:-1])):
+            condition = Q(**{f'{field}__{lookup}': value}) | (Q(**{field: value}) & condition)
+        return Q(**{f'{fields[0]}__{lookup}e': position[0]}) & condition
+
+    def get_position(self, obj):
+        return [getattr(obj, field) for field in self.fields]
+
+    def encode_cursor(self, position, reverse):
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in position]
+        payload = json.dumps({'p': values, 'r': int(reverse)}, separators=(',', ':'), default=str)
+        token = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, model):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(parse.unquote(token).encode()))
+            values = payload['p']
+            if len(values) != len(self.fields):
+                raise ValueError
+            position = [
+                model._meta.get_field(field).to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+            return position, bool(payload.get('r'))
+        except Exception:
+            raise ParseError(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return self.encode_cursor(self.next_position, reverse=False)
+
+    def get_previous_link(self):
+        if self.previous_position is None:
+            return None
+        return self.encode_cursor(self.previous_position, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+
+class ChronologicalPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+
+
+class RankedPagination(KeysetPagination):
+    ordering = ('-rank_score', '-id')
+    page_size = 8
+
+
+class DashboardRecentPagination(ChronologicalPagination):
+    page_size = getattr(settings, 'DASHBOARD_RECENT_COMPLAINTS', 10)
+    max_page_size = 50
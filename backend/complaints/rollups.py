@@ -0,0 +1,185 @@
+"""
+Incrementally maintained daily rollups for the municipality dashboard.
+
+Every complaint contributes to exactly one ``ComplaintDailyStat`` row, keyed
+by (municipality, creation date, department, current status): one to
+``complaint_count``, its resolution time to ``resolution_seconds`` when
+resolved, and its review (if any) to ``review_count``/``rating_sum``. Writes
+capture a complaint's contribution before and after the change and apply
+the difference with F() updates, so the dashboard reads a number of rows
+proportional to days x departments instead of scanning every complaint.
+
+``Complaint``/``Review`` saves and deletes are handled by complaints/signals.py.
+Code that changes complaints with ``QuerySet.update()`` or ``bulk_create``
+must call ``capture`` and ``apply_changes`` itself, and
+``manage.py rebuild_dashboard_rollups`` recomputes everything from scratch.
+"""
+from collections import defaultdict
+from datetime import date as Date
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Complaint, ComplaintDailyStat
+
+FIELDS = ('complaint_count', 'resolution_seconds', 'review_count', 'rating_sum')
+CAPTURE_FIELDS = ('id', 'municipality_id', 'created_at', 'department', 'status', 'updated_at', 'review__rating')
+# Complaint fields a contribution depends on (besides the review)
+COMPLAINT_FIELDS = frozenset({'municipality', 'created_at', 'department', 'status', 'updated_at'})
+
+
+def contribution(municipality_id, created_at, department, status, updated_at, rating):
+    """
+    ``(key, values)`` of one complaint, with values in ``FIELDS`` order.
+    """
+    key = (municipality_id, timezone.localdate(created_at), department, status)
+    resolution = (updated_at - created_at).total_seconds() if status == 'Resolved' and updated_at else 0.0
+    return key, (1, resolution, 0 if rating is None else 1, rating or 0)
+
+
+def capture(complaint_ids, lock=False):
+    """
+    Current contributions of the given complaints, by id, in one query.
+    With ``lock`` the complaint rows stay locked until the transaction ends,
+    so concurrent writers cannot capture the same state.
+    """
+    complaints = Complaint.objects.filter(pk__in=list(complaint_ids))
+    if lock:
+        complaints = complaints.select_for_update(of=('self',))
+    rows = complaints.values_list(*CAPTURE_FIELDS)
+    return {row[0]: contribution(*row[1:]) for row in rows}
+
+
+def apply(removed=(), added=()):
+    """
+    Subtracts the ``removed`` and adds the ``added`` contributions, merged
+    per rollup row.
+    """
+    deltas = defaultdict(lambda: [0, 0.0, 0, 0])
+    for sign, contributions in ((-1, removed), (1, added)):
+        for key, values in contributions:
+            for i, value in enumerate(values):
+                deltas[key][i] += sign * value
+
+    for key, values in deltas.items():
+        if any(values):
+            _apply_delta(key, values)
+
+
+def apply_changes(before, after):
+    """
+    Applies the difference between two ``capture`` results.
+    """
+    apply(removed=before.values(), added=after.values())
+
+
+def _apply_delta(key, values):
+    municipality_id, date, department, status = key
+    lookup = {'municipality_id': municipality_id, 'date': date, 'department': department, 'status': status}
+    changes = {field: F(field) + value for field, value in zip(FIELDS, values)}
+    if ComplaintDailyStat.objects.filter(**lookup).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            ComplaintDailyStat.objects.create(**lookup, **dict(zip(FIELDS, values)))
+    except IntegrityError:
+        # Created concurrently
+        ComplaintDailyStat.objects.filter(**lookup).update(**changes)
+
+
+def rebuild(municipality_id=None):
+    """
+    Recomputes the rollups (of one municipality, or all) from the complaints.
+    Returns the number of rollup rows written.
+    """
+    complaints = Complaint.objects.all()
+    stats = ComplaintDailyStat.objects.all()
+    if municipality_id:
+        complaints = complaints.filter(municipality_id=municipality_id)
+        stats = stats.filter(municipality_id=municipality_id)
+
+    totals = defaultdict(lambda: [0, 0.0, 0, 0])
+    for row in complaints.values_list(*CAPTURE_FIELDS[1:]).iterator(chunk_size=2000):
+        key, values = contribution(*row)
+        for i, value in enumerate(values):
+            totals[key][i] += value
+
+    with transaction.atomic():
+        stats.delete()
+        ComplaintDailyStat.objects.bulk_create([
+            ComplaintDailyStat(
+                municipality_id=municipality_id, date=date, department=department, status=status,
+                **dict(zip(FIELDS, values)),
+            )
+            for (municipality_id, date, department, status), values in totals.items()
+        ], batch_size=1000)
+    return len(totals)
+
+
+def dashboard_summary(municipality_id):
+    """
+    Dashboard aggregates for one municipality, computed from its rollup rows
+    in a single query.
+    """
+    rows = (
+        ComplaintDailyStat.objects.filter(municipality_id=municipality_id, complaint_count__gt=0)
+        .values_list('date', 'department', 'status', *FIELDS)
+    )
+
+    total = resolved = active = reviews = rating_sum = today_count = 0
+    today = timezone.localdate()
+    resolution_seconds = 0.0
+    departments = defaultdict(lambda: {'total': 0, 'resolved': 0, 'pending': 0, 'resolution_seconds': 0.0})
+    statuses = defaultdict(int)
+    months = defaultdict(lambda: {'total': 0, 'resolved': 0})
+
+    for date, department, status, count, seconds, review_count, ratings in rows:
+        is_resolved = status == 'Resolved'
+        total += count
+        statuses[status] += count
+        reviews += review_count
+        if date == today:
+            today_count += count
+        rating_sum += ratings
+
+        dept = departments[department]
+        dept['total'] += count
+        month = months[(date.year, date.month)]
+        month['total'] += count
+        if is_resolved:
+            resolved += count
+            resolution_seconds += seconds
+            dept['resolved'] += count
+            dept['resolution_seconds'] += seconds
+            month['resolved'] += count
+        elif status in ('Pending', 'In Progress'):
+            active += count
+            dept['pending'] += count
+
+    department_stats = {
+        name: {
+            'total': d['total'],
+            'resolved': d['resolved'],
+            'pending': d['pending'],
+            'resolution_rate': round((d['resolved'] / d['total'] * 100), 1) if d['total'] > 0 else 0,
+            'avg_response_time': round(d['resolution_seconds'] / d['resolved'] / 3600, 1) if d['resolved'] else 0,
+        }
+        for name, d in departments.items()
+    }
+    avg_rating = rating_sum / reviews if reviews else None
+
+    return {
+        'total_complaints': total,
+        'resolved_complaints': resolved,
+        'active_complaints': active,
+        'today_complaints': today_count,
+        'average_resolution_time_hours': round(resolution_seconds / resolved / 3600, 2) if resolved else 0,
+        'citizen_satisfaction': round((avg_rating / 5) * 100, 1) if avg_rating else 0,
+        'department_wise_stats': department_stats,
+        'status_distribution': dict(statuses),
+        'monthly_trend': [
+            {'month': Date(year, month, 1).strftime('%b'), 'total': m['total'], 'resolved': m['resolved']}
+            for (year, month), m in sorted(months.items())
+        ],
+    }
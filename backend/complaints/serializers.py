@@ -1,8 +1,13 @@
 from rest_framework import serializers
+from django.db.models import Count, Prefetch
+from django.db.models.functions import Substr
+from . import upvote_log
 from .models import Complaint, Comment
 from django.contrib.auth.models import User
 from account.serializers import MunicipalitySerializer
 
+SUMMARY_LENGTH = 140
+
 class CommentSerializer(serializers.ModelSerializer):
     user = serializers.StringRelatedField(read_only=True)
 
@@ -10,6 +15,106 @@ class CommentSerializer(serializers.ModelSerializer):
         model = Comment
         fields = ['id', 'user', 'content', 'created_at']
 
+class ComplaintListSerializer(serializers.ListSerializer):
+    """
+    Resolves the requesting user's upvotes for the whole page in one query,
+    so ``is_upvoted`` does not hit the database per complaint.
+    """
+
+    def to_representation(self, data):
+        complaints = list(data.all() if hasattr(data, 'all') else data)
+        request = self.context.get('request')
+        wants_upvotes = 'is_upvoted' in self.child.fields
+        if wants_upvotes and request and request.user.is_authenticated and 'upvoted_ids' not in self.context:
+            self.context['upvoted_ids'] = set(
+                Complaint.upvotes.through.objects.filter(
+                    user_id=request.user.id,
+                    complaint_id__in=[c.id for c in complaints],
+                ).values_list('complaint_id', flat=True)
+            )
+        if upvote_log.enabled() and complaints:
+            upvote_log.annotate_pending(complaints, request.user.id if request else None)
+        return super().to_representation(complaints)
+
+
+class ComplaintFieldsetMixin:
+    """
+    Sparse fieldsets for complaint lists.
+
+    ``?fields=a,b`` picks the fields to render (``default_fields`` otherwise),
+    ``?expand=comments`` adds the nested comments. ``optimize_queryset`` defers
+    every column the selected fields do not read, so unrequested data is never
+    fetched from the database.
+    """
+    default_fields = ()
+    expandable_fields = ('comments',)
+    # Serializer fields that read other columns than their own name
+    field_columns = {
+        'total_upvotes': ('upvote_count',),
+        'summary': (),
+        'comment_count': (),
+        'is_upvoted': (),
+        'comments': (),
+        'score': (),
+    }
+    # Needed by the keyset paginators to build cursors
+    always_loaded = ('created_at', 'rank_score')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        selected = self.get_selected_fields(self.context.get('request'))
+        for name in list(self.fields):
+            if name not in selected:
+                self.fields.pop(name)
+
+    @classmethod
+    def get_selected_fields(cls, request):
+        params = request.query_params if request is not None else {}
+        requested = [f.strip() for f in params.get('fields', '').split(',') if f.strip()]
+        expand = {f.strip() for f in params.get('expand', '').split(',') if f.strip()}
+
+        selected = [f for f in requested if f in cls.Meta.fields] or list(cls.default_fields)
+        selected += [f for f in cls.expandable_fields if f in expand and f not in selected]
+        return selected
+
+    @classmethod
+    def optimize_queryset(cls, queryset, request):
+        selected = cls.get_selected_fields(request)
+
+        needed = set(cls.always_loaded)
+        for name in selected:
+            needed.update(cls.field_columns.get(name, (name,)))
+        deferred = [
+            f.name for f in Complaint._meta.concrete_fields
+            if not f.primary_key and f.name not in needed
+        ]
+        queryset = queryset.defer(*deferred)
+
+        if 'user' in selected:
+            queryset = queryset.select_related('user')
+        if 'municipality' in selected and isinstance(cls._declared_fields.get('municipality'), serializers.Serializer):
+            queryset = queryset.select_related('municipality')
+        if 'comments' in selected:
+            queryset = queryset.prefetch_related(
+                Prefetch('comments', queryset=Comment.objects.select_related('user'))
+            )
+        if 'comment_count' in selected:
+            queryset = queryset.annotate(comment_count=Count('comments'))
+        if 'summary' in selected:
+            queryset = queryset.annotate(summary=Substr('description', 1, SUMMARY_LENGTH))
+        return queryset
+
+    def get_comment_count(self, obj):
+        if hasattr(obj, 'comment_count'):
+            return obj.comment_count
+        return obj.comments.count()
+
+    def get_summary(self, obj):
+        if hasattr(obj, 'summary'):
+            return obj.summary
+        return obj.description[:SUMMARY_LENGTH]
+
+
 class ComplaintSerializer(serializers.ModelSerializer):
     user = serializers.StringRelatedField(read_only=True)
     comments = CommentSerializer(many=True, read_only=True)
@@ -23,24 +128,56 @@ class ComplaintSerializer(serializers.ModelSerializer):
             'id', 'user', 'municipality',  
             'department', 'topic', 'description',
             'location', 'latitude', 'longitude', 'media',
-            'status', 'created_at', 'updated_at', 'total_upvotes', 'comments', 'priority', 'is_upvoted'
+            'status', 'created_at', 'updated_at', 'total_upvotes', 'comments', 'priority', 'scoring_status', 'is_upvoted'
         ]
         # Note: 'status' removed from read_only to allow admin updates via PATCH
-        read_only_fields = ['user', 'created_at', 'updated_at', 'total_upvotes', 'comments', 'is_upvoted']
+        read_only_fields = ['user', 'created_at', 'updated_at', 'total_upvotes', 'comments', 'scoring_status', 'is_upvoted']
+        list_serializer_class = ComplaintListSerializer
+
+    def to_representation(self, instance):
+        if upvote_log.enabled() and not hasattr(instance, '_pending_upvote_delta'):
+            request = self.context.get('request')
+            upvote_log.annotate_pending([instance], request.user.id if request else None)
+        return super().to_representation(instance)
 
     def get_is_upvoted(self, obj):
+        # A vote toggled in write-behind mode but not flushed yet
+        pending = getattr(obj, '_pending_own_vote', None)
+        if pending is not None:
+            return pending > 0
+        upvoted_ids = self.context.get('upvoted_ids')
+        if upvoted_ids is not None:
+            return obj.id in upvoted_ids
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return obj.upvotes.filter(id=request.user.id).exists()
         return False
-        
-class RankedComplaintSerializer(serializers.ModelSerializer):
+
+
+class ComplaintListItemSerializer(ComplaintFieldsetMixin, ComplaintSerializer):
+    """
+    Compact complaint representation for list endpoints.
+    """
+    comment_count = serializers.SerializerMethodField()
+    summary = serializers.SerializerMethodField()
+
+    default_fields = ('id', 'topic', 'status', 'department', 'total_upvotes', 'comment_count', 'summary')
+
+    class Meta(ComplaintSerializer.Meta):
+        fields = ComplaintSerializer.Meta.fields + ['comment_count', 'summary']
+
+
+class RankedComplaintSerializer(ComplaintFieldsetMixin, serializers.ModelSerializer):
     user = serializers.StringRelatedField(read_only=True)
     municipality = MunicipalitySerializer(read_only=True)
 
     total_upvotes = serializers.SerializerMethodField()
     score = serializers.SerializerMethodField()
     comments = CommentSerializer(many=True, read_only=True)
+    comment_count = serializers.SerializerMethodField()
+    summary = serializers.SerializerMethodField()
+
+    default_fields = ('id', 'topic', 'status', 'department', 'total_upvotes', 'comment_count', 'summary', 'score')
 
     class Meta:
         model = Complaint
@@ -51,11 +188,41 @@ class RankedComplaintSerializer(serializers.ModelSerializer):
             'media', 'status',
             'created_at', 'updated_at',
             'priority', 'total_upvotes',
-            'score', 'comments'
+            'score', 'comments', 'comment_count', 'summary'
         ]
+        list_serializer_class = ComplaintListSerializer
+
+    def to_representation(self, instance):
+        # Adds toggles still waiting in the write-behind log to total_upvotes
+        if upvote_log.enabled() and not hasattr(instance, '_pending_upvote_delta'):
+            upvote_log.annotate_pending([instance])
+        return super().to_representation(instance)
 
     def get_total_upvotes(self, obj):
         return obj.total_upvotes()
 
     def get_score(self, obj):
         return round(obj.score, 3)
+
+
+class DashboardComplaintSerializer(serializers.ModelSerializer):
+    """
+    Recent complaints on the municipality dashboard: a summary instead of the
+    full description, with the score and its priority bucket computed in SQL.
+    """
+    priority = serializers.CharField(source='priority_bucket', read_only=True)
+    score = serializers.FloatField(source='computed_score', read_only=True)
+    summary = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = Complaint
+        fields = ['id', 'topic', 'department', 'status', 'created_at', 'priority', 'score', 'summary']
+
+    @staticmethod
+    def get_queryset(municipality_id):
+        return (
+            Complaint.objects.filter(municipality_id=municipality_id)
+            .only('id', 'topic', 'department', 'status', 'created_at')
+            .with_priority_bucket()
+            .annotate(summary=Substr('description', 1, SUMMARY_LENGTH))
+        )
@@ -0,0 +1,79 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from account.models import bump_stats_version
+
+from . import rollups
+from .models import Complaint
+
+
+# Also shown on the dashboard, so changing them invalidates it
+DASHBOARD_FIELDS = rollups.COMPLAINT_FIELDS | {'topic', 'description', 'priority'}
+
+
+def _municipalities(captured):
+    return [key[0] for key, _ in captured.values()]
+
+
+@receiver(pre_save, sender=Complaint)
+def capture_rollup_before_save(sender, instance, update_fields=None, **kwargs):
+    # Saves of other fields (counters, MinHash, scoring state) leave rollups and dashboard alone
+    instance._rollup_before = None
+    instance._dashboard_changed = update_fields is None or bool(DASHBOARD_FIELDS & update_fields)
+    if not instance.pk:
+        instance._rollup_before = {}
+    elif update_fields is None or rollups.COMPLAINT_FIELDS & update_fields:
+        # Complaint.save runs in a transaction: the row stays locked until
+        # post_save, so concurrent saves never apply the same "before" twice
+        instance._rollup_before = rollups.capture(
+            [instance.pk], lock=transaction.get_connection().in_atomic_block,
+        )
+
+
+@receiver(post_save, sender=Complaint)
+def update_rollup_after_save(sender, instance, **kwargs):
+    before = getattr(instance, '_rollup_before', None)
+    if before is not None:
+        if {'municipality_id', *rollups.COMPLAINT_FIELDS} & instance.get_deferred_fields():
+            after = rollups.capture([instance.pk])
+        else:
+            # The save does not touch the review, so its rating carries over
+            _, (_, _, review_count, rating_sum) = before.get(instance.pk, (None, (0, 0.0, 0, 0)))
+            after = {instance.pk: rollups.contribution(
+                instance.municipality_id, instance.created_at, instance.department,
+                instance.status, instance.updated_at, rating_sum if review_count else None,
+            )}
+        rollups.apply_changes(before, after)
+    if getattr(instance, '_dashboard_changed', True):
+        bump_stats_version(instance.municipality_id, *_municipalities(before or {}))
+
+
+@receiver(post_delete, sender=Complaint)
+def update_rollup_after_delete(sender, instance, **kwargs):
+    # The review (if any) was deleted first and already removed its rating
+    rollups.apply(removed=[rollups.contribution(
+        instance.municipality_id, instance.created_at, instance.department,
+        instance.status, instance.updated_at, None,
+    )])
+    bump_stats_version(instance.municipality_id)
+
+
+@receiver(pre_save, sender='review.Review')
+def capture_review_rollup_before_save(sender, instance, **kwargs):
+    instance._rollup_before = rollups.capture([instance.complaint_id])
+
+
+@receiver(post_save, sender='review.Review')
+def update_review_rollup_after_save(sender, instance, **kwargs):
+    after = rollups.capture([instance.complaint_id])
+    rollups.apply_changes(instance._rollup_before, after)
+    bump_stats_version(*_municipalities(after))
+
+
+@receiver(post_delete, sender='review.Review')
+def update_review_rollup_after_delete(sender, instance, **kwargs):
+    captured = rollups.capture([instance.complaint_id])
+    for key, _ in captured.values():
+        rollups.apply(removed=[(key, (0, 0.0, 1, instance.rating))])
+    bump_stats_version(*_municipalities(captured))
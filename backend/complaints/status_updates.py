@@ -0,0 +1,126 @@
+"""
+Batch status transitions for municipality officials.
+
+``apply_status_updates`` takes a list of ``{complaint_id, status, remarks}``
+items and applies them in one transaction:
+- ownership and current statuses come from a single query limited to the
+  official's municipality (rows are locked where the database supports it);
+- complaints are updated with one ``UPDATE ... WHERE status = <old>`` per
+  (old, new) pair, so a complaint changed by someone else in the meantime
+  is reported as a conflict instead of being overwritten;
+- the ComplaintActivity rows are written with one ``bulk_create``;
+- the dashboard rollups are adjusted and ``stats_version`` is bumped once,
+  since ``QuerySet.update()`` bypasses the model signals.
+
+Every item gets a result, in request order.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from account.models import bump_stats_version
+from . import rollups
+from .models import Complaint, ComplaintActivity
+
+STATUS_DISPLAY = dict(Complaint.STATUS_CHOICES)
+
+
+class StatusUpdateSerializer(serializers.Serializer):
+    complaint_id = serializers.IntegerField(min_value=1)
+    status = serializers.ChoiceField(choices=Complaint.STATUS_CHOICES)
+    remarks = serializers.CharField(required=False, allow_blank=True, default='')
+
+
+def max_items():
+    return getattr(settings, 'BULK_STATUS_UPDATE_MAX_ITEMS', 500)
+
+
+def _failure(complaint_id, error):
+    return {'complaint_id': complaint_id, 'success': False, 'error': error}
+
+
+def apply_status_updates(official, items):
+    """
+    Applies the status changes in ``items`` to complaints of the official's
+    municipality and returns one result per item.
+    """
+    results = [None] * len(items)
+    requested = {}
+    validator = StatusUpdateSerializer()
+    for index, item in enumerate(items):
+        complaint_id = item.get('complaint_id') if isinstance(item, dict) else None
+        try:
+            data = validator.run_validation(item)
+        except serializers.ValidationError as e:
+            results[index] = _failure(complaint_id, e.detail)
+            continue
+        if data['complaint_id'] in requested:
+            results[index] = _failure(data['complaint_id'], 'Complaint appears more than once in this batch.')
+            continue
+        requested[data['complaint_id']] = (index, data)
+
+    with transaction.atomic():
+        current = dict(
+            Complaint.objects.select_for_update()
+            .filter(pk__in=list(requested), municipality_id=official.municipality_id)
+            .values_list('id', 'status')
+        )
+
+        transitions = defaultdict(list)
+        for complaint_id, (index, data) in requested.items():
+            if complaint_id not in current:
+                results[index] = _failure(complaint_id, 'Complaint not found in your municipality.')
+            elif current[complaint_id] == data['status']:
+                results[index] = _failure(complaint_id, 'Status is already set to this value.')
+            else:
+                transitions[current[complaint_id], data['status']].append(complaint_id)
+
+        if transitions:
+            changing = [pk for ids in transitions.values() for pk in ids]
+            before = rollups.capture(changing)
+            now = timezone.now()
+            applied = []
+            for (old_status, new_status), ids in transitions.items():
+                updated = Complaint.objects.filter(pk__in=ids, status=old_status).update(
+                    status=new_status, updated_at=now,
+                )
+                if updated != len(ids):
+                    # Someone else changed some of these since they were read
+                    ids = list(Complaint.objects.filter(pk__in=ids, status=new_status, updated_at=now)
+                               .values_list('id', flat=True))
+                applied += [(pk, old_status, new_status) for pk in ids]
+
+            ComplaintActivity.objects.bulk_create([
+                ComplaintActivity(
+                    complaint_id=pk,
+                    updated_by=official,
+                    previous_status=old_status,
+                    new_status=new_status,
+                    remarks=requested[pk][1]['remarks'],
+                )
+                for pk, old_status, new_status in applied
+            ])
+            applied_ids = [pk for pk, _, _ in applied]
+            rollups.apply_changes(
+                {pk: before[pk] for pk in applied_ids if pk in before},
+                rollups.capture(applied_ids),
+            )
+            if applied:
+                bump_stats_version(official.municipality_id)
+
+            for pk, old_status, new_status in applied:
+                results[requested[pk][0]] = {
+                    'complaint_id': pk,
+                    'success': True,
+                    'previous_status': old_status,
+                    'new_status': new_status,
+                    'new_status_display': STATUS_DISPLAY[new_status],
+                }
+            for pk in changing:
+                index = requested[pk][0]
+                if results[index] is None:
+                    results[index] = _failure(pk, 'Status was changed by someone else; reload and retry.')
+    return results
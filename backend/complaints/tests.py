@@ -1,3 +1,1340 @@
-from django.test import TestCase
+import base64
+import importlib
+import json
+import random
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.apps import apps as django_apps
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import NotSupportedError, close_old_connections, connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from account import caching
+from account.models import Municipality
+from api.background import BatchingWorker
+from api.models import MunicipalityOfficial
+from review.models import Review
+from . import llm_cache, rollups, upvote_log
+from .ai import score_pending_complaints
+from .bulk_import import import_complaints
+from .classifier import get_priority_classifier, reset_priority_classifier
+from .embeddings import EmbeddingStore, embed, rank_by_similarity
+from .minhash import estimated_jaccard, find_duplicates, minhash_signature, shingles
+from .models import Complaint, ComplaintActivity, ComplaintDailyStat, Comment, UpvoteLogEntry
+from .pagination import ChronologicalPagination, DashboardRecentPagination, RankedPagination
+from .serializers import SUMMARY_LENGTH
+from .views import calculate_distance
+
+
+class ComplaintQueryCountTests(TestCase):
+    """
+    Listing and retrieving complaints must cost a constant number of queries,
+    regardless of how many complaints, comments and upvotes there are.
+    """
+
+    def setUp(self):
+        self.municipality = Municipality.objects.create(name="Cuttack", district="Cuttack", state="Odisha")
+        self.user = User.objects.create(username="citizen")
+        self.others = [User.objects.create(username=f"neighbour_{i}") for i in range(3)]
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_complaints(self, count):
+        for i in range(count):
+            complaint = Complaint.objects.create(
+                user=self.others[i % 3],
+                municipality=self.municipality,
+                department="Water",
+                topic=f"Leak {i}",
+                description="Pipe burst near the market.",
+                location="Market Road",
+                latitude=20.46,
+                longitude=85.88,
+            )
+            for other in self.others:
+                Comment.objects.create(complaint=complaint, user=other, content="Same here")
+            complaint.upvotes.add(self.user, *self.others[:i % 3])
+
+    def test_list_query_count_is_constant(self):
+        # page of complaints + prefetched comments (with authors) + current user's upvotes
+        params = {"page_size": 100, "fields": "id,user,topic,total_upvotes,is_upvoted", "expand": "comments"}
+        self.create_complaints(5)
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/complaints/", params)
+        self.assertEqual(len(response.data["results"]), 5)
+
+        self.create_complaints(25)
+        with self.assertNumQueries(3):
+            response = self.client.get("/api/complaints/", params)
+        self.assertEqual(len(response.data["results"]), 30)
+        self.assertTrue(all(item["is_upvoted"] for item in response.data["results"]))
+        self.assertTrue(all(len(item["comments"]) == 3 for item in response.data["results"]))
+
+    def test_municipality_list_query_count_is_constant(self):
+        self.create_complaints(20)
+        with self.assertNumQueries(1):
+            response = self.client.get(f"/api/municipalities/{self.municipality.id}/complaints/", {"page_size": 100})
+        self.assertEqual(len(response.data["results"]), 20)
+
+    def test_retrieve_query_count_is_constant(self):
+        self.create_complaints(1)
+        complaint = Complaint.objects.get()
+        # complaint + prefetched comments + is_upvoted
+        with self.assertNumQueries(3):
+            response = self.client.get(f"/api/complaints/{complaint.id}/")
+        self.assertTrue(response.data["is_upvoted"])
+        self.assertEqual(len(response.data["comments"]), 3)
+
+
+class ComplaintFieldsetTests(TestCase):
+
+    def setUp(self):
+        self.municipality = Municipality.objects.create(name="Cuttack", district="Cuttack", state="Odisha")
+        self.user = User.objects.create(username="citizen")
+        self.complaint = Complaint.objects.create(
+            user=self.user,
+            municipality=self.municipality,
+            department="Roads",
+            topic="Pothole",
+            description="x" * 500,
+            location="Ring Road",
+            latitude=20.46,
+            longitude=85.88,
+        )
+        Comment.objects.create(complaint=self.complaint, user=self.user, content="Still there")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_default_list_item_is_compact(self):
+        response = self.client.get("/api/complaints/")
+        item = response.data["results"][0]
+        self.assertEqual(
+            set(item),
+            {"id", "topic", "status", "department", "total_upvotes", "comment_count", "summary"},
+        )
+        self.assertEqual(item["comment_count"], 1)
+        self.assertEqual(len(item["summary"]), 140)
+
+    def test_fields_and_expand(self):
+        response = self.client.get("/api/complaints/", {"fields": "id,description", "expand": "comments"})
+        item = response.data["results"][0]
+        self.assertEqual(set(item), {"id", "description", "comments"})
+        self.assertEqual(len(item["description"]), 500)
+        self.assertEqual(item["comments"][0]["content"], "Still there")
+
+    def test_unrequested_columns_are_deferred(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get("/api/complaints/ranked/", {"fields": "id,topic,score"})
+        sql = queries.captured_queries[0]["sql"]
+        self.assertIn('"topic"', sql)
+        self.assertNotIn('"description"', sql)
+        self.assertNotIn('"location"', sql)
+
+
+def fake_completion(content):
+    message = SimpleNamespace(content=content)
+    return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class PriorityScoringTests(TestCase):
+    """
+    Complaints are saved with a provisional priority and scored after commit.
+    """
+
+    def setUp(self):
+        llm_cache.get_cache().clear()
+        embeddings_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(embeddings_dir.cleanup)
+        settings_override = override_settings(COMPLAINT_EMBEDDINGS_DIR=embeddings_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.municipality = Municipality.objects.create(name="Cuttack", district="Cuttack", state="Odisha")
+        self.user = User.objects.create(username="citizen")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def submit(self, description):
+        return self.client.post("/api/complaints/", {
+            "municipality_id": self.municipality.id,
+            "department": "Water",
+            "topic": "Leak",
+            "description": description,
+            "location": "Market Road",
+            "latitude": "20.46",
+            "longitude": "85.88",
+        })
+
+    @mock.patch("complaints.ai.client")
+    def test_create_returns_before_scoring(self, client):
+        client.chat.completions.create.return_value = fake_completion("[0.9]")
+        with self.captureOnCommitCallbacks(execute=False) as callbacks:
+            response = self.submit("Main water pipe burst, street flooded")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data["scoring_status"], "Pending")
+        self.assertEqual(float(response.data["priority"]), 0.5)
+        client.chat.completions.create.assert_not_called()
+
+        for callback in callbacks:
+            callback()
+        complaint = Complaint.objects.get(pk=response.data["id"])
+        self.assertEqual(complaint.scoring_status, "Scored")
+        self.assertEqual(float(complaint.priority), 0.9)
+        self.assertAlmostEqual(complaint.rank_score, Complaint.rank_key(0.9, 0, complaint.created_at), places=6)
+
+    @mock.patch("complaints.ai.client")
+    def test_spam_is_rejected_and_penalized_when_scored(self, client):
+        client.chat.completions.create.return_value = fake_completion("[0.05]")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.submit("asdf asdf")
+
+        complaint = Complaint.objects.get(pk=response.data["id"])
+        self.assertEqual(complaint.scoring_status, "Spam")
+        self.assertEqual(complaint.status, "Rejected")
+        self.assertEqual(complaint.activities.get().new_status, "Rejected")
+        self.user.profile.refresh_from_db()
+        self.assertEqual(self.user.profile.honesty_score, 90)
+
+    @mock.patch("complaints.ai.client")
+    def test_failed_scoring_keeps_provisional_priority(self, client):
+        client.chat.completions.create.side_effect = TimeoutError("model timed out")
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.submit("Streetlight broken")
+
+        complaint = Complaint.objects.get(pk=response.data["id"])
+        self.assertEqual(complaint.scoring_status, "Failed")
+        self.assertEqual(float(complaint.priority), 0.5)
+        self.assertEqual(complaint.status, "Pending")
+
+    @mock.patch("complaints.ai.client")
+    def test_pending_descriptions_are_scored_in_one_call(self, client):
+        client.chat.completions.create.return_value = fake_completion("[0.8, 0.1, 0.6]")
+        with self.captureOnCommitCallbacks(execute=False):
+            ids = [self.submit(text).data["id"] for text in ("Sewage overflow", "test", "Garbage pile")]
+
+        score_pending_complaints(ids)
+
+        self.assertEqual(client.chat.completions.create.call_count, 1)
+        statuses = dict(Complaint.objects.values_list("id", "scoring_status"))
+        self.assertEqual([statuses[i] for i in ids], ["Scored", "Spam", "Scored"])
+
+    @mock.patch("complaints.ai.client")
+    def test_resubmitted_descriptions_are_answered_from_cache(self, client):
+        client.chat.completions.create.return_value = fake_completion("[0.7]")
+        with self.captureOnCommitCallbacks(execute=True):
+            first = self.submit("Water pipe burst near the market")
+        with self.captureOnCommitCallbacks(execute=True):
+            second = self.submit("  water pipe BURST near the   market ")
+
+        self.assertEqual(client.chat.completions.create.call_count, 1)
+        self.assertEqual(Complaint.objects.get(pk=second.data["id"]).priority, Complaint.objects.get(pk=first.data["id"]).priority)
+        self.assertEqual(llm_cache.hit_rates()["priority"], {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+    @mock.patch("complaints.ai.client")
+    def test_similarity_checks_are_cached(self, client):
+        with self.captureOnCommitCallbacks(execute=False):
+            existing = self.submit("Water pipe burst near the market").data["id"]
+        client.chat.completions.create.return_value = fake_completion(f"[{existing}]")
+
+        payload = {
+            "latitude": "20.46", "longitude": "85.88",
+            "municipality_id": self.municipality.id,
+            "description": "Burst pipe flooding the market road",
+        }
+        for _ in range(2):
+            response = self.client.post("/api/complaints/check_similar/", payload)
+            self.assertEqual([c["id"] for c in response.data["similar_complaints"]], [existing])
+
+        self.assertEqual(client.chat.completions.create.call_count, 1)
+        self.assertEqual(llm_cache.hit_rates()["similarity"]["hits"], 1)
+
+
+class BatchingWorkerTests(TestCase):
+
+    def test_duplicate_keys_are_coalesced_into_one_batch(self):
+        batches = []
+        done = threading.Event()
+
+        def handler(batch):
+            batches.append(batch)
+            done.set()
+
+        worker = BatchingWorker("test-worker", handler, batch_size=10, max_wait=0.2)
+        for key in (1, 2, 1, 3, 2):
+            worker.submit(key)
+
+        self.assertTrue(done.wait(5))
+        self.assertEqual(batches, [[1, 2, 3]])
+
+
+URGENT = [
+    "Sewage overflowing into homes, children falling sick",
+    "Live electric wire fallen on the road after the storm",
+    "Main water pipe burst, whole street flooded",
+    "Bridge railing collapsed, vehicles at risk of falling",
+]
+TRIVIAL = [
+    "test test hello",
+    "asdf qwerty",
+    "just checking the app lol",
+    "hello world testing",
+]
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class PriorityClassifierTests(TestCase):
+    """
+    The local classifier, trained from remotely scored complaints.
+    """
+
+    def setUp(self):
+        llm_cache.get_cache().clear()
+        self.municipality = Municipality.objects.create(name="Cuttack", district="Cuttack", state="Odisha")
+        self.user = User.objects.create(username="citizen")
+        for i in range(5):
+            for text in URGENT:
+                self.create(text, 0.9)
+            for text in TRIVIAL:
+                self.create(text, 0.05)
+
+        model_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(model_dir.cleanup)
+        settings_override = override_settings(PRIORITY_CLASSIFIER_PATH=Path(model_dir.name) / "model.npz")
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(reset_priority_classifier)
+        call_command("train_priority_classifier", stdout=StringIO())
+
+    def create(self, description, priority):
+        return Complaint.objects.create(
+            user=self.user, municipality=self.municipality, department="Others", topic="Issue",
+            description=description, location="Somewhere", latitude=20.46, longitude=85.88,
+            priority=priority, scoring_status="Scored", scored_by="remote",
+        )
+
+    def test_separates_urgent_from_trivial_quickly(self):
+        classifier = get_priority_classifier()
+        self.assertGreater(classifier.predict("Sewage overflowing into homes near the school", "Others"), 0.6)
+        self.assertLess(classifier.predict("testing hello", "Others"), 0.2)
+
+        start = time.perf_counter()
+        for _ in range(1000):
+            classifier.predict(URGENT[0], "Others")
+        self.assertLess((time.perf_counter() - start) / 1000, 0.001)
+
+    @override_settings(PRIORITY_SCORING_MODE="local_first")
+    @mock.patch("complaints.ai.client")
+    def test_local_first_escalates_only_borderline_scores(self, client):
+        client.chat.completions.create.return_value = fake_completion("[0.3]")
+        confident = self.create("Live electric wire fallen near the market", 0.5)
+        borderline = self.create("pothole", 0.5)
+        Complaint.objects.filter(pk__in=[confident.pk, borderline.pk]).update(scoring_status="Pending")
+
+        with override_settings(PRIORITY_BORDERLINE_BAND=(0.0, 0.0)):
+            score_pending_complaints([confident.pk])
+        client.chat.completions.create.assert_not_called()
+
+        with override_settings(PRIORITY_BORDERLINE_BAND=(0.0, 1.0)):
+            score_pending_complaints([borderline.pk])
+        self.assertEqual(client.chat.completions.create.call_count, 1)
+        borderline.refresh_from_db()
+        self.assertEqual(float(borderline.priority), 0.3)
+
+    @override_settings(PRIORITY_SCORING_MODE="remote")
+    @mock.patch("complaints.ai.client")
+    def test_remote_failures_fall_back_to_local_model(self, client):
+        client.chat.completions.create.side_effect = TimeoutError("model timed out")
+        complaint = self.create("Main water pipe burst near the temple", 0.5)
+        Complaint.objects.filter(pk=complaint.pk).update(scoring_status="Pending")
+
+        score_pending_complaints([complaint.pk])
+
+        complaint.refresh_from_db()
+        self.assertEqual(complaint.scoring_status, "Scored")
+        self.assertGreater(float(complaint.priority), 0.6)
+        self.assertEqual(complaint.scored_by, "local")
+
+    def test_rows_scored_before_scored_by_are_kept_for_training(self):
+        Complaint.objects.update(scored_by=None)
+        with self.assertRaises(CommandError):
+            call_command("train_priority_classifier", stdout=StringIO())
+
+        migration = importlib.import_module("complaints.migrations.0015_complaint_scored_by")
+        migration.backfill_scored_by(django_apps, None)
+        out = StringIO()
+        call_command("train_priority_classifier", stdout=out)
+        self.assertIn("Saved model", out.getvalue())
+
+    def test_training_ignores_local_scores(self):
+        for text in TRIVIAL:
+            complaint = self.create(text, 0.95)
+            Complaint.objects.filter(pk=complaint.pk).update(scored_by="local")
+
+        out = StringIO()
+        call_command("train_priority_classifier", stdout=out)
+        trained, evaluated = map(int, re.search(r"Trained on (\d+) complaints, evaluated on (\d+)", out.getvalue()).groups())
+        self.assertEqual(trained + evaluated, 5 * (len(URGENT) + len(TRIVIAL)))
+        reset_priority_classifier()
+        self.assertLess(get_priority_classifier().predict("testing hello", "Others"), 0.2)
+
+
+class MinHashDuplicateTests(TestCase):
+    """
+    check_similar's fallback finds near-duplicates through the LSH index.
+    """
+
+    def setUp(self):
+        self.municipality = Municipality.objects.create(name="Cuttack", district="Cuttack", state="Odisha")
+        self.user = User.objects.create(username="citizen")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create(self, description, municipality=None):
+        return Complaint.objects.create(
+            user=self.user, municipality=municipality or self.municipality, department="Water", topic="Issue",
+            description=description, location="Market Road", latitude=20.46, longitude=85.88,
+        )
+
+    def test_estimated_jaccard_tracks_exact_jaccard(self):
+        a = "Water pipe burst near the main market, road flooded since morning"
+        b = "Water pipe burst near the main market, road flooded since yesterday"
+        exact = len(shingles(a) & shingles(b)) / len(shingles(a) | shingles(b))
+        self.assertAlmostEqual(estimated_jaccard(minhash_signature(a), minhash_signature(b)), exact, delta=0.15)
+
+    @mock.patch("complaints.ai.client")
+    def test_check_similar_returns_near_duplicates_only(self, client):
+        client.api_key = ""
+        duplicate = self.create("Water pipe burst near the main market, road flooded")
+        self.create("Streetlights not working in sector 5 for a week")
+        other_city = Municipality.objects.create(name="Puri", district="Puri", state="Odisha")
+        self.create("Water pipe burst near the main market, road flooded", municipality=other_city)
+
+        response = self.client.post("/api/complaints/check_similar/", {
+            "latitude": "20.46", "longitude": "85.88", "municipality_id": self.municipality.id,
+            "description": "water pipe has burst near main market and the road is flooded",
+        })
+        self.assertEqual([c["id"] for c in response.data["similar_complaints"]], [duplicate.id])
+
+    def test_buckets_follow_description_edits(self):
+        complaint = self.create("Garbage not collected for two weeks in ward 12")
+        original = set(complaint.lsh_buckets.values_list("band", "bucket"))
+        self.assertEqual(len(original), 32)
+
+        complaint.description = "Open manhole on the highway near the bus stand"
+        complaint.save()
+
+        self.assertTrue(original.isdisjoint(complaint.lsh_buckets.values_list("band", "bucket")))
+        self.assertEqual(find_duplicates("Garbage not collected for two weeks in ward 12", [complaint]), [])
+        self.assertEqual(find_duplicates("open manhole on the highway near bus stand", [complaint]), [complaint])
+
+
+class EmbeddingSearchTests(TestCase):
+    """
+    Memory-mapped embeddings pick check_similar's candidates by relevance.
+    """
+
+    def setUp(self):
+        llm_cache.get_cache().clear()
+        embeddings_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(embeddings_dir.cleanup)
+        settings_override = override_settings(COMPLAINT_EMBEDDINGS_DIR=embeddings_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.municipality = Municipality.objects.create(name="Cuttack", district="Cuttack", state="Odisha")
+        self.user = User.objects.create(username="citizen")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create(self, description, latitude=20.46):
+        return Complaint.objects.create(
+            user=self.user, municipality=self.municipality, department="Others", topic="Issue",
+            description=description, location="Market Road", latitude=latitude, longitude=85.88,
+        )
+
+    def test_vectors_are_appended_and_updated_in_place(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            leak = self.create("Water pipe leaking near the school gate")
+            light = self.create("Streetlight broken on the bridge")
+        ids, vectors = EmbeddingStore(self.municipality.id).load()
+        self.assertEqual(ids.tolist(), [leak.id, light.id])
+        self.assertEqual(vectors.dtype, np.float32)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            light.description = "Garbage dumped on the bridge"
+            light.save()
+        ids, vectors = EmbeddingStore(self.municipality.id).load()
+        self.assertEqual(len(ids), 2)
+        self.assertAlmostEqual(float(vectors[1] @ embed("Garbage dumped on the bridge")), 1.0, places=5)
+
+        best = rank_by_similarity("pipe leaking at the school", [leak, light], k=1)
+        self.assertEqual(best[0][0], leak)
+
+    @mock.patch("complaints.ai.client")
+    def test_llm_confirms_the_most_relevant_nearby_complaints(self, client):
+        with self.captureOnCommitCallbacks(execute=True):
+            # Closest to the reporter, but about something else
+            for i in range(6):
+                self.create(f"Stray dogs chasing children in lane {i}", latitude=20.46)
+            relevant = self.create("Transformer sparking and power cut all night", latitude=20.465)
+        client.chat.completions.create.return_value = fake_completion(f"[{relevant.id}]")
+
+        response = self.client.post("/api/complaints/check_similar/", {
+            "latitude": "20.46", "longitude": "85.88", "municipality_id": self.municipality.id,
+            "description": "Power cut since night, transformer sparking",
+        })
+
+        prompt = client.chat.completions.create.call_args.kwargs["messages"][1]["content"]
+        self.assertIn(f"ID {relevant.id}:", prompt)
+        self.assertEqual([c["id"] for c in response.data["similar_complaints"]], [relevant.id])
+
+
+class DashboardRollupTests(TestCase):
+    """
+    Rollups maintained by signals match a full rebuild and feed the dashboard.
+    """
+
+    def setUp(self):
+        self.municipality = Municipality.objects.create(name="Cuttack", district="Cuttack", state="Odisha")
+        self.user = User.objects.create(username="citizen")
+
+    def create(self, department, status="Pending"):
+        return Complaint.objects.create(
+            user=self.user, municipality=self.municipality, department=department, topic="Issue",
+            description=f"{department} problem", location="Market Road", latitude=20.46, longitude=85.88,
+            status=status,
+        )
+
+    def rollup_rows(self):
+        return sorted(
+            ComplaintDailyStat.objects.filter(complaint_count__gt=0)
+            .values_list('date', 'department', 'status', 'complaint_count', 'review_count', 'rating_sum')
+        )
+
+    def test_signals_keep_rollups_equal_to_rebuild(self):
+        water = [self.create("Water") for _ in range(3)]
+        roads = self.create("Roads", status="In Progress")
+        water[0].status = "Resolved"
+        water[0].save()
+        Review.objects.create(complaint=water[0], user=self.user.profile, rating=4, feedback="Quick fix")
+        review = Review.objects.create(complaint=roads, user=self.user.profile, rating=2, feedback="Slow")
+        review.rating = 3
+        review.save()
+        water[1].delete()
+
+        incremental = self.rollup_rows()
+        rollups.rebuild()
+        self.assertEqual(incremental, self.rollup_rows())
+
+    def test_saves_of_stale_copies_keep_rollups_exact(self):
+        complaint = self.create("Water")
+        first, second = Complaint.objects.get(pk=complaint.pk), Complaint.objects.get(pk=complaint.pk)
+        first.status = "Resolved"
+        first.save()
+        second.status = "In Progress"
+        second.save()
+
+        incremental = self.rollup_rows()
+        rollups.rebuild()
+        self.assertEqual(incremental, self.rollup_rows())
+        self.assertEqual([row[2:4] for row in incremental], [("In Progress", 1)])
+
+    def test_saves_of_other_fields_skip_rollups(self):
+        complaint = self.create("Water")
+        version = Municipality.objects.get(pk=self.municipality.pk).stats_version
+        with CaptureQueriesContext(connection) as queries:
+            complaint.scoring_status = "Scored"
+            complaint.save(update_fields=["scoring_status"])
+        self.assertFalse([q for q in queries if 'dailystat' in q['sql'] or 'municipality' in q['sql']])
+        self.assertEqual(Municipality.objects.get(pk=self.municipality.pk).stats_version, version)
+
+    def test_summary_reads_only_rollups(self):
+        for _ in range(2):
+            self.create("Water")
+        resolved = self.create("Roads")
+        resolved.status = "Resolved"
+        resolved.save()
+        Review.objects.create(complaint=resolved, user=self.user.profile, rating=5, feedback="Great")
+
+        with self.assertNumQueries(1):
+            summary = rollups.dashboard_summary(self.municipality.id)
+
+        self.assertEqual(summary['total_complaints'], 3)
+        self.assertEqual(summary['resolved_complaints'], 1)
+        self.assertEqual(summary['active_complaints'], 2)
+        self.assertEqual(summary['status_distribution'], {'Pending': 2, 'Resolved': 1})
+        self.assertEqual(summary['department_wise_stats']['Water']['pending'], 2)
+        self.assertEqual(summary['department_wise_stats']['Roads']['resolution_rate'], 100.0)
+        self.assertEqual(summary['citizen_satisfaction'], 100.0)
+        self.assertEqual(summary['monthly_trend'][0]['total'], 3)
+        self.assertEqual(summary['today_complaints'], 3)
+
+    def test_today_count_excludes_older_days(self):
+        older = self.create("Water")
+        self.create("Roads")
+        Complaint.objects.filter(pk=older.pk).update(created_at=timezone.now() - timedelta(days=2))
+        rollups.rebuild()
+
+        summary = rollups.dashboard_summary(self.municipality.id)
+        self.assertEqual(summary['total_complaints'], 2)
+        self.assertEqual(summary['today_complaints'], 1)
+
+    @mock.patch("account.enrichment.municipality_enrichment.submit")
+    def test_dashboard_endpoint_serves_rollup_stats(self, populate):
+        self.create("Water")
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(f"/api/municipalities/{self.municipality.id}/dashboard/")
+        self.assertEqual(response.data['total_complaints'], 1)
+        self.assertEqual(response.data['department_wise_stats']['Water']['total'], 1)
+
+
+@mock.patch("account.enrichment.municipality_enrichment.submit")
+class DashboardCacheTests(TestCase):
+    """
+    Dashboards are cached per municipality stats_version and revalidated with ETags.
+    """
+
+    def setUp(self):
+        caching.get_cache().clear()
+        self.municipality = Municipality.objects.create(name="Puri", district="Puri", state="Odisha")
+        self.user = User.objects.create(username="citizen")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.url = f"/api/municipalities/{self.municipality.id}/dashboard/"
+
+    def create(self):
+        return Complaint.objects.create(
+            user=self.user, municipality=self.municipality, department="Water", topic="Leak",
+            description="Pipe leaking near the temple", location="Grand Road", latitude=19.81, longitude=85.83,
+        )
+
+    def version(self):
+        return Municipality.objects.values_list('stats_version', flat=True).get(pk=self.municipality.pk)
+
+    def test_unchanged_dashboard_returns_not_modified(self, populate):
+        self.create()
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertFalse([q for q in queries if 'complaints_' in q['sql']])
+
+    def test_cached_payload_skips_recomputation(self, populate):
+        self.create()
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(response.data['total_complaints'], 1)
+        self.assertFalse([q for q in queries if 'complaints_' in q['sql']])
+
+    def test_writes_bump_version_and_etag(self, populate):
+        first = self.client.get(self.url)
+        self.assertEqual(first.data['total_complaints'], 0)
+
+        version = self.version()
+        complaint = self.create()
+        self.assertGreater(self.version(), version)
+
+        second = self.client.get(self.url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertEqual(second.data['total_complaints'], 1)
+
+        version = self.version()
+        Review.objects.create(complaint=complaint, user=self.user.profile, rating=4, feedback="Fixed")
+        self.assertGreater(self.version(), version)
+        version = self.version()
+        with self.captureOnCommitCallbacks(execute=True):
+            complaint.apply_upvote_delta(1)
+            # Upvotes leave the municipality row alone until they commit
+            self.assertEqual(self.version(), version)
+        self.assertGreater(self.version(), version)
+
+    def test_full_save_does_not_overwrite_version(self, populate):
+        stale = Municipality.objects.get(pk=self.municipality.pk)
+        self.create()
+        version = self.version()
+        stale.mayor_name = "A. Das"
+        stale.save()
+        self.assertGreater(self.version(), version)
+
+
+@mock.patch("account.enrichment.municipality_enrichment.submit")
+class DashboardRecentComplaintsTests(TestCase):
+    """
+    The dashboard embeds one bounded page of recent complaints; the rest is cursor-paginated.
+    """
+
+    def setUp(self):
+        caching.get_cache().clear()
+        self.municipality = Municipality.objects.create(name="Balasore", district="Balasore", state="Odisha")
+        self.user = User.objects.create(username="citizen")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create(self, count, priority="0.50"):
+        return [
+            Complaint.objects.create(
+                user=self.user, municipality=self.municipality, department="Roads", topic=f"Pothole {i}",
+                description="Deep pothole on the highway " * 20, location="NH16",
+                latitude=21.49, longitude=86.93, priority=Decimal(priority),
+            )
+            for i in range(count)
+        ]
+
+    def test_dashboard_embeds_first_page_without_descriptions(self, populate):
+        self.create(DashboardRecentPagination.page_size + 2)
+        response = self.client.get(f"/api/municipalities/{self.municipality.id}/dashboard/")
+
+        recent = response.data['recent_complaints']
+        self.assertEqual(len(recent), DashboardRecentPagination.page_size)
+        self.assertNotIn('description', recent[0])
+        self.assertLessEqual(len(recent[0]['summary']), SUMMARY_LENGTH)
+
+        rest = self.client.get(response.data['recent_complaints_next'])
+        self.assertEqual(len(rest.data['results']), 2)
+        self.assertIsNone(rest.data['next'])
+        seen = {c['id'] for c in recent} | {c['id'] for c in rest.data['results']}
+        self.assertEqual(len(seen), DashboardRecentPagination.page_size + 2)
+
+    def test_priority_buckets_come_from_sql(self, populate):
+        high, = self.create(1, priority="5.00")
+        medium, = self.create(1, priority="2.00")
+        low, = self.create(1, priority="0.50")
+        url = f"/api/municipalities/{self.municipality.id}/dashboard/recent/"
+
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        buckets = {c['id']: c['priority'] for c in response.data['results']}
+        self.assertEqual(buckets, {high.id: 'High', medium.id: 'Medium', low.id: 'Low'})
+
+    def test_recent_page_queries_do_not_grow_with_history(self, populate):
+        self.create(3)
+        url = f"/api/municipalities/{self.municipality.id}/dashboard/recent/"
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        self.create(30)
+        with CaptureQueriesContext(connection) as many:
+            self.client.get(url)
+        self.assertEqual(len(few), len(many))
+
+
+class KeysetPaginationTests(TestCase):
+    """
+    Cursor pages visit every complaint exactly once in both directions, even
+    when the leading ordering column ties, and reject malformed cursors.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(username="citizen")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.complaints = [
+            Complaint.objects.create(
+                user=self.user, department="Water", topic=f"Leak {i}", description="Pipe leaking",
+                location="Main Road", latitude=20.29, longitude=85.82,
+            )
+            for i in range(8)
+        ]
+        # Three runs of equal created_at and rank_score values
+        now = timezone.now()
+        for i, complaint in enumerate(self.complaints):
+            Complaint.objects.filter(pk=complaint.pk).update(
+                created_at=now - timedelta(hours=i // 3), rank_score=float(i % 3),
+            )
+
+    def traverse(self, url):
+        """
+        Follows the ``next`` links from ``url`` to the last page, then the
+        ``previous`` links back; returns the ids seen each way.
+        """
+        forward, pages = [], []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            pages.append([c['id'] for c in response.data['results']])
+            forward += pages[-1]
+            previous, url = response.data['previous'], response.data['next']
+
+        backward = pages[-1]
+        while previous:
+            response = self.client.get(previous)
+            backward = [c['id'] for c in response.data['results']] + backward
+            previous = response.data['previous']
+        return forward, backward
+
+    def test_chronological_pages_have_no_gaps_or_duplicates(self):
+        expected = list(Complaint.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        forward, backward = self.traverse("/api/complaints/?page_size=3")
+        self.assertEqual(forward, expected)
+        self.assertEqual(backward, expected)
+
+    def test_ranked_pages_have_no_gaps_or_duplicates(self):
+        expected = list(Complaint.objects.order_by('-rank_score', '-id').values_list('id', flat=True))
+        forward, backward = self.traverse("/api/complaints/ranked/?page_size=3")
+        self.assertEqual(forward, expected)
+        self.assertEqual(backward, expected)
+
+    def test_malformed_cursors_are_rejected(self):
+        def token(payload):
+            return base64.urlsafe_b64encode(payload.encode()).decode()
+
+        cursors = [
+            "not-a-cursor",
+            token("not json"),
+            token('["2025-01-01T00:00:00+00:00", 1]'),
+            token('{"p": ["2025-01-01T00:00:00+00:00"]}'),
+            token('{"p": ["yesterday", 1]}'),
+            token('{"p": ["2025-01-01T00:00:00+00:00", {"id": 1}]}'),
+        ]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.client.get("/api/complaints/", {"cursor": cursor})
+                self.assertEqual(response.status_code, 400)
+
+    def test_tampered_cursor_positions_still_seek(self):
+        # A well-formed cursor pointing at a row that never existed
+        cursor = base64.urlsafe_b64encode(json.dumps(
+            {'p': [(timezone.now() - timedelta(minutes=90)).isoformat(), 10 ** 25], 'r': 0}
+        ).encode()).decode()
+        response = self.client.get("/api/complaints/", {"cursor": cursor})
+        self.assertEqual(response.status_code, 200)
+        expected = Complaint.objects.filter(created_at__lt=timezone.now() - timedelta(minutes=90))
+        self.assertEqual({c['id'] for c in response.data['results']}, set(expected.values_list('id', flat=True)))
+
+    def test_page_size_is_capped(self):
+        with mock.patch.object(ChronologicalPagination, 'max_page_size', 5):
+            response = self.client.get("/api/complaints/", {"page_size": 1000})
+        self.assertEqual(len(response.data['results']), 5)
+        self.assertEqual(len(self.client.get("/api/complaints/", {"page_size": 0}).data['results']), 1)
+        self.assertEqual(len(self.client.get("/api/complaints/ranked/", {"page_size": "all"}).data['results']),
+                         RankedPagination.page_size)
+
+
+class ComplaintScoreTests(TestCase):
+    """
+    The SQL score used for ranking and the dashboard buckets must agree with ``Complaint.score``.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(username="citizen")
+
+    def test_sql_score_matches_python_score(self):
+        now = timezone.now()
+        cases = [
+            (Decimal("0.00"), 0, timedelta()),
+            (Decimal("0.50"), 3, timedelta(hours=5)),
+            (Decimal("0.95"), 0, timedelta(days=1, hours=12, minutes=30)),
+            (Decimal("0.20"), 40, timedelta(days=30)),
+            (Decimal("1.00"), 7, timedelta(days=365, seconds=17)),
+            (Decimal("0.35"), 1000, timedelta(days=1500)),
+        ]
+        for i, (priority, upvotes, age) in enumerate(cases):
+            complaint = Complaint.objects.create(
+                user=self.user, department="Water", topic=f"Leak {i}", description="Pipe leaking",
+                location="Main Road", latitude=20.29, longitude=85.82, priority=priority,
+            )
+            Complaint.objects.filter(pk=complaint.pk).update(upvote_count=upvotes, created_at=now - age)
+
+        computed = dict(Complaint.objects.with_score(now).values_list('id', 'computed_score'))
+        self.assertEqual(len(computed), len(cases))
+        for complaint in Complaint.objects.all():
+            with self.subTest(topic=complaint.topic):
+                self.assertAlmostEqual(computed[complaint.id], complaint.score, places=4)
+
+    def test_ranking_follows_the_displayed_score_as_complaints_age(self):
+        def create(topic, priority):
+            return Complaint.objects.create(
+                user=self.user, department="Water", topic=topic, description="Pipe leaking",
+                location="Main Road", latitude=20.29, longitude=85.82, priority=Decimal(priority),
+            )
+
+        now = timezone.now()
+        old = create("Old leak", "0.90")
+        with mock.patch("django.utils.timezone.now", return_value=now + timedelta(days=30)):
+            fresh = create("New leak", "0.50")
+        old.apply_upvote_delta(1)
+
+        # No refresh in between: the stored keys still order by the score shown
+        for later in (timedelta(days=30), timedelta(days=31), timedelta(days=400)):
+            with self.subTest(later=later):
+                with mock.patch("django.utils.timezone.now", return_value=now + later):
+                    ranked = list(Complaint.objects.ranked())
+                self.assertEqual([c.topic for c in ranked], [fresh.topic, old.topic])
+                scores = [c.computed_score for c in ranked]
+                self.assertEqual(scores, sorted(scores, reverse=True))
+
+
+class NearbyComplaintTests(TestCase):
+    """
+    ``nearby()`` returns exactly the complaints within the radius, nearest
+    first, with the same distances as ``calculate_distance``.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(username="citizen")
+
+    def test_nearby_matches_scalar_distances(self):
+        lat, lon = 20.4625, 85.8830
+        rng = random.Random(7)
+        for i in range(40):
+            Complaint.objects.create(
+                user=self.user, department="Water", topic=f"Leak {i}", description="Pipe leaking",
+                location="Main Road", latitude=round(lat + rng.uniform(-0.03, 0.03), 6),
+                longitude=round(lon + rng.uniform(-0.03, 0.03), 6),
+            )
+
+        nearby = Complaint.objects.nearby(lat, lon, 2.0)
+        expected = {
+            c.id: calculate_distance(lat, lon, float(c.latitude), float(c.longitude))
+            for c in Complaint.objects.all()
+        }
+        expected = {pk: distance for pk, distance in expected.items() if distance <= 2.0}
+
+        self.assertTrue(0 < len(expected) < 40)
+        self.assertEqual({c.id for c in nearby}, set(expected))
+        for complaint in nearby:
+            self.assertAlmostEqual(complaint.distance_km, expected[complaint.id], places=6)
+        distances = [c.distance_km for c in nearby]
+        self.assertEqual(distances, sorted(distances))
+
+
+class UpvoteToggleTests(TestCase):
+    """
+    Upvotes toggle with an indexed check and keep the counter in step with the votes.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(username="citizen")
+        self.complaint = Complaint.objects.create(
+            user=self.user, department="Water", topic="Leak", description="Pipe leaking",
+            location="Main Road", latitude=20.29, longitude=85.82,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_toggle_returns_count_without_recounting(self):
+        others = [User.objects.create(username=f"voter{i}") for i in range(20)]
+        for other in others:
+            self.complaint.toggle_upvote(other.id)
+
+        url = f"/api/complaints/{self.complaint.id}/upvote/"
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url)
+        self.assertEqual(response.data, {'message': "Upvoted", 'total_upvotes': 21})
+        self.assertFalse([q for q in queries if 'COUNT(' in q['sql'].upper()])
+        self.assertFalse([q for q in queries if 'upvotes' in q['sql'] and 'user_id" = ' not in q['sql']
+                          and 'INSERT' not in q['sql'] and 'DELETE' not in q['sql']])
+
+        response = self.client.post(url)
+        self.assertEqual(response.data, {'message': "Upvote removed", 'total_upvotes': 20})
+        self.complaint.refresh_from_db()
+        self.assertEqual(self.complaint.upvote_count, self.complaint.upvotes.count())
+
+    def test_counter_rebuild_dry_run_writes_nothing(self):
+        Complaint.objects.filter(pk=self.complaint.pk).update(rank_score=-1.0)
+        out = StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command("rebuild_complaint_counters", "--dry-run", stdout=out)
+        self.assertIn("No drift found", out.getvalue())
+        self.assertFalse([q for q in queries if q['sql'].startswith('UPDATE')])
+        self.complaint.refresh_from_db()
+        self.assertEqual(self.complaint.rank_score, -1.0)
+
+
+class BulkImportTests(TestCase):
+    """
+    Streaming imports keep timestamps and update every derived table in bulk.
+    """
+
+    CSV = (
+        "username,department,topic,description,location,latitude,longitude,status,priority,"
+        "created_at,updated_at,review_rating,review_feedback\n"
+        "asha,Water,Leak,Pipe burst near the market,Market Road,20.4625,85.8830,Resolved,0.8,"
+        "2025-01-10T09:00:00+05:30,2025-01-12T09:00:00+05:30,4,Fixed quickly\n"
+        "ravi,Roads,Pothole,Deep pothole on the ring road,Ring Road,20.4700,85.8900,Pending,,"
+        "2025-02-01T10:00:00+05:30,,,\n"
+        "ravi,Nowhere,Bad row,Unknown department,Somewhere,20.47,85.89,Pending,,2025-02-01T10:00:00+05:30,,,\n"
+    )
+
+    def setUp(self):
+        self.embeddings_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.embeddings_dir.cleanup)
+        settings_override = override_settings(COMPLAINT_EMBEDDINGS_DIR=self.embeddings_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.municipality = Municipality.objects.create(name="Cuttack", district="Cuttack", state="Odisha")
+
+    def write(self, name, content, encoding='utf-8'):
+        path = Path(self.embeddings_dir.name) / name
+        path.write_text(content, encoding=encoding)
+        return str(path)
+
+    def test_command_imports_csv_with_original_timestamps(self):
+        path = self.write("complaints.csv", self.CSV)
+        out, err = StringIO(), StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("import_complaints", path, "--municipality", self.municipality.id,
+                         "--chunk-size", "2", stdout=out, stderr=err)
+
+        self.assertIn("Imported 2 complaints, 1 activities and 1 reviews", out.getvalue())
+        self.assertIn("Row 3", err.getvalue())
+
+        leak = Complaint.objects.get(topic="Leak")
+        self.assertEqual(leak.created_at.isoformat(), "2025-01-10T03:30:00+00:00")
+        self.assertEqual(leak.updated_at.isoformat(), "2025-01-12T03:30:00+00:00")
+        self.assertEqual((leak.scoring_status, leak.review.rating), ("Scored", 4))
+        self.assertEqual(leak.review.created_at, leak.updated_at)
+        self.assertEqual(leak.activities.get().new_status, "Resolved")
+        self.assertTrue(leak.geohash and leak.minhash and leak.lsh_buckets.exists())
+        self.assertIn(leak.id, EmbeddingStore(self.municipality.id).load()[0].tolist())
+
+        pothole = Complaint.objects.get(topic="Pothole")
+        self.assertEqual(pothole.scoring_status, Complaint.SCORING_PENDING)
+        self.assertEqual(pothole.updated_at, pothole.created_at)
+        self.assertTrue(User.objects.get(username="ravi").profile)
+
+        incremental = sorted(ComplaintDailyStat.objects.filter(complaint_count__gt=0).values_list(
+            'date', 'department', 'status', 'complaint_count', 'review_count', 'rating_sum'))
+        rollups.rebuild()
+        self.assertEqual(incremental, sorted(ComplaintDailyStat.objects.filter(complaint_count__gt=0).values_list(
+            'date', 'department', 'status', 'complaint_count', 'review_count', 'rating_sum')))
+
+    def test_csv_exported_with_a_byte_order_mark(self):
+        # Excel's "CSV UTF-8" prefixes a BOM, which would otherwise stick to the username header
+        path = self.write("complaints.csv", self.CSV, encoding='utf-8-sig')
+        call_command("import_complaints", path, "--municipality", self.municipality.id,
+                     stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(sorted(Complaint.objects.values_list('user__username', flat=True)), ["asha", "ravi"])
+
+    def test_backends_without_returned_pks_are_refused(self):
+        path = self.write("complaints.csv", self.CSV)
+        with mock.patch.object(type(connection.features), 'can_return_rows_from_bulk_insert', False):
+            with self.assertRaises(NotSupportedError):
+                call_command("import_complaints", path, "--municipality", self.municipality.id,
+                             stdout=StringIO(), stderr=StringIO())
+        self.assertFalse(Complaint.objects.exists())
+
+    def test_imported_complaints_rank_by_age(self):
+        old = {"username": "asha", "department": "Water", "topic": "Old leak", "description": "Pipe burst near the market",
+               "location": "Market Road", "latitude": 20.46, "longitude": 85.88, "priority": 0.8,
+               "created_at": (timezone.now() - timedelta(days=200)).isoformat()}
+        import_complaints(StringIO(json.dumps(old)), "ndjson", self.municipality)
+        fresh = Complaint.objects.create(
+            user=User.objects.get(username="asha"), municipality=self.municipality, department="Water",
+            topic="New leak", description="Pipe burst near the temple", location="Temple Road",
+            latitude=20.46, longitude=85.88, priority=Decimal("0.8"),
+        )
+
+        ranked = list(Complaint.objects.ranked(municipality_id=self.municipality.id))
+        self.assertEqual([c.topic for c in ranked], [fresh.topic, "Old leak"])
+        self.assertAlmostEqual(ranked[0].rank_score - ranked[0].computed_score,
+                               ranked[1].rank_score - ranked[1].computed_score, places=4)
+
+    def test_staff_endpoint_streams_ndjson_and_defers_scoring(self):
+        records = [
+            {"username": f"citizen{i}", "department": "Sanitation", "topic": f"Garbage {i}",
+             "description": f"Garbage pile number {i} not cleared", "location": "Ward 4",
+             "latitude": 20.46, "longitude": 85.88, "status": "In Progress",
+             "created_at": "2025-03-01T08:00:00Z", "updated_at": "2025-03-02T08:00:00Z",
+             "activities": [{"previous_status": "Pending", "new_status": "In Progress",
+                             "remarks": "Assigned", "updated_at": "2025-03-02T08:00:00Z"}]}
+            for i in range(5)
+        ]
+        upload = StringIO("\n".join(json.dumps(r) for r in records) + "\nnot json\n")
+        upload.name = "complaints.ndjson"
+        staff = User.objects.create(username="commissioner", is_staff=True)
+        client = APIClient()
+        client.force_authenticate(staff)
+        version = Municipality.objects.get(pk=self.municipality.pk).stats_version
+
+        with mock.patch("complaints.views.priority_scoring.submit") as submit, \
+                self.captureOnCommitCallbacks(execute=True):
+            response = client.post("/api/complaints/import/", {
+                "file": SimpleUploadedFile("complaints.ndjson", upload.getvalue().encode()),
+                "municipality_id": self.municipality.id,
+            }, format="multipart")
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual((response.data['imported'], response.data['skipped']), (5, 1))
+        self.assertEqual(response.data['errors'][0]['row'], 6)
+        self.assertEqual(submit.call_count, 5)
+        self.assertEqual(ComplaintActivity.objects.filter(remarks="Assigned").count(), 5)
+        self.assertGreater(Municipality.objects.get(pk=self.municipality.pk).stats_version, version)
+
+        citizen = User.objects.create(username="citizen")
+        client.force_authenticate(citizen)
+        self.assertEqual(client.post("/api/complaints/import/", {}).status_code, 403)
+
+
+class BulkStatusUpdateTests(TestCase):
+    """
+    Officials change many statuses per request, with per-item results and bulk writes.
+    """
+
+    url = "/api/complaints/bulk-status/"
+
+    def setUp(self):
+        self.municipality = Municipality.objects.create(name="Cuttack", district="Cuttack", state="Odisha")
+        self.other = Municipality.objects.create(name="Puri", district="Puri", state="Odisha")
+        self.citizen = User.objects.create(username="citizen")
+        officer = User.objects.create(username="officer")
+        self.official = MunicipalityOfficial.objects.create(user=officer, municipality=self.municipality, phone="9000000001")
+        self.complaints = [self.create(self.municipality) for _ in range(4)]
+        self.client = APIClient()
+        self.client.force_authenticate(officer)
+
+    def create(self, municipality, status="Pending"):
+        return Complaint.objects.create(
+            user=self.citizen, municipality=municipality, department="Water", topic="Leak",
+            description="Pipe leaking", location="Main Road", latitude=20.46, longitude=85.88, status=status,
+        )
+
+    def rollup_rows(self):
+        return sorted(
+            ComplaintDailyStat.objects.filter(complaint_count__gt=0)
+            .values_list('municipality_id', 'date', 'department', 'status', 'complaint_count', 'resolution_seconds')
+        )
+
+    def test_batch_reports_each_item_and_writes_in_bulk(self):
+        first, second, third, fourth = self.complaints
+        outsider = self.create(self.other)
+        version = Municipality.objects.get(pk=self.municipality.pk).stats_version
+        updates = [
+            {'complaint_id': first.id, 'status': 'Resolved', 'remarks': 'Pipe replaced'},
+            {'complaint_id': second.id, 'status': 'In Progress'},
+            {'complaint_id': third.id, 'status': 'Pending'},
+            {'complaint_id': outsider.id, 'status': 'Resolved'},
+            {'complaint_id': fourth.id, 'status': 'Closed'},
+            {'complaint_id': first.id, 'status': 'Rejected'},
+            {'complaint_id': fourth.id, 'status': 'Resolved'},
+        ]
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {'updates': updates}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['updated'], 3)
+        results = response.data['results']
+        self.assertEqual([r['success'] for r in results], [True, True, False, False, False, False, True])
+        self.assertEqual(results[0]['previous_status'], 'Pending')
+        self.assertEqual(results[2]['error'], 'Status is already set to this value.')
+        self.assertEqual(results[3]['error'], 'Complaint not found in your municipality.')
+        self.assertIn('status', results[4]['error'])
+
+        inserts = [q for q in queries if q['sql'].startswith('INSERT') and 'complaintactivity' in q['sql']]
+        self.assertEqual(len(inserts), 1)
+        activity = ComplaintActivity.objects.get(complaint=first)
+        self.assertEqual((activity.updated_by, activity.previous_status, activity.new_status, activity.remarks),
+                         (self.official, 'Pending', 'Resolved', 'Pipe replaced'))
+        self.assertEqual(ComplaintActivity.objects.count(), 3)
+        outsider.refresh_from_db()
+        self.assertEqual(outsider.status, 'Pending')
+
+        self.assertGreater(Municipality.objects.get(pk=self.municipality.pk).stats_version, version)
+        incremental = self.rollup_rows()
+        rollups.rebuild()
+        self.assertEqual(incremental, self.rollup_rows())
+
+    def test_concurrent_change_is_reported_as_conflict(self):
+        first, second = self.complaints[:2]
+        capture = rollups.capture
+
+        def resolve_first_meanwhile(ids):
+            Complaint.objects.filter(pk=first.pk).update(status='Rejected')
+            return capture(ids)
+
+        with mock.patch.object(rollups, 'capture', side_effect=resolve_first_meanwhile):
+            response = self.client.post(self.url, {'updates': [
+                {'complaint_id': first.id, 'status': 'Resolved'},
+                {'complaint_id': second.id, 'status': 'Resolved'},
+            ]}, format='json')
+
+        results = response.data['results']
+        self.assertFalse(results[0]['success'])
+        self.assertIn('changed by someone else', results[0]['error'])
+        self.assertTrue(results[1]['success'])
+        first.refresh_from_db()
+        self.assertEqual(first.status, 'Rejected')
+        self.assertFalse(ComplaintActivity.objects.filter(complaint=first).exists())
+
+    def test_malformed_bodies_are_rejected(self):
+        item = {'complaint_id': self.complaints[0].id, 'status': 'Resolved'}
+        for body in ([item], {'updates': []}, {'updates': item}):
+            response = self.client.post(self.url, body, format='json')
+            self.assertEqual(response.status_code, 400, body)
+            self.assertIn('error', response.data)
+
+    def test_requires_an_official(self):
+        self.client.force_authenticate(self.citizen)
+        response = self.client.post(self.url, {'updates': [{'complaint_id': 1, 'status': 'Resolved'}]}, format='json')
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(UPVOTE_WRITE_BEHIND=True)
+class WriteBehindUpvoteTests(TestCase):
+    """
+    Logged upvote toggles show up on reads at once and are coalesced when flushed.
+    """
+
+    def setUp(self):
+        self.user = User.objects.create(username="citizen")
+        self.complaint = Complaint.objects.create(
+            user=self.user, department="Water", topic="Leak", description="Pipe leaking",
+            location="Main Road", latitude=20.29, longitude=85.82,
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        patcher = mock.patch.object(upvote_log.upvote_flusher, "submit")
+        self.submit = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_pending_vote_is_visible_before_flush(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f"/api/complaints/{self.complaint.id}/upvote/")
+        self.assertEqual(response.data, {'message': "Upvoted", 'total_upvotes': 1})
+        self.submit.assert_called_once_with(self.complaint.id)
+
+        self.complaint.refresh_from_db()
+        self.assertEqual(self.complaint.upvote_count, 0)
+        self.assertFalse(self.complaint.upvotes.exists())
+
+        detail = self.client.get(f"/api/complaints/{self.complaint.id}/")
+        self.assertEqual((detail.data['total_upvotes'], detail.data['is_upvoted']), (1, True))
+        listing = self.client.get("/api/complaints/", {"fields": "id,total_upvotes,is_upvoted"})
+        self.assertEqual(listing.data['results'][0], {'id': self.complaint.id, 'total_upvotes': 1, 'is_upvoted': True})
+        ranked = self.client.get("/api/complaints/ranked/", {"fields": "id,total_upvotes"})
+        self.assertEqual(ranked.data['results'][0], {'id': self.complaint.id, 'total_upvotes': 1})
+
+    def test_flush_coalesces_toggles(self):
+        voters = [User.objects.create(username=f"voter{i}") for i in range(3)]
+        self.complaint.toggle_upvote(voters[2].id)  # already voted before the burst
+        for voter, toggles in zip(voters, (3, 2, 1)):
+            for _ in range(toggles):
+                upvote_log.record_toggle(self.complaint, voter.id)
+
+        with self.assertNumQueries(11):
+            self.assertEqual(upvote_log.flush([self.complaint.id]), 6)
+
+        self.complaint.refresh_from_db()
+        self.assertEqual(set(self.complaint.upvotes.values_list('id', flat=True)), {voters[0].id})
+        self.assertEqual(self.complaint.upvote_count, 1)
+        self.assertFalse(UpvoteLogEntry.objects.filter(flushed=False).exists())
+        self.assertEqual(upvote_log.flush(), 0)
+
+    def test_flush_counts_only_votes_it_inserted(self):
+        upvote_log.record_toggle(self.complaint, self.user.id)
+        # The vote lands between reading the pending changes and inserting them
+        read_changes = upvote_log.pending_changes
+
+        def racing_changes(*args, **kwargs):
+            changes = read_changes(*args, **kwargs)
+            self.complaint.toggle_upvote(self.user.id)
+            return changes
+
+        with mock.patch.object(upvote_log, "pending_changes", side_effect=racing_changes):
+            upvote_log.flush([self.complaint.id])
+
+        self.complaint.refresh_from_db()
+        self.assertEqual(self.complaint.upvote_count, 1)
+        self.assertEqual(self.complaint.upvotes.count(), 1)
+
+    def test_replay_flushes_entries_left_by_a_crash(self):
+        upvote_log.record_toggle(self.complaint, self.user.id)
+        call_command("replay_upvote_log", "--prune-days", "0", stdout=StringIO())
+
+        self.complaint.refresh_from_db()
+        self.assertEqual(self.complaint.upvote_count, 1)
+        self.assertTrue(self.complaint.upvotes.filter(id=self.user.id).exists())
+
+
+class ConcurrentWriteTests(TransactionTestCase):
+    """
+    Parallel writes to one complaint neither lose nor double-count votes or
+    rollup rows. Needs a test database that accepts concurrent connections:
+    on SQLite, run with ``--settings=backend.concurrency_settings``.
+    """
+
+    def setUp(self):
+        # SQLite never reports test_db_allows_multiple_connections, even file-backed
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest("The test database is in-memory SQLite; use --settings=backend.concurrency_settings")
+        embeddings_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(embeddings_dir.cleanup)
+        settings_override = override_settings(COMPLAINT_EMBEDDINGS_DIR=embeddings_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_parallel_toggles_keep_counter_exact(self):
+        author = User.objects.create(username="author")
+        complaint = Complaint.objects.create(
+            user=author, department="Roads", topic="Pothole", description="Deep pothole",
+            location="NH16", latitude=20.29, longitude=85.82,
+        )
+        voters = [User.objects.create(username=f"voter{i}") for i in range(40)]
+        # Every voter toggles 5 times, racing with their own toggles
+        jobs = [voter.id for voter in voters for _ in range(5)]
+        random.Random(7).shuffle(jobs)
+        results = []
+
+        def toggle(user_id):
+            try:
+                results.append((user_id, Complaint.objects.get(pk=complaint.pk).toggle_upvote(user_id)[0]))
+            finally:
+                close_old_connections()
+
+        with ThreadPoolExecutor(max_workers=32) as pool:
+            list(pool.map(toggle, jobs))
+
+        self.assertEqual(len(results), len(jobs))
+        complaint.refresh_from_db()
+        self.assertEqual(complaint.upvote_count, complaint.upvotes.count())
+
+    def test_parallel_saves_keep_rollups_exact(self):
+        author = User.objects.create(username="author")
+        municipality = Municipality.objects.create(name="Cuttack", district="Cuttack", state="Odisha")
+        complaint = Complaint.objects.create(
+            user=author, municipality=municipality, department="Roads", topic="Pothole",
+            description="Deep pothole", location="NH16", latitude=20.29, longitude=85.82,
+        )
+        statuses = ["In Progress", "Resolved", "Rejected", "Pending"] * 10
+
+        def save(status):
+            try:
+                copy = Complaint.objects.get(pk=complaint.pk)
+                copy.status = status
+                copy.save()
+            finally:
+                close_old_connections()
+
+        with ThreadPoolExecutor(max_workers=16) as pool:
+            list(pool.map(save, statuses))
+
+        def rollup_rows():
+            return sorted(ComplaintDailyStat.objects.exclude(complaint_count=0).values_list(
+                'department', 'status', 'complaint_count'))
+
+        incremental = rollup_rows()
+        rollups.rebuild()
+        self.assertEqual(incremental, rollup_rows())
@@ -0,0 +1,138 @@
+"""
+Write-behind buffering for upvotes.
+
+With UPVOTE_WRITE_BEHIND enabled, the upvote endpoint only appends an
+``UpvoteLogEntry`` per toggle instead of changing the upvote table and
+the complaint row, so bursts on a popular complaint do not queue up on
+that row's lock. ``upvote_flusher`` collects the complaints with new
+entries and flushes them every UPVOTE_FLUSH_INTERVAL_MS: the toggles of
+each (complaint, user) pair are coalesced (an even number cancels out),
+the net votes are inserted or deleted in bulk and every counter moves
+once by its net delta.
+
+Until then, reads add the pending changes (``annotate_pending``), so users
+see their own vote at once. Entries stay in the log marked ``flushed``;
+``manage.py replay_upvote_log`` flushes whatever a crashed process left
+behind and prunes old flushed entries.
+"""
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+
+from account.models import bump_stats_version
+from api.background import BatchingWorker
+from .models import Complaint, UpvoteLogEntry
+
+
+def enabled():
+    return getattr(settings, 'UPVOTE_WRITE_BEHIND', False)
+
+
+def _votes():
+    return Complaint.upvotes.through.objects
+
+
+def pending_changes(complaint_ids, queryset=None):
+    """
+    Net effect of the unflushed toggles, as ``{complaint_id: {user_id: +1 or -1}}``:
+    +1 adds a vote the user does not have yet, -1 removes an existing one.
+    """
+    queryset = queryset if queryset is not None else UpvoteLogEntry.objects.filter(flushed=False)
+    toggles = Counter(queryset.filter(complaint_id__in=complaint_ids).values_list('complaint_id', 'user_id'))
+    flips = [pair for pair, count in toggles.items() if count % 2]
+    if not flips:
+        return {}
+
+    existing = set(
+        _votes().filter(complaint_id__in={c for c, _ in flips}, user_id__in={u for _, u in flips})
+        .values_list('complaint_id', 'user_id')
+    )
+    changes = defaultdict(dict)
+    for complaint_id, user_id in flips:
+        changes[complaint_id][user_id] = -1 if (complaint_id, user_id) in existing else 1
+    return changes
+
+
+def annotate_pending(complaints, user_id=None):
+    """
+    Sets ``_pending_upvote_delta`` (read by ``Complaint.total_upvotes``) and
+    ``_pending_own_vote`` (+1/-1/None for ``user_id``) on each complaint.
+    """
+    changes = pending_changes([c.pk for c in complaints])
+    for complaint in complaints:
+        pending = changes.get(complaint.pk, {})
+        complaint._pending_upvote_delta = sum(pending.values())
+        complaint._pending_own_vote = pending.get(user_id)
+
+
+def record_toggle(complaint, user_id):
+    """
+    Logs an upvote toggle and queues its flush. Returns ``(upvoted, total)``
+    as they will be once flushed.
+    """
+    UpvoteLogEntry.objects.create(complaint_id=complaint.pk, user_id=user_id)
+    upvote_flusher.submit_on_commit(complaint.pk)
+
+    complaint.refresh_from_db(fields=list(Complaint.COUNTER_FIELDS))
+    annotate_pending([complaint], user_id)
+    own = complaint._pending_own_vote
+    if own is None:
+        upvoted = _votes().filter(complaint_id=complaint.pk, user_id=user_id).exists()
+    else:
+        upvoted = own > 0
+    return upvoted, complaint.total_upvotes()
+
+
+def flush(complaint_ids=None):
+    """
+    Applies the unflushed toggles of ``complaint_ids`` (all complaints when
+    ``None``) and returns how many log entries were flushed.
+    """
+    with transaction.atomic():
+        entries = UpvoteLogEntry.objects.select_for_update().filter(flushed=False)
+        if complaint_ids is not None:
+            entries = entries.filter(complaint_id__in=complaint_ids)
+        rows = list(entries.order_by('id').values_list('id', 'complaint_id'))
+        if not rows:
+            return 0
+        entry_ids = [entry_id for entry_id, _ in rows]
+        flushed = UpvoteLogEntry.objects.filter(id__in=entry_ids)
+        changes = pending_changes({complaint_id for _, complaint_id in rows}, queryset=flushed)
+
+        for complaint_id, users in changes.items():
+            removed = [user_id for user_id, change in users.items() if change < 0]
+            added = [user_id for user_id, change in users.items() if change > 0]
+            delta = 0
+            if removed:
+                deleted, _ = _votes().filter(complaint_id=complaint_id, user_id__in=removed).delete()
+                delta -= deleted
+            if added:
+                # ignore_conflicts hides which rows already existed, so count them
+                new_votes = _votes().filter(complaint_id=complaint_id, user_id__in=added)
+                before = new_votes.count()
+                _votes().bulk_create(
+                    [Complaint.upvotes.through(complaint_id=complaint_id, user_id=user_id) for user_id in added],
+                    ignore_conflicts=True,
+                )
+                delta += new_votes.count() - before
+            if delta:
+                Complaint.objects.filter(pk=complaint_id).update(
+                    upvote_count=F('upvote_count') + delta,
+                    rank_score=F('rank_score') + delta * Complaint.UPVOTE_WEIGHT,
+                )
+
+        municipality_ids = list(Complaint.objects.filter(pk__in=changes).values_list('municipality_id', flat=True))
+        transaction.on_commit(lambda: bump_stats_version(*municipality_ids))
+        flushed.update(flushed=True)
+    return len(rows)
+
+
+upvote_flusher = BatchingWorker(
+    "upvote-flush",
+    flush,
+    batch_size=getattr(settings, 'UPVOTE_FLUSH_BATCH_SIZE', 50),
+    max_wait=getattr(settings, 'UPVOTE_FLUSH_INTERVAL_MS', 200) / 1000,
+    max_workers=1,
+)
@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ComplaintViewSet, MunicipalityComplaintsView,RankedComplaintListView,update_complaint_status
+from .views import ComplaintViewSet, ComplaintBulkStatusView, ComplaintImportView, MunicipalityComplaintsView,MunicipalityRecentComplaintsView,RankedComplaintListView,update_complaint_status
 
 router = DefaultRouter()
 router.register(r'complaints', ComplaintViewSet, basename='complaint')
@@ -12,6 +12,9 @@ urlpatterns = [
         name='update-complaint-status'
     ),
     path('municipalities/<int:pk>/complaints/', MunicipalityComplaintsView.as_view(), name='municipality-complaints'),
+    path('municipalities/<int:pk>/dashboard/recent/', MunicipalityRecentComplaintsView.as_view(), name='municipality-recent-complaints'),
+    path('complaints/bulk-status/', ComplaintBulkStatusView.as_view(), name='complaint-bulk-status'),
+    path('complaints/import/', ComplaintImportView.as_view(), name='complaint-import'),
     path('complaints/ranked/', RankedComplaintListView.as_view(), name='ranked-complaints'),
     path('', include(router.urls)),
 ]
@@ -1,22 +1,33 @@
-import os
+import io
 import json
+from django.conf import settings
 from django.http import JsonResponse
+from django.db import transaction
 from rest_framework.views import APIView
 from rest_framework import generics
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAdminUser, IsAuthenticated, IsAuthenticatedOrReadOnly
 from .models import Complaint, Comment,ComplaintActivity
 from account.models import Municipality
 from django.shortcuts import render,get_object_or_404
-from .serializers import ComplaintSerializer, CommentSerializer,RankedComplaintSerializer
-from openai import OpenAI
+from .serializers import (
+    ComplaintSerializer, ComplaintListItemSerializer, CommentSerializer, DashboardComplaintSerializer,
+    RankedComplaintSerializer,
+)
+from .pagination import ChronologicalPagination, DashboardRecentPagination, RankedPagination
+from . import upvote_log
+from .ai import find_similar_ids, priority_scoring
+from .bulk_import import FORMATS, detect_format, import_complaints
+from .embeddings import rank_by_similarity
+from .minhash import find_duplicates
+from .status_updates import apply_status_updates, max_items
 from django.views.decorators.http import require_POST
 from django.contrib.auth.decorators import login_required
 from api.models import MunicipalityOfficial
 import math
-import difflib
 
 # Helper function for Haversine distance
 def calculate_distance(lat1, lon1, lat2, lon2):
@@ -30,26 +41,46 @@ def calculate_distance(lat1, lon1, lat2, lon2):
     return R * c
 
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-
 
 class MunicipalityComplaintsView(generics.ListAPIView):
-    serializer_class = ComplaintSerializer
+    serializer_class = ComplaintListItemSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = ChronologicalPagination
 
     def get_queryset(self):
         municipality_id = self.kwargs['pk']
-        return Complaint.objects.filter(municipality_id=municipality_id).order_by('-created_at')
+        queryset = Complaint.objects.filter(municipality_id=municipality_id).order_by('-created_at')
+        return ComplaintListItemSerializer.optimize_queryset(queryset, self.request)
+
+
+class MunicipalityRecentComplaintsView(generics.ListAPIView):
+    """
+    The dashboard's recent complaints, newest first, one cursor page at a time.
+    """
+    serializer_class = DashboardComplaintSerializer
+    permission_classes = [IsAuthenticatedOrReadOnly]
+    pagination_class = DashboardRecentPagination
+
+    def get_queryset(self):
+        return DashboardComplaintSerializer.get_queryset(self.kwargs['pk'])
 class ComplaintViewSet(viewsets.ModelViewSet):
     serializer_class = ComplaintSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = ChronologicalPagination
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return ComplaintListItemSerializer
+        return ComplaintSerializer
 
     def get_queryset(self):
-        queryset = Complaint.objects.all().order_by('-created_at')
+        queryset = Complaint.objects.order_by('-created_at')
         municipality_id = self.request.query_params.get('municipality_id')
         if municipality_id:
             queryset = queryset.filter(municipality_id=municipality_id)
-        return queryset
+        if self.action == 'list':
+            return ComplaintListItemSerializer.optimize_queryset(queryset, self.request)
+        return queryset.for_feed()
 
     def perform_create(self, serializer):
         user_profile = self.request.user.profile
@@ -64,43 +95,15 @@ class ComplaintViewSet(viewsets.ModelViewSet):
         if municipality_id:
             municipality = get_object_or_404(Municipality, id=municipality_id)
 
-        description = self.request.data.get('description', '')
-
-        # 🔹 Call the AI to get priority
-        priority = 0.5  # default
-        if description:
-            try:
-                prompt = f"""
-                You are a municipal issue prioritization assistant.
-                Given this citizen complaint description, output ONLY a float between 0 and 1
-                representing the urgency or severity (0 = trivial/spam, 1 = extremely urgent).
-                
-                Complaint: "{description}"
-
-                Output only the number. No explanation.
-                """
-                response = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": "You output only a float between 0 and 1."},
-                        {"role": "user", "content": prompt},
-                    ],
-                    temperature=0.2,
-                )
-                text = response.choices[0].message.content.strip()
-                priority = float(text)
-                priority = max(0, min(priority, 1))
-            except Exception:
-                priority = 0.5
-
-        # 📉 Reject & Penalize if priority is too low (Spam/Trivial)
-        if priority < 0.2:
-            user_profile.honesty_score -= 10
-            user_profile.save()
-            from rest_framework.exceptions import ValidationError
-            raise ValidationError({"error": f"Complaint rejected due to low urgency score ({priority}). Your integrity score has been penalized."})
-
-        serializer.save(user=self.request.user, municipality=municipality, priority=priority)
+        # 🔹 Saved with a provisional priority; the AI score (and any spam
+        # rejection) is applied by the background scorer once committed
+        complaint = serializer.save(
+            user=self.request.user,
+            municipality=municipality,
+            priority=Complaint.PROVISIONAL_PRIORITY,
+            scoring_status=Complaint.SCORING_PENDING,
+        )
+        priority_scoring.submit_on_commit(complaint.pk)
 
     def partial_update(self, request, *args, **kwargs):
         """
@@ -151,18 +154,14 @@ class ComplaintViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'])
     def upvote(self, request, pk=None):
         complaint = self.get_object()
-        user = request.user
-
-        if user in complaint.upvotes.all():
-            complaint.upvotes.remove(user)
-            message = "Upvote removed"
+        if upvote_log.enabled():
+            upvoted, total = upvote_log.record_toggle(complaint, request.user.id)
         else:
-            complaint.upvotes.add(user)
-            message = "Upvoted"
+            upvoted, total = complaint.toggle_upvote(request.user.id)
 
         return Response({
-            'message': message,
-            'total_upvotes': complaint.total_upvotes()
+            'message': "Upvoted" if upvoted else "Upvote removed",
+            'total_upvotes': total
         })
 
     # 🔹 POST /api/complaints/<id>/comments/
@@ -201,88 +200,112 @@ class ComplaintViewSet(viewsets.ModelViewSet):
             municipality_id=municipality_id
         ).exclude(status__in=['Resolved', 'Rejected']) # Only active complaints
 
-        nearby_complaints = []
-        for c in recent_complaints:
-            dist = calculate_distance(lat, lon, float(c.latitude), float(c.longitude))
-            if dist <= 1.0: # 1km radius
-                nearby_complaints.append(c)
+        nearby_complaints = recent_complaints.nearby(lat, lon, radius_km=1.0)
 
         if not nearby_complaints:
             return Response({'similar_complaints': []})
 
         # 2. Check Text Similarity
         similar_complaints = []
-        
-        # Method A: Gen AI Check (if key exists)
-        if client.api_key and len(nearby_complaints) > 0 and description:
+
+        # Most relevant nearby complaints by local embedding similarity
+        candidates = rank_by_similarity(
+            description, nearby_complaints, k=settings.COMPLAINT_SIMILARITY_CANDIDATES
+        ) if description else []
+
+        # Method A: Gen AI Check (if key exists) on the best candidates
+        if candidates:
             try:
-                # Prepare context for AI
-                candidates = "\n".join([f"ID {c.id}: {c.topic}: {c.description}" for c in nearby_complaints[:5]])
-                prompt = f"""
-                I have a new complaint: "{description}"
-                
-                Here are existing nearby complaints:
-                {candidates}
-                
-                Identify which of the existing complaints are semantically similar to the new one.
-                Return ONLY a JSON array of IDs of the similar complaints. If none, return [].
-                Example output: [12, 15] or []
-                """
-                
-                response = client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": "You are a duplicate detection system. Output only JSON."},
-                        {"role": "user", "content": prompt}
-                    ],
-                    temperature=0.0
-                )
-                
-                content = response.choices[0].message.content.strip()
-                # Clean up potential markdown formatting like ```json ... ```
-                if content.startswith("```"):
-                    content = content.replace("```json", "").replace("```", "")
-                
-                similar_ids = json.loads(content)
-                similar_complaints = [c for c in nearby_complaints if c.id in similar_ids]
+                similar_ids = find_similar_ids(description, [c for c, _ in candidates])
+                similar_complaints = [c for c, _ in candidates if c.id in similar_ids]
                 
             except Exception as e:
                 print(f"AI Check failed: {e}")
                 # Fallback to manual check will happen if list is empty, or we can just pass
                 pass
 
-        # Method B: Fallback (SequenceMatcher) if AI failed or returned nothing (but let's merge results if needed, simple overwrite for now)
+        # Method B: Fallback (MinHash/LSH near-duplicates, then close embeddings) if AI failed or returned nothing
         if not similar_complaints and description:
-            for c in nearby_complaints:
-                seq = difflib.SequenceMatcher(None, description.lower(), c.description.lower())
-                if seq.ratio() > 0.4: # Low threshold for fuzzy match
-                    similar_complaints.append(c)
+            similar_complaints = find_duplicates(description, nearby_complaints)
+            seen = {c.id for c in similar_complaints}
+            similar_complaints += [
+                c for c, cosine in candidates
+                if cosine >= settings.COMPLAINT_EMBEDDING_MATCH_THRESHOLD and c.id not in seen
+            ]
 
         serializer = ComplaintSerializer(similar_complaints, many=True, context={'request': request})
         return Response({'similar_complaints': serializer.data})
 
-class RankedComplaintListView(APIView):
+class RankedComplaintListView(generics.ListAPIView):
+    serializer_class = RankedComplaintSerializer
+    pagination_class = RankedPagination
 
-    def get(self, request):
-        municipality_id = request.query_params.get('municipality_id')
-        all_complaints = Complaint.objects.ranked(municipality_id=municipality_id)
-        page = int(request.query_params.get('page', 1))
-        per_page = 8
-        start = (page - 1) * per_page
-        end = start + per_page
-        paginated = all_complaints[start:end]
+    def get_queryset(self):
+        municipality_id = self.request.query_params.get('municipality_id')
+        queryset = Complaint.objects.ranked(municipality_id=municipality_id)
+        return RankedComplaintSerializer.optimize_queryset(queryset, self.request)
 
-        serializer = RankedComplaintSerializer(paginated, many=True)
 
-        # 4️⃣ Return paginated response
-        return Response({
-            "page": page,
-            "total": len(all_complaints),
-            "count": len(paginated),
-            "results": serializer.data
-        }, status=status.HTTP_200_OK)
-    
+class ComplaintImportView(APIView):
+    """
+    Staff upload of historical complaints (CSV or NDJSON file), streamed
+    through complaints/bulk_import.py. Complaints without a priority are
+    queued for AI scoring once their chunk commits.
+    """
+    permission_classes = [IsAdminUser]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'A CSV or NDJSON file is required'}, status=status.HTTP_400_BAD_REQUEST)
+        municipality = get_object_or_404(Municipality, pk=request.data.get('municipality_id'))
+
+        official = MunicipalityOfficial.objects.filter(user=request.user).first()
+        if official and official.municipality_id != municipality.id:
+            return Response({'error': 'You can only import complaints into your own municipality'},
+                            status=status.HTTP_403_FORBIDDEN)
+
+        fmt = request.data.get('format') or detect_format(upload.name)
+        if fmt not in FORMATS:
+            return Response({'error': f"Unknown format {fmt!r}"}, status=status.HTTP_400_BAD_REQUEST)
+
+        def queue_scoring(complaints):
+            for complaint in complaints:
+                if complaint.scoring_status == Complaint.SCORING_PENDING:
+                    priority_scoring.submit_on_commit(complaint.pk)
+
+        stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')
+        stats = import_complaints(stream, fmt, municipality, on_chunk=queue_scoring)
+        print(f"📥 Imported {stats['imported']} complaints into {municipality.name} ({stats['rows_per_second']} rows/s)")
+        return Response(stats, status=status.HTTP_201_CREATED if stats['imported'] else status.HTTP_200_OK)
+
+
+class ComplaintBulkStatusView(APIView):
+    """
+    Status changes for many complaints of the official's municipality in
+    one request: ``{"updates": [{"complaint_id", "status", "remarks"}, ...]}``.
+    Each item succeeds or fails on its own (complaints/status_updates.py).
+    """
+    permission_classes = [IsAuthenticated]
 
+    def post(self, request):
+        official = MunicipalityOfficial.objects.filter(user=request.user).first()
+        if official is None:
+            return Response({'error': 'Access Denied: Not a Municipality Official'}, status=status.HTTP_403_FORBIDDEN)
+
+        if not isinstance(request.data, dict):
+            return Response({'error': 'Expected a JSON object with an updates list'}, status=status.HTTP_400_BAD_REQUEST)
+        updates = request.data.get('updates')
+        if not isinstance(updates, list) or not updates:
+            return Response({'error': 'updates must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(updates) > max_items():
+            return Response({'error': f'At most {max_items()} updates per request'}, status=status.HTTP_400_BAD_REQUEST)
+
+        results = apply_status_updates(official, updates)
+        updated = sum(result['success'] for result in results)
+        print(f"🗂️ {official.user.username} updated {updated}/{len(results)} complaint statuses")
+        return Response({'updated': updated, 'failed': len(results) - updated, 'results': results})
 
 
 # --- Custom Decorator ---
@@ -3,20 +3,18 @@ import complaintService from "../services/complaintService";
 
 const RankedComplaints = () => {
   const [complaints, setComplaints] = useState([]);
-  const [page, setPage] = useState(1);
+  const [nextUrl, setNextUrl] = useState(null);
   const [loading, setLoading] = useState(false);
   const [hasMore, setHasMore] = useState(true);
 
-  const fetchComplaints = async () => {
+  const fetchComplaints = async (cursorUrl = null) => {
     try {
       setLoading(true);
-      const data = await complaintService.getRankedComplaints(page);
+      const data = await complaintService.getRankedComplaints(cursorUrl);
 
-      if (data.results.length === 0) {
-        setHasMore(false);
-      } else {
-        setComplaints((prev) => [...prev, ...data.results]);
-      }
+      setComplaints((prev) => [...prev, ...data.results]);
+      setNextUrl(data.next);
+      setHasMore(Boolean(data.next));
     } catch (err) {
       console.error("Error fetching ranked complaints:", err);
     } finally {
@@ -26,7 +24,7 @@ const RankedComplaints = () => {
 
   useEffect(() => {
     fetchComplaints();
-  }, [page]);
+  }, []);
 
   return (
     <div className="p-4 max-w-3xl mx-auto">
@@ -41,7 +39,7 @@ const RankedComplaints = () => {
             <h3 className="font-semibold">{c.topic}</h3>
             <span className="text-sm text-gray-600">🔥 Score: {c.score}</span>
           </div>
-          <p className="text-gray-700 text-sm mt-1">{c.description}</p>
+          <p className="text-gray-700 text-sm mt-1">{c.summary}</p>
           <div className="flex justify-between text-sm text-gray-500 mt-2">
             <span>📍 {c.location}</span>
             <span>⬆️ {c.total_upvotes}</span>
@@ -54,7 +52,7 @@ const RankedComplaints = () => {
       {hasMore && !loading && (
         <div className="text-center mt-4">
           <button
-            onClick={() => setPage((p) => p + 1)}
+            onClick={() => fetchComplaints(nextUrl)}
             className="px-4 py-2 bg-blue-600 text-white rounded-md hover:bg-blue-700"
           >
             Load More
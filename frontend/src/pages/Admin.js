@@ -1,4 +1,4 @@
-import React, { useEffect, useState, useMemo } from 'react';
+import React, { useEffect, useState, useMemo, useRef } from 'react';
 import './Admin.css';
 import { useParams, useNavigate } from "react-router-dom";
 import { useUser } from "../context/UserContext";
@@ -50,8 +50,15 @@ const Admin = () => {
   const [searchTerm, setSearchTerm] = useState('');
   const [updatingStatus, setUpdatingStatus] = useState({});
   const [refreshKey, setRefreshKey] = useState(0);
+  // Bumped to refetch the stats only, keeping the complaint pages loaded so far
+  const [statsKey, setStatsKey] = useState(0);
+  const loadedListKey = useRef(null);
   const [showFilters, setShowFilters] = useState(false);
   const [notification, setNotification] = useState(null);
+  // The dashboard embeds the first page of recent complaints; older pages follow its cursor
+  const [recentComplaints, setRecentComplaints] = useState([]);
+  const [recentNext, setRecentNext] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   // Redirect non-staff users
   useEffect(() => {
@@ -70,6 +77,11 @@ const Admin = () => {
           `/municipalities/${id}/dashboard/`
         );
         setData(response.data);
+        if (loadedListKey.current !== `${id}:${refreshKey}`) {
+          loadedListKey.current = `${id}:${refreshKey}`;
+          setRecentComplaints(response.data.recent_complaints || []);
+          setRecentNext(response.data.recent_complaints_next || null);
+        }
       } catch (err) {
         console.error(err);
         setError("Failed to load dashboard data.");
@@ -79,7 +91,22 @@ const Admin = () => {
     };
 
     fetchData();
-  }, [id, refreshKey]);
+  }, [id, refreshKey, statsKey]);
+
+  const loadMoreComplaints = async () => {
+    if (!recentNext) return;
+    setLoadingMore(true);
+    try {
+      const response = await authService.apiClient.get(recentNext);
+      setRecentComplaints(prev => [...prev, ...response.data.results]);
+      setRecentNext(response.data.next);
+    } catch (err) {
+      console.error('Failed to load older complaints:', err);
+      showNotification('Failed to load older complaints', 'error');
+    } finally {
+      setLoadingMore(false);
+    }
+  };
 
   const handleStatusUpdate = async (complaintId, newStatus) => {
     try {
@@ -87,7 +114,8 @@ const Admin = () => {
 
       await complaintService.updateStatus(complaintId, newStatus);
 
-      setRefreshKey(prev => prev + 1);
+      setRecentComplaints(prev => prev.map(c => (c.id === complaintId ? { ...c, status: newStatus } : c)));
+      setStatsKey(prev => prev + 1);
 
       // Show success notification
       showNotification(`Status updated to ${newStatus}`, 'success');
@@ -150,7 +178,7 @@ const Admin = () => {
   };
 
   // Filter complaints
-  const filteredComplaints = (data?.recent_complaints || []).filter(complaint => {
+  const filteredComplaints = recentComplaints.filter(complaint => {
     const matchesStatus = statusFilter === 'All' || complaint.status === statusFilter;
     const matchesPriority = priorityFilter === 'All' || complaint.priority === priorityFilter;
     const matchesSearch = searchTerm === '' ||
@@ -188,13 +216,8 @@ const Admin = () => {
     // Satisfaction rate from backend
     const satisfactionRate = data.citizen_satisfaction || 0;
 
-    // Calculate today's complaints from recent_complaints
-    const today = new Date();
-    today.setHours(0, 0, 0, 0);
-    const todaysComplaints = (data.recent_complaints || []).filter(c => {
-      const created = new Date(c.created_at);
-      return created >= today;
-    }).length;
+    // Today's complaints come from the rollups, not the loaded page
+    const todaysComplaints = data.today_complaints || 0;
 
     // Resolution rate
     const resolutionRate = total > 0 ? Math.round((resolved / total) * 100) : 0;
@@ -620,7 +643,7 @@ const Admin = () => {
                   <div className="card-title">
                     <FileText size={20} />
                     <h3>Recent Complaints</h3>
-                    <span className="count-badge">{filteredComplaints.length}</span>
+                    <span className="count-badge">{filteredComplaints.length}{recentNext ? '+' : ''}</span>
                   </div>
                   <div className="card-actions">
                     <button className="glass-btn glass-btn-secondary">
@@ -651,8 +674,8 @@ const Admin = () => {
                           <td className="complaint-topic">
                             <div className="topic-content">
                               <span className="topic-text">{complaint.topic}</span>
-                              {complaint.description && (
-                                <span className="topic-desc">{complaint.description.substring(0, 30)}...</span>
+                              {complaint.summary && (
+                                <span className="topic-desc">{complaint.summary.substring(0, 30)}...</span>
                               )}
                             </div>
                           </td>
@@ -725,7 +748,12 @@ const Admin = () => {
 
                 <div className="table-footer">
                   <div className="footer-info">
-                    Showing {Math.min((currentPage - 1) * 8 + 1, filteredComplaints.length)} - {Math.min(currentPage * 8, filteredComplaints.length)} of {filteredComplaints.length} complaints
+                    Showing {Math.min((currentPage - 1) * 8 + 1, filteredComplaints.length)} - {Math.min(currentPage * 8, filteredComplaints.length)} of {filteredComplaints.length} {recentNext ? 'loaded ' : ''}complaints
+                    {recentNext && (
+                      <button className="glass-btn glass-btn-secondary load-more-btn" onClick={loadMoreComplaints} disabled={loadingMore}>
+                        {loadingMore ? 'Loading...' : 'Load older complaints'}
+                      </button>
+                    )}
                   </div>
                   <div className="footer-pagination">
                     <button
@@ -44,6 +44,9 @@ const MunicipalityComplaints = () => {
   const [complaints, setComplaints] = useState([]);
   const [filteredComplaints, setFilteredComplaints] = useState([]);
   const [loading, setLoading] = useState(true);
+  // Cursor for older complaints; search, filters and sorting apply to the pages loaded so far
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [showComplaintForm, setShowComplaintForm] = useState(false);
   const [selectedDepartment, setSelectedDepartment] = useState("All");
   const [searchTerm, setSearchTerm] = useState("");
@@ -102,9 +105,9 @@ const MunicipalityComplaints = () => {
         setMunicipality(muniRes.data);
 
         const compRes = await complaintService.getComplaints(id);
-        console.log(compRes);
-        setComplaints(compRes);
-        setFilteredComplaints(compRes);
+        setComplaints(compRes.results);
+        setFilteredComplaints(compRes.results);
+        setNextCursor(compRes.next);
       } catch (err) {
         console.error("Error loading municipality complaints:", err);
       } finally {
@@ -162,6 +165,35 @@ const MunicipalityComplaints = () => {
     setVisibleCount(20); // Reset pagination on filter change
   }, [complaints, selectedDepartment, searchTerm, sortBy]);
 
+  const reloadComplaints = async () => {
+    const page = await complaintService.getComplaints(id);
+    setComplaints(page.results);
+    setNextCursor(page.next);
+  };
+
+  const loadMoreComplaints = async () => {
+    if (visibleCount < filteredComplaints.length) {
+      setVisibleCount(prev => prev + 20);
+      return;
+    }
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await complaintService.getComplaints(id, 100, nextCursor);
+      setComplaints(prev => [...prev, ...page.results]);
+      setNextCursor(page.next);
+    } catch (err) {
+      console.error("Error loading more complaints:", err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // Keeps loaded pages when a single complaint changes
+  const updateComplaint = (complaintId, changes) => {
+    setComplaints(prev => prev.map(c => (c.id === complaintId ? { ...c, ...changes(c) } : c)));
+  };
+
   const calculateDistance = (lat1, lon1, lat2, lon2) => {
     const R = 6371; // km
     const dLat = (lat2 - lat1) * (Math.PI / 180);
@@ -253,8 +285,7 @@ const MunicipalityComplaints = () => {
 
     try {
       await complaintService.createComplaint(complaintData);
-      const updated = await complaintService.getComplaints(id);
-      setComplaints(updated);
+      await reloadComplaints();
       setNewComplaint({ department: "", topic: "", description: "", file: null });
       setShowComplaintForm(false);
       setShowSimilarModal(false);
@@ -307,9 +338,8 @@ const MunicipalityComplaints = () => {
 
   const handleUpvote = async (id) => {
     try {
-      await authService.apiClient.post(`/complaints/${id}/upvote/`);
-      const updated = await complaintService.getComplaints(municipality.id);
-      setComplaints(updated);
+      const res = await complaintService.toggleUpvote(id);
+      updateComplaint(id, (c) => ({ total_upvotes: res.total_upvotes, is_upvoted: res.message === "Upvoted" }));
     } catch (e) {
       console.error("Upvote failed", e);
     }
@@ -323,9 +353,8 @@ const MunicipalityComplaints = () => {
     const text = newComment[id];
     if (!text) return;
     try {
-      await authService.apiClient.post(`/complaints/${id}/add_comment/`, { content: text });
-      const updated = await complaintService.getComplaints(municipality.id);
-      setComplaints(updated);
+      const comment = await complaintService.addComment(id, text);
+      updateComplaint(id, (c) => ({ comments: [...(c.comments || []), comment] }));
       setNewComment((prev) => ({ ...prev, [id]: "" }));
     } catch (e) {
       console.error("Comment failed", e);
@@ -657,7 +686,7 @@ const MunicipalityComplaints = () => {
           {/* Stats Bar */}
           <div className="stats-bar">
             <div className="stat-item">
-              <span className="stat-number">{filteredComplaints.length}</span>
+              <span className="stat-number">{filteredComplaints.length}{nextCursor ? "+" : ""}</span>
               <span className="stat-label">
                 <FontAwesomeIcon icon={faClipboard} /> Total Issues
               </span>
@@ -680,6 +709,13 @@ const MunicipalityComplaints = () => {
             </div>
           </div>
 
+          {nextCursor && (
+            <p className="partial-results-note">
+              Search and sorting cover the {complaints.length} most recent complaints loaded so far.
+              Load more to include older ones.
+            </p>
+          )}
+
           {/* Complaints List */}
           <div className="complaint-list">
             {filteredComplaints.length === 0 ? (
@@ -810,12 +846,13 @@ const MunicipalityComplaints = () => {
                   </div>
                 ))}
 
-                {visibleCount < filteredComplaints.length && (
+                {(visibleCount < filteredComplaints.length || nextCursor) && (
                   <button
                     className="load-more-btn"
-                    onClick={() => setVisibleCount(prev => prev + 20)}
+                    onClick={loadMoreComplaints}
+                    disabled={loadingMore}
                   >
-                    Load More Complaints
+                    {loadingMore ? <><FontAwesomeIcon icon={faSpinner} spin /> Loading...</> : "Load More Complaints"}
                   </button>
                 )}
               </>
@@ -99,6 +99,10 @@ const createCustomIcon = (color) => {
 export default function MunicipalityDashboard() {
   const [data, setData] = useState(null);
   const [complaints, setComplaints] = useState([]);
+  // Month filters and the map use the complaint pages loaded so far;
+  // the "All" charts come from the server-side rollups
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [loading, setLoading] = useState(true);
   const [refreshInterval, setRefreshInterval] = useState(null);
   const [activeTab, setActiveTab] = useState('overview');
@@ -172,25 +176,27 @@ export default function MunicipalityDashboard() {
   }, [currentStats, selectedMonth, data]);
 
   useEffect(() => {
-    const fetchDashboardAndComplaints = async () => {
+    const fetchDashboard = async () => {
       try {
         console.log('🔄 Fetching dashboard data...');
-
-
-        // Fetch dashboard data
-        const [dashboardRes, complaintsData] = await Promise.all([
-          authService.apiClient.get(`/municipalities/${id}/dashboard/`),
-          complaintService.getComplaints(id)
-        ]);
-
+        const dashboardRes = await authService.apiClient.get(`/municipalities/${id}/dashboard/`);
         setData(dashboardRes.data);
-        console.log(dashboardRes.data);
-        setComplaints(complaintsData);
-
-
         console.log('✅ Data fetched successfully');
       } catch (err) {
         console.error("❌ Dashboard fetch error:", err);
+      }
+    };
+
+    const fetchDashboardAndComplaints = async () => {
+      try {
+        const [, complaintsPage] = await Promise.all([
+          fetchDashboard(),
+          complaintService.getComplaints(id)
+        ]);
+        setComplaints(complaintsPage.results);
+        setNextCursor(complaintsPage.next);
+      } catch (err) {
+        console.error("❌ Complaints fetch error:", err);
       } finally {
         setLoading(false);
       }
@@ -198,8 +204,8 @@ export default function MunicipalityDashboard() {
 
     fetchDashboardAndComplaints();
 
-    // Set up real-time updates every 30 seconds
-    const interval = setInterval(fetchDashboardAndComplaints, 30000);
+    // Set up real-time updates every 30 seconds; loaded complaint pages are kept
+    const interval = setInterval(fetchDashboard, 30000);
     setRefreshInterval(interval);
 
     return () => {
@@ -207,6 +213,20 @@ export default function MunicipalityDashboard() {
     };
   }, [id]);
 
+  const loadMoreComplaints = async () => {
+    if (!nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const page = await complaintService.getComplaints(id, 100, nextCursor);
+      setComplaints(prev => [...prev, ...page.results]);
+      setNextCursor(page.next);
+    } catch (err) {
+      console.error("❌ Error loading more complaints:", err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   // Cleanup interval on unmount
   useEffect(() => {
     return () => {
@@ -253,10 +273,13 @@ export default function MunicipalityDashboard() {
   // Dynamic Dept Data
   const deptData = React.useMemo(() => {
     const stats = {};
-    const source = selectedMonth === 'All' ? complaints : filteredComplaints;
+    if (selectedMonth === 'All') {
+      Object.entries(department_wise_stats || {}).forEach(([dept, s]) => { stats[dept] = s.total; });
+    }
+    const source = selectedMonth === 'All' ? [] : filteredComplaints;
 
     // If we have no complaints for the month, show empty stats/placeholder logic or just 0s
-    if (source.length === 0) return [];
+    if (source.length === 0 && Object.keys(stats).length === 0) return [];
 
     source.forEach(c => {
       stats[c.department] = (stats[c.department] || 0) + 1;
@@ -267,14 +290,14 @@ export default function MunicipalityDashboard() {
       count: v,
       fill: COLORS[index % COLORS.length]
     })).sort((a, b) => b.count - a.count); // sort by count descending
-  }, [complaints, filteredComplaints, selectedMonth]);
+  }, [department_wise_stats, filteredComplaints, selectedMonth]);
 
   // Dynamic Status Data
   const statusData = React.useMemo(() => {
-    const stats = {};
-    const source = selectedMonth === 'All' ? complaints : filteredComplaints;
+    const stats = selectedMonth === 'All' ? { ...status_distribution } : {};
+    const source = selectedMonth === 'All' ? [] : filteredComplaints;
 
-    if (source.length === 0) return [];
+    if (source.length === 0 && Object.keys(stats).length === 0) return [];
 
     source.forEach(c => {
       // Normalize status
@@ -287,7 +310,7 @@ export default function MunicipalityDashboard() {
       value: v,
       fill: STATUS_COLORS[k.toLowerCase()] || STATUS_COLORS.default
     }));
-  }, [complaints, filteredComplaints, selectedMonth]);
+  }, [status_distribution, filteredComplaints, selectedMonth]);
 
   // Get current selected dept stats (this remains from global stats for now as it's card specific)
   // Or we can make this dynamic too? The user asked for "Volume by Dept" (Chart) specifically.
@@ -738,6 +761,15 @@ export default function MunicipalityDashboard() {
               </motion.div>
             </div>
 
+            {selectedMonth !== 'All' && nextCursor && (
+              <div className="loaded-complaints-note">
+                <span>{selectedMonth} charts use the {complaints.length} most recent complaints loaded so far.</span>
+                <button className="load-more-btn" onClick={loadMoreComplaints} disabled={loadingMore}>
+                  {loadingMore ? 'Loading...' : 'Load older complaints'}
+                </button>
+              </div>
+            )}
+
             <section className="charts-grid-analytics">
               {/* Main Trend Chart */}
               <motion.div
@@ -978,6 +1010,15 @@ export default function MunicipalityDashboard() {
               </MapContainer>
             </div>
 
+            {nextCursor && (
+              <div className="loaded-complaints-note">
+                <span>The map shows the {complaints.length} most recent complaints loaded so far.</span>
+                <button className="load-more-btn" onClick={loadMoreComplaints} disabled={loadingMore}>
+                  {loadingMore ? 'Loading...' : 'Load older complaints'}
+                </button>
+              </div>
+            )}
+
             <div className="map-legend">
               <div className="legend-item">
                 <div className="legend-color resolved"></div>
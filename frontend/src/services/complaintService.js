@@ -3,14 +3,29 @@ const apiClient = authService.apiClient;
 
 const BASE_URL = "/complaints/";
 
-const getComplaints = async (municipalityId = null) => {
+// List endpoints are cursor-paginated: { next, previous, results }
+// and return compact items unless `fields` / `expand` are given.
+const FEED_FIELDS = [
+  "id", "user", "department", "topic", "description", "status", "created_at",
+  "latitude", "longitude", "media", "priority", "total_upvotes", "is_upvoted",
+].join(",");
+
+// Returns { results, next }; pass `next` back as `nextUrl` to load older complaints
+const getComplaints = async (municipalityId = null, pageSize = 100, nextUrl = null) => {
+  if (nextUrl) {
+    const response = await apiClient.get(nextUrl);
+    return response.data;
+  }
+
   let url = BASE_URL;
 
   if (municipalityId) {
     url = `/municipalities/${municipalityId}/complaints/`;
   }
 
-  const response = await apiClient.get(url);
+  const response = await apiClient.get(url, {
+    params: { page_size: pageSize, fields: FEED_FIELDS, expand: "comments" },
+  });
   return response.data;
 };
 const getComplaintById = async (id) => {
@@ -56,8 +71,13 @@ const updateStatus = async (complaintId, newStatus) => {
   return response.data;
 };
 
-const getRankedComplaints = async (page = 1, municipalityId = null) => {
-  const params = { page };
+// Pass the `next` URL from the previous response to fetch the following page
+const getRankedComplaints = async (nextUrl = null, municipalityId = null) => {
+  if (nextUrl) {
+    const response = await apiClient.get(nextUrl);
+    return response.data;
+  }
+  const params = { fields: "id,topic,summary,location,total_upvotes,score" };
   if (municipalityId) {
     params.municipality_id = municipalityId;
   }